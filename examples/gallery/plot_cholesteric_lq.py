@@ -34,8 +34,9 @@ LC.set_rotation(R)  # apply rotation from z to x
 # Cholesteric pitch (nm):
 p = 650
 
-# One half turn of a right-handed helix:
-TN = elli.TwistedLayer(LC, p / 2, angle=180, div=35)
+# One half turn of a right-handed helix.
+# At normal incidence, the helicoidal propagation is exact without slicing:
+TN = elli.TwistedLayer(LC, p / 2, angle=180, div=35, propagation="helicoidal")
 
 # Repetition the helix layer
 N = 15  # number half pitch repetitions
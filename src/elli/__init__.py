@@ -10,8 +10,10 @@ from .importer.nexus import *
 from .importer.spectraray import *
 from .importer.woollam import read_woollam_psi_delta, read_woollam_rho, scale_to_nm
 from .materials import *
-from .result import Result, ResultList
+from .plan import EvaluationPlan
+from .result import IncoherentResult, Result, ResultList
 from .solver2x2 import Solver2x2
 from .solver4x4 import *
+from .solver4x4_torch import Solver4x4Torch, TorchResult
 from .structure import *
 from .utils import *
@@ -2,8 +2,21 @@
 """Abstract base class and utility classes for pyElli dispersion"""
 
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from copy import deepcopy
-from typing import List, Optional, Union
+from hashlib import blake2b
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 import numpy.typing as npt
@@ -17,14 +30,211 @@ class InvalidParameters(Exception):
     """Exception for invalid dispersion parameters."""
 
 
+class ParameterDict(dict):
+    """Dictionary of dispersion parameters, which counts its modifications.
+
+    The version is increased on every change of the dictionary,
+    so evaluated dispersions can be cached until their parameters change.
+    """
+
+    version = 0
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self.version += 1
+
+    def update(self, *args, **kwargs) -> None:
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def setdefault(self, key, default=None):
+        self.version += 1
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+
+    def clear(self) -> None:
+        super().clear()
+        self.version += 1
+
+
+class ParameterSet(MutableMapping):
+    """One set of repeated parameters, e.g. one oscillator.
+
+    It is a view of a row of the :class:`RepeatedParameters` it belongs to
+    and behaves like a dictionary with fixed keys.
+    """
+
+    def __init__(self, owner: "RepeatedParameters", index: int) -> None:
+        self._owner = owner
+        self._index = index
+
+    def __getitem__(self, key: str) -> object:
+        return self._owner.get_value(self._index, key)
+
+    def __setitem__(self, key: str, value: object) -> None:
+        self._owner.set_value(self._index, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        raise InvalidParameters("Repeated parameters can't be removed.")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._owner.names)
+
+    def __len__(self) -> int:
+        return len(self._owner.names)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    @property
+    def version(self) -> int:
+        """Version of all repeated parameters of the dispersion."""
+        return self._owner.version
+
+
+class RepeatedParameters(Sequence):
+    """Repeated parameters of a dispersion, stored as contiguous array
+    with one row per parameter set and one column per parameter.
+
+    The parameter sets are accessed as :class:`ParameterSet` by index.
+    Values which are not plain numbers, e.g. lmfit Parameters or the
+    parameter arrays of a batched evaluation, are kept as objects
+    and resolved by :meth:`arrays`.
+    Like :class:`ParameterDict`, the version is increased on every change.
+    """
+
+    def __init__(self, names: Sequence[str]) -> None:
+        self.names = tuple(names)
+        self._columns = {name: i for i, name in enumerate(self.names)}
+        self._values = np.zeros((0, len(self.names)))
+        self._objects: Dict[Tuple[int, int], object] = {}
+        self._sets: List[ParameterSet] = []
+        self.version = 0
+
+    @staticmethod
+    def _is_number(value: object) -> bool:
+        return isinstance(value, (int, float, np.integer, np.floating)) and not (
+            isinstance(value, (bool, np.bool_))
+        )
+
+    def append(self, params: Mapping[str, object]) -> None:
+        """Appends a parameter set.
+
+        Args:
+            params (Mapping[str, object]): Values of all repeated parameters.
+        """
+        index = len(self._sets)
+        self._values = np.concatenate(
+            [self._values, np.zeros((1, len(self.names)))], axis=0
+        )
+        self._sets.append(ParameterSet(self, index))
+        for name in self.names:
+            self.set_value(index, name, params[name])
+
+    def get_value(self, index: int, name: str) -> object:
+        """Returns the value of a parameter in a parameter set.
+
+        Args:
+            index (int): Index of the parameter set.
+            name (str): Name of the parameter.
+
+        Returns:
+            object: Value of the parameter.
+        """
+        column = self._columns[name]
+        if (index, column) in self._objects:
+            return self._objects[index, column]
+        return self._values[index, column].item()
+
+    def set_value(self, index: int, name: str, value: object) -> None:
+        """Sets the value of a parameter in a parameter set.
+
+        Args:
+            index (int): Index of the parameter set.
+            name (str): Name of the parameter.
+            value (object): New value of the parameter.
+        """
+        if name not in self._columns:
+            raise InvalidParameters(f"Invalid parameter(s): {name}")
+
+        column = self._columns[name]
+        if self._is_number(value):
+            self._values[index, column] = value
+            self._objects.pop((index, column), None)
+        else:
+            self._objects[index, column] = value
+        self.version += 1
+
+    def arrays(self) -> Dict[str, npt.NDArray]:
+        """Returns the values of every parameter as array with the parameter sets
+        along the last axis, so all sets are evaluated in one broadcast.
+
+        Without batched parameters the arrays have the shape (sets,).
+        Parameter arrays with shape (batch...) lead to arrays with shape
+        (batch..., sets).
+
+        Returns:
+            Dict[str, npt.NDArray]: Parameter name and values.
+        """
+        if not self._objects:
+            return {name: self._values[:, i] for i, name in enumerate(self.names)}
+
+        arrays = {}
+        for column, name in enumerate(self.names):
+            values = [
+                self._objects.get((index, column), self._values[index, column])
+                for index in range(len(self))
+            ]
+            values = np.broadcast_arrays(*(getattr(v, "value", v) for v in values))
+            arrays[name] = np.stack(values, axis=-1)
+        return arrays
+
+    def parameter_values(self) -> List[object]:
+        """Returns the values of all lmfit Parameters in the parameter sets."""
+        return [
+            value.value for value in self._objects.values() if hasattr(value, "value")
+        ]
+
+    def __getitem__(self, index):
+        return self._sets[index]
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
 class BaseDispersion(ABC):
     """BaseDispersion (abstract class).
 
     Functions provided for derived classes:
     * dielectric_function(lbda) : returns dielectric constant for wavelength 'lbda'
+
+    The results of :meth:`get_dielectric` and :meth:`get_refractive_index` are
+    memoized in a least-recently-used cache. The cache key consists of the
+    parameter version, which is increased by :meth:`add` and every change of the
+    single or repeated parameters, the current values of lmfit Parameters
+    and a digest of the wavelengths. Thus, a dispersion is only evaluated again,
+    if its parameters or the wavelengths change. Changes inside of parameter
+    arrays are not detected, these need a call of :meth:`clear_cache`.
     """
 
     default_lbda_range = np.linspace(200, 1000, 801)
+    cache_size = 8
+    _cache = None
+    _version = 0
 
     @property
     @abstractmethod
@@ -51,7 +261,7 @@ class BaseDispersion(ABC):
         if (len(kwargs) + len(args)) > len(template):
             raise InvalidParameters("Too many parameters")
 
-        params = template.copy()
+        params = ParameterDict(template)
         pos_arguments = set()
 
         for i, val in enumerate(args):
@@ -70,7 +280,7 @@ class BaseDispersion(ABC):
 
     def __init__(self, *args, **kwargs):
         super()
-        self.rep_params = []
+        self.rep_params = RepeatedParameters(self.rep_params_template)
 
         self.single_params = self._fill_params_dict(
             self.single_params_template, *args, **kwargs
@@ -107,23 +317,133 @@ class BaseDispersion(ABC):
             self.rep_params_template, *args, **kwargs
         )
         self.rep_params.append(rep_param_set)
+        self._version += 1
 
         return self
 
+    @property
+    def parameter_version(self) -> int:
+        """Version of the parameters, which increases with every change of them."""
+        return (
+            self._version
+            + getattr(self.single_params, "version", 0)
+            + getattr(self.rep_params, "version", 0)
+        )
+
+    def set_cache_size(self, cache_size: int) -> None:
+        """Sets the maximum number of cached evaluations.
+        If the cache holds more entries, the least recently used are discarded.
+
+        Args:
+            cache_size (int): Maximum number of cached evaluations.
+                A value of 0 disables the cache.
+        """
+        if cache_size < 0:
+            raise ValueError("Cache size can't be negative.")
+
+        if self._cache is None:
+            self._cache = OrderedDict()
+
+        self.cache_size = cache_size
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        """Removes all cached evaluations."""
+        if self._cache is not None:
+            self._cache.clear()
+
+    def _parameter_state(self) -> Optional[tuple]:
+        """Returns the state of the parameters used in the cache key,
+        or None if the parameters are not stored in ParameterDicts
+        and RepeatedParameters and can't be tracked."""
+        if not isinstance(self.single_params, ParameterDict) or not isinstance(
+            self.rep_params, RepeatedParameters
+        ):
+            return None
+
+        # lmfit Parameters change their value without changing the containers
+        return (
+            self._version,
+            len(self.rep_params),
+            self.single_params.version,
+            *(
+                value.value
+                for value in self.single_params.values()
+                if hasattr(value, "value")
+            ),
+            self.rep_params.version,
+            *self.rep_params.parameter_values(),
+        )
+
+    def _cached(
+        self, kind: str, lbda: npt.ArrayLike, evaluate: Callable[[], npt.NDArray]
+    ) -> npt.NDArray:
+        """Returns a memoized evaluation of the dispersion.
+
+        Args:
+            kind (str): Name of the evaluated quantity.
+            lbda (npt.ArrayLike): Wavelengths of the evaluation.
+            evaluate (Callable[[], npt.NDArray]): Evaluates the quantity,
+                if it is not cached.
+
+        Returns:
+            npt.NDArray: Read-only result of the evaluation.
+        """
+        state = self._parameter_state() if self.cache_size > 0 else None
+        if state is None:
+            return evaluate()
+
+        lbda = np.asarray(lbda, dtype=float)
+        digest = blake2b(digest_size=16)
+        digest.update(repr(lbda.shape).encode())
+        digest.update(np.ascontiguousarray(lbda).data)
+        key = (kind, state, digest.digest())
+
+        if self._cache is None:
+            self._cache = OrderedDict()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        value = evaluate()
+        value.flags.writeable = False
+
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return value
+
+    def _cached_dielectric(self, lbda: npt.ArrayLike) -> npt.NDArray:
+        """Returns the possibly cached and therefore read-only dielectric function."""
+        return self._cached(
+            "dielectric",
+            lbda,
+            lambda: np.array(self.dielectric_function(lbda), dtype=np.complex128),
+        )
+
+    def _cached_refractive_index(self, lbda: npt.ArrayLike) -> npt.NDArray:
+        """Returns the possibly cached and therefore read-only refractive index."""
+        if isinstance(self, IndexDispersion):
+            return self._cached(
+                "index", lbda, lambda: np.array(self.refractive_index(lbda))
+            )
+        return self._cached(
+            "index", lbda, lambda: np.array(sqrt(self.dielectric_function(lbda)))
+        )
+
     def get_dielectric(self, lbda: Optional[npt.ArrayLike] = None) -> npt.NDArray:
         """Returns the dielectric constant for wavelength 'lbda' default unit (nm)
         in the convention ε1 + iε2."""
         lbda = self.default_lbda_range if lbda is None else lbda
-        return np.asarray(self.dielectric_function(lbda), dtype=np.complex128)
+        return self._cached_dielectric(lbda).copy()
 
     def get_refractive_index(self, lbda: Optional[npt.ArrayLike] = None) -> npt.NDArray:
         """Returns the refractive index for wavelength 'lbda' default unit (nm)
         in the convention n + ik."""
         lbda = self.default_lbda_range if lbda is None else lbda
-
-        if isinstance(self, IndexDispersion):
-            return self.refractive_index(lbda)
-        return sqrt(self.dielectric_function(lbda))
+        return self._cached_refractive_index(lbda).copy()
 
     def get_dielectric_df(
         self, lbda: Optional[npt.ArrayLike] = None, conjugate=False
@@ -145,7 +465,7 @@ class BaseDispersion(ABC):
                 and two rows containing ε1 and ε2.
         """
         lbda = self.default_lbda_range if lbda is None else lbda
-        eps = self.get_dielectric(lbda)
+        eps = self._cached_dielectric(lbda)
 
         return pd.DataFrame(
             {"ϵ1": eps.real, "ϵ2": -eps.imag if conjugate else eps.imag},
@@ -172,7 +492,7 @@ class BaseDispersion(ABC):
                 and two rows containing n and k.
         """
         lbda = self.default_lbda_range if lbda is None else lbda
-        nk = self.get_refractive_index(lbda)
+        nk = self._cached_refractive_index(lbda)
 
         return pd.DataFrame(
             {"n": nk.real, "k": -nk.imag if conjugate else nk.imag},
@@ -364,9 +684,19 @@ class DispersionSum(Dispersion):
         self.dispersions.append(other)
         return self
 
+    def _parameter_state(self) -> Optional[tuple]:
+        """Returns the states of all dispersions, so the sum is evaluated again
+        if any of them changes."""
+        states = tuple(disp._parameter_state() for disp in self.dispersions)
+        if any(state is None for state in states):
+            return None
+        return tuple(id(disp) for disp in self.dispersions) + states
+
     def dielectric_function(self, lbda: npt.ArrayLike) -> npt.NDArray:
+        # The dispersions are cached individually,
+        # so only the changed dispersions are evaluated again
         dielectric_function = sum(
-            disp.dielectric_function(lbda) for disp in self.dispersions
+            disp._cached_dielectric(lbda) for disp in self.dispersions
         )
         return np.array(dielectric_function)
 
@@ -409,9 +739,19 @@ class IndexDispersionSum(IndexDispersion):
         self.index_dispersions.append(other)
         return self
 
+    def _parameter_state(self) -> Optional[tuple]:
+        """Returns the states of all dispersions, so the sum is evaluated again
+        if any of them changes."""
+        states = tuple(disp._parameter_state() for disp in self.index_dispersions)
+        if any(state is None for state in states):
+            return None
+        return tuple(id(disp) for disp in self.index_dispersions) + states
+
     def refractive_index(self, lbda: npt.ArrayLike) -> npt.NDArray:
+        # The dispersions are cached individually,
+        # so only the changed dispersions are evaluated again
         refractive_index = sum(
-            disp.refractive_index(lbda) for disp in self.index_dispersions
+            disp._cached_refractive_index(lbda) for disp in self.index_dispersions
         )
         return np.array(refractive_index)
 
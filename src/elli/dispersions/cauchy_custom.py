@@ -1,6 +1,7 @@
 # Encoding: utf-8
 """Cauchy dispersion with custom exponents."""
 
+import numpy as np
 import numpy.typing as npt
 
 from .base_dispersion import IndexDispersion
@@ -26,6 +27,8 @@ class CauchyCustomExponent(IndexDispersion):
     rep_params_template = {"f": 0, "e": 1}
 
     def refractive_index(self, lbda: npt.ArrayLike) -> npt.NDArray:
-        return self.single_params.get("n0") + sum(
-            c.get("f") * lbda ** c.get("e") for c in self.rep_params
+        lbda = np.expand_dims(lbda, -1)
+        osc = self.rep_params.arrays()
+        return self.single_params.get("n0") + np.sum(
+            osc["f"] * lbda ** osc["e"], axis=-1
         )
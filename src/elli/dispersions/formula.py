@@ -7,7 +7,7 @@ import numpy.typing as npt
 
 from elli.units import ureg
 from elli.dispersions.base_dispersion import BaseDispersion, Dispersion, IndexDispersion
-from elli.formula_parser.parser import parse_formula, FormulaTransformer
+from elli.formula_parser.parser import compile_formula, parse_formula
 
 
 class FormulaParser(BaseDispersion):
@@ -31,6 +31,7 @@ class FormulaParser(BaseDispersion):
     ):
         self.f_single_params: Dict[str, float] = single_params
         self.f_axis_name: str = wavelength_axis_name
+        self.f_reciprocal_axis: bool = True
         rep_params_len: Optional[int] = None
         rep_params_sets: List[Dict[str, float]] = []
 
@@ -62,13 +63,6 @@ class FormulaParser(BaseDispersion):
         for rep_params_set in rep_params_sets:
             self.add(**rep_params_set)
 
-        self.rep_params_dl = {}
-        if self.rep_params:
-            self.rep_params_dl = {
-                k: np.array([dic[k] for dic in self.rep_params])
-                for k in self.rep_params[0]
-            }
-
         self.formula = formula
 
         self._check_repr()
@@ -77,6 +71,13 @@ class FormulaParser(BaseDispersion):
         if unit is not None:
             self._set_unit_conversion(unit)
 
+    @property
+    def rep_params_dl(self) -> Dict[str, npt.NDArray]:
+        """The repeated parameters as arrays with one entry per parameter set."""
+        if not self.rep_params:
+            return {}
+        return self.rep_params.arrays()
+
     def _set_unit_conversion(self, unit: str):
         quantity = ureg(unit)
         if quantity.check("[length]"):
@@ -88,6 +89,7 @@ class FormulaParser(BaseDispersion):
 
         if quantity.check("[energy]"):
             scaling = ureg("nm").to(unit).magnitude
+            self.f_reciprocal_axis = False
             self._dispersion_function = lambda lbda: self.__dispersion_function(
                 scaling / lbda
             )
@@ -109,12 +111,9 @@ class FormulaParser(BaseDispersion):
             )
 
     def __dispersion_function(self, lbda: npt.ArrayLike) -> npt.NDArray:
-        return FormulaTransformer(
-            x_axis_name=self.f_axis_name,
-            x_axis_values=lbda,
-            single_params=self.single_params,
-            repeated_params=self.rep_params_dl,
-        ).transform(parse_formula(self.formula))[1]
+        return compile_formula(self.formula, self.f_axis_name, self.f_reciprocal_axis)(
+            lbda, self.single_params, self.rep_params_dl
+        )
 
 
 class Formula(Dispersion, FormulaParser):
@@ -52,22 +52,21 @@ class Gaussian(Dispersion):
     rep_params_template = {"A": 1, "E": 1, "sigma": 1}
 
     def dielectric_function(self, lbda: npt.ArrayLike) -> npt.NDArray:
-        energy = conversion_wavelength_energy(lbda)
+        energy = np.expand_dims(conversion_wavelength_energy(lbda), -1)
         ftos = 2 * sqrt(np.log(2))
-        return sum(
+        osc = self.rep_params.arrays()
+        return np.sum(
             2
-            * c.get("A")
+            * osc["A"]
             / sqrt(np.pi)
             * (
-                dawsn(ftos * (energy + c.get("E")) / c.get("sigma"))
-                - dawsn(ftos * (energy - c.get("E")) / c.get("sigma"))
+                dawsn(ftos * (energy + osc["E"]) / osc["sigma"])
+                - dawsn(ftos * (energy - osc["E"]) / osc["sigma"])
             )
             + 1j
             * (
-                c.get("A")
-                * np.exp(-((ftos * (energy - c.get("E")) / c.get("sigma")) ** 2))
-                - c.get("A")
-                * np.exp(-((ftos * (energy + c.get("E")) / c.get("sigma")) ** 2))
-            )
-            for c in self.rep_params
+                osc["A"] * np.exp(-((ftos * (energy - osc["E"]) / osc["sigma"]) ** 2))
+                - osc["A"] * np.exp(-((ftos * (energy + osc["E"]) / osc["sigma"]) ** 2))
+            ),
+            axis=-1,
         )
@@ -1,6 +1,7 @@
 # Encoding: utf-8
 """Lorentz dispersion law with parameters in units of energy."""
 
+import numpy as np
 import numpy.typing as npt
 
 from ..utils import conversion_wavelength_energy
@@ -30,8 +31,9 @@ class LorentzEnergy(Dispersion):
     rep_params_template = {"A": 1, "E": 0, "gamma": 0}
 
     def dielectric_function(self, lbda: npt.ArrayLike) -> npt.NDArray:
-        energy = conversion_wavelength_energy(lbda)
-        return 1 + sum(
-            c.get("A") / (c.get("E") ** 2 - energy**2 - 1j * c.get("gamma") * energy)
-            for c in self.rep_params
+        energy = np.expand_dims(conversion_wavelength_energy(lbda), -1)
+        osc = self.rep_params.arrays()
+        return 1 + np.sum(
+            osc["A"] / (osc["E"] ** 2 - energy**2 - 1j * osc["gamma"] * energy),
+            axis=-1,
         )
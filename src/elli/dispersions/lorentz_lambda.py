@@ -1,6 +1,7 @@
 # Encoding: utf-8
 """Lorentz dispersion law with parameters in units of wavelengths."""
 
+import numpy as np
 import numpy.typing as npt
 
 from .base_dispersion import Dispersion
@@ -31,9 +32,11 @@ class LorentzLambda(Dispersion):
     rep_params_template = {"A": 1, "lambda_r": 0, "gamma": 0}
 
     def dielectric_function(self, lbda: npt.ArrayLike) -> npt.NDArray:
-        return 1 + sum(
-            c.get("A")
+        lbda = np.expand_dims(lbda, -1)
+        osc = self.rep_params.arrays()
+        return 1 + np.sum(
+            osc["A"]
             * lbda**2
-            / (lbda**2 - c.get("lambda_r") ** 2 - 1j * c.get("gamma") * lbda)
-            for c in self.rep_params
+            / (lbda**2 - osc["lambda_r"] ** 2 - 1j * osc["gamma"] * lbda),
+            axis=-1,
         )
@@ -1,6 +1,7 @@
 # Encoding: utf-8
 """Polynomial dispersion."""
 
+import numpy as np
 import numpy.typing as npt
 
 from .base_dispersion import Dispersion
@@ -26,6 +27,8 @@ class Polynomial(Dispersion):
     rep_params_template = {"f": 0, "e": 0}
 
     def dielectric_function(self, lbda: npt.ArrayLike) -> npt.NDArray:
-        return self.single_params.get("e0") + sum(
-            c.get("f") * lbda ** c.get("e") for c in self.rep_params
+        lbda = np.expand_dims(lbda, -1)
+        osc = self.rep_params.arrays()
+        return self.single_params.get("e0") + np.sum(
+            osc["f"] * lbda ** osc["e"], axis=-1
         )
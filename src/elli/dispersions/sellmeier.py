@@ -1,6 +1,7 @@
 # Encoding: utf-8
 """Sellmeier dispersion."""
 
+import numpy as np
 import numpy.typing as npt
 
 from .base_dispersion import Dispersion
@@ -28,7 +29,6 @@ class Sellmeier(Dispersion):
     rep_params_template = {"A": 0, "B": 0}
 
     def dielectric_function(self, lbda: npt.ArrayLike) -> npt.NDArray:
-        lbda = lbda / 1e3
-        return 1 + sum(
-            c.get("A") * lbda**2 / (lbda**2 - c.get("B")) for c in self.rep_params
-        )
+        lbda = np.expand_dims(lbda, -1) / 1e3
+        osc = self.rep_params.arrays()
+        return 1 + np.sum(osc["A"] * lbda**2 / (lbda**2 - osc["B"]), axis=-1)
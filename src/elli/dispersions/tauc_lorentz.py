@@ -52,21 +52,20 @@ class TaucLorentz(Dispersion):
         # fmt: on
 
     def dielectric_function(self, lbda: npt.ArrayLike) -> npt.NDArray:
-        energy = conversion_wavelength_energy(lbda)
-        energy_g = self.single_params.get("Eg")
-        return sum(
-            (
-                1j
-                * (
-                    c.get("A")
-                    * c.get("E")
-                    * c.get("C")
-                    * (energy - energy_g) ** 2
-                    / ((energy**2 - c.get("E") ** 2) ** 2 + c.get("C") ** 2 * energy**2)
-                    / energy
-                )
-                * np.heaviside(energy - energy_g, 0)
-                + self.eps1(energy, energy_g, c.get("A"), c.get("E"), c.get("C"))
+        energy = np.expand_dims(conversion_wavelength_energy(lbda), -1)
+        energy_g = np.expand_dims(self.single_params.get("Eg"), -1)
+        osc = self.rep_params.arrays()
+        return np.sum(
+            1j
+            * (
+                osc["A"]
+                * osc["E"]
+                * osc["C"]
+                * (energy - energy_g) ** 2
+                / ((energy**2 - osc["E"] ** 2) ** 2 + osc["C"] ** 2 * energy**2)
+                / energy
             )
-            for c in self.rep_params
+            * np.heaviside(energy - energy_g, 0)
+            + self.eps1(energy, energy_g, osc["A"], osc["E"], osc["C"]),
+            axis=-1,
         )
@@ -5,25 +5,140 @@ It requires a Structure to evaluate and includes the information about
 the incident light beam:
 
 * the wavelengths :math:`\lambda`
-* the incidence angle :math:`\theta_\text{i}`
+* the incidence angle :math:`\theta_\text{i}`, which may also be an array of angles
+  to evaluate multiple angles of incidence in one batched calculation
 * and the polarization, which can be given by a Jones or Stokes vector
 
 The evaluate method can be called, to start the calculation of the optical properties.
 To choose a Solver to be used in the calculation, the solver class is provided
 as an argument and an object will be created automatically.
+By default, the solver is selected automatically with :func:`select_solver`:
+Structures of isotropic layers are evaluated with the faster Solver2x2,
+all others with the Solver4x4.
 
 The experiment class is only needed in special cases an can be skipped by calling
 :meth:`elli.structure.Structure.evaluate`.
 """
 
+import warnings
+from typing import List, Type, Union
+
 import numpy as np
 import numpy.typing as npt
 
 from .result import Result
 from .solver import Solver
+from .solver2x2 import Solver2x2
 from .solver4x4 import Solver4x4
 
 
+def select_solver(
+    structure: "Structure", solver: Union[Type[Solver], str] = "auto", **solver_kwargs
+) -> Type[Solver]:
+    """Resolves the solver class to evaluate a structure with.
+
+    For ``"auto"``, the Solver2x2 is selected, if the front and back materials and
+    all layers are isotropic, as it gives the same Jones matrices as the Solver4x4
+    at a fraction of the cost. The decision is based on the tensor forms of
+    materials and layers, see :attr:`Material.tensor_form<elli.materials.Material.tensor_form>`,
+    so mixtures of isotropic materials are routed to the Solver2x2 as well.
+    All other structures, structures with inhomogeneous layers using a propagation
+    of the Solver4x4 and structures evaluated with solver keyword arguments,
+    which are only understood by the Solver4x4, are evaluated with the Solver4x4.
+
+    Args:
+        structure (Structure): Structure to evaluate.
+        solver (Union[Type[Solver], str], optional): Solver class or ``"auto"``.
+            Solver classes are returned unchanged. Defaults to "auto".
+        solver_kwargs (optional): Keyword arguments intended for the solver.
+
+    Raises:
+        ValueError: If the solver is neither a solver class nor ``"auto"``.
+
+    Returns:
+        Type[Solver]: Solver class to use.
+    """
+    if not isinstance(solver, str):
+        return solver
+
+    if solver != "auto":
+        raise ValueError(f'Unknown solver "{solver}", use a solver class or "auto".')
+
+    # Imported locally to avoid circular imports
+    from .structure import InhomogeneousLayer, RepeatedLayers
+
+    def sliced(layers: List["AbstractLayer"]) -> bool:
+        return all(
+            sliced(layer.layers)
+            if isinstance(layer, RepeatedLayers)
+            else not isinstance(layer, InhomogeneousLayer)
+            or layer.propagation == "slices"
+            for layer in layers
+        )
+
+    if (
+        not solver_kwargs
+        and structure.front_material.tensor_form == "isotropic"
+        and structure.back_material.tensor_form == "isotropic"
+        and all(layer.tensor_form == "isotropic" for layer in structure.layers)
+        and sliced(structure.layers)
+    ):
+        return Solver2x2
+    return Solver4x4
+
+
+def cross_check_solver(
+    experiment: "Experiment",
+    result: Result,
+    samples: int = 5,
+    rtol: float = 1e-6,
+    atol: float = 1e-9,
+) -> bool:
+    """Cross-checks the Jones matrices of a result against the Solver4x4
+    on a sample of evenly spaced wavelengths, e.g. to verify results of the Solver2x2.
+    A warning is issued, if the results deviate.
+
+    Args:
+        experiment (Experiment): Experiment the result was calculated for.
+        result (Result): Result to check.
+        samples (int, optional): Number of wavelengths to check. Defaults to 5.
+        rtol (float, optional): Relative tolerance. Defaults to 1e-6.
+        atol (float, optional): Absolute tolerance. Defaults to 1e-9.
+
+    Returns:
+        bool: True, if the results agree within the tolerances.
+    """
+    indices = np.unique(
+        np.linspace(0, len(experiment.lbda) - 1, min(samples, len(experiment.lbda)))
+        .round()
+        .astype(int)
+    )
+    reference = Experiment(
+        experiment.structure,
+        experiment.lbda[indices],
+        experiment.theta_i,
+        experiment.jones_vector,
+    ).evaluate(Solver4x4)
+
+    deviation = 0
+    agrees = True
+    for checked, expected in [
+        (result.jones_matrix_r, reference.jones_matrix_r),
+        (result.jones_matrix_t, reference.jones_matrix_t),
+    ]:
+        checked = np.take(checked, indices, axis=-3)
+        difference = np.abs(checked - expected)
+        deviation = max(deviation, np.max(difference))
+        agrees &= bool(np.all(difference <= atol + rtol * np.abs(expected)))
+
+    if not agrees:
+        warnings.warn(
+            f"The results deviate from the Solver4x4 by up to {deviation:.3g}. "
+            "Check the structure or evaluate it with the Solver4x4 instead."
+        )
+    return agrees
+
+
 class Experiment:
     """Description of a virtual experiment to simulate the behavior of a structure."""
 
@@ -37,7 +152,7 @@ class Experiment:
         self,
         structure: "Structure",
         lbda: npt.ArrayLike,
-        theta_i: float,
+        theta_i: npt.ArrayLike,
         vector: npt.ArrayLike = None,
     ) -> None:
         """Creates a virtual experiment to simulate the behavior of a structure.
@@ -45,7 +160,7 @@ class Experiment:
         Args:
             structure (Structure): Structure object to evaluate.
             lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
-            theta_i (float): Incident angle (in degrees).
+            theta_i (npt.ArrayLike): Single value or array of incident angles (in degrees).
             vector (npt.ArrayLike, optional):
                 Jones or Stokes vector of incident light. Defaults to diagonal polarization ([1, 0, 1, 0]).
         """
@@ -130,13 +245,23 @@ class Experiment:
 
             self.jones_vector = np.array([a, b])
 
-    def set_theta(self, theta_i: float) -> None:
+    def set_theta(self, theta_i: npt.ArrayLike) -> None:
         """Set incident angle to evaluate.
 
+        If an array of angles is given, the solvers evaluate all angles at once
+        and the results get an additional leading angle axis.
+
         Args:
-            theta_i (float): Incident angle (in degrees).
+            theta_i (npt.ArrayLike): Single value or array of incident angles (in degrees).
         """
-        self.theta_i = theta_i
+        if np.ndim(theta_i) > 1:
+            raise ValueError("Incident angles have to be a single value or 1d array.")
+
+        if isinstance(theta_i, (list, tuple)):
+            self.theta_i = np.asarray(theta_i)
+        else:
+            # Scalars, arrays and tensors are kept as given
+            self.theta_i = theta_i
 
     def set_lbda(self, lbda: npt.ArrayLike) -> None:
         """Set experiment wavelengths.
@@ -149,15 +274,31 @@ class Experiment:
             lbda_array = np.asarray([lbda])
         self.lbda = lbda_array
 
-    def evaluate(self, solver: Solver = Solver4x4, **solver_kwargs) -> Result:
+    def evaluate(
+        self,
+        solver: Union[Type[Solver], str] = "auto",
+        check_solver: bool = False,
+        **solver_kwargs,
+    ) -> Result:
         """Evaluates the experiment with the given solver.
 
         Args:
-            solver (Solver, optional): Choose which solver class is used. Defaults to Solver4x4.
+            solver (Union[Type[Solver], str], optional): Choose which solver class is used.
+                With "auto", the solver is selected by :func:`select_solver`.
+                Defaults to "auto".
+            check_solver (bool, optional): Debug mode, which cross-checks the results of
+                the Solver2x2 against the Solver4x4 on a sample of wavelengths
+                and warns about deviations, see :func:`cross_check_solver`.
+                Defaults to False.
             solver_kwargs (optional): Keyword arguments for the Solver can be appended as arguments.
 
         Returns:
             Result: Result of the experiment.
         """
+        solver = select_solver(self.structure, solver, **solver_kwargs)
         solv = solver(self, **solver_kwargs)
-        return solv.calculate()
+        result = solv.calculate()
+
+        if check_solver and solver is Solver2x2:
+            cross_check_solver(self, result)
+        return result
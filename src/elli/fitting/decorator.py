@@ -3,6 +3,8 @@
 # Encoding: utf-8
 from abc import ABC, abstractmethod
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
 try:
@@ -15,6 +17,7 @@ except ImportError as e:
         "i.e. pip install pyElli[fitting]"
     ) from e
 
+from ..result import Result
 from .params_hist import ParamsHist
 
 
@@ -48,6 +51,7 @@ class FitDecorator(ABC):
         self.initial_params = ParamsHist()
         self.param_widgets = {}
         self.fit_kwargs = {}
+        self.jacobian = False
 
     @abstractmethod
     def get_model_data(
@@ -115,6 +119,63 @@ class FitDecorator(ABC):
             change (dict, optional): A dictionary containing the ipywidgets change event
         """
 
+    def use_jacobian(self, method: str) -> bool:
+        """Checks whether the derivatives of the model are used as Jacobian of a fit.
+
+        This is the case, if the decorator was created with ``jacobian=True``
+        and the fitting method is 'leastsq' or 'least_squares'.
+        The model is then called as ``model(lbda, params, jacobian=True)``
+        for the Jacobian, e.g. evaluating an EvaluationPlan with derivatives.
+        The residuals are still calculated without derivatives.
+
+        Args:
+            method (str): The fitting method.
+
+        Raises:
+            ValueError: The Jacobian is requested for parameters constrained
+                by expressions.
+
+        Returns:
+            bool: True if the Jacobian is used for the fit.
+        """
+        if not self.jacobian or method not in ["leastsq", "least_squares"]:
+            return False
+
+        if any(param.expr is not None for param in self.params.values()):
+            raise ValueError(
+                "The Jacobian can't be used with parameters constrained by expressions."
+            )
+        return True
+
+    @staticmethod
+    def varied_derivatives(
+        params: Parameters, result: Result, derivatives: npt.NDArray
+    ) -> npt.NDArray:
+        """Selects the derivatives of the varied parameters in the order used by lmfit.
+
+        Args:
+            params (Parameters): The fitting parameters.
+            result (Result): Result of the model containing the derivatives.
+            derivatives (npt.NDArray): Derivatives of a property of the result,
+                with a leading axis in the order of result.jacobian_names.
+
+        Raises:
+            ValueError: The result contains no derivatives for a varied parameter.
+
+        Returns:
+            npt.NDArray: Derivatives of the varied parameters.
+        """
+        names = [name for name, param in params.items() if param.vary]
+        missing = set(names).difference(result.jacobian_names)
+        if missing:
+            raise ValueError(
+                "The model returned no derivatives for the parameter(s) "
+                f"{', '.join(sorted(missing))}."
+            )
+        return np.asarray(derivatives)[
+            [result.jacobian_names.index(name) for name in names]
+        ]
+
     def set_vary_param(self, change: dict) -> None:
         self.initial_params[change.owner.description_tooltip].vary = change.new
         self.params[change.owner.description_tooltip].vary = change.new
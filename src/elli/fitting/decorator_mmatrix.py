@@ -3,6 +3,7 @@
 # Encoding: utf-8
 from typing import Callable
 
+import numpy as np
 import numpy.typing as npt
 import pandas as pd
 
@@ -48,10 +49,11 @@ def mmatrix_to_dataframe(
         columns = [f"{c}_{identifier}" for c in exp_df.columns]
     else:
         columns = exp_df.columns
-    mueller_df = pd.DataFrame(index=exp_df.index, columns=columns, dtype="float64")
-    mueller_df.values[:] = mueller_matrix.reshape(-1, 16)
-
-    return mueller_df
+    return pd.DataFrame(
+        np.asarray(mueller_matrix, dtype="float64").reshape(-1, 16),
+        index=exp_df.index,
+        columns=columns,
+    )
 
 
 class FitMuellerMatrix(FitDecorator):
@@ -175,9 +177,33 @@ class FitMuellerMatrix(FitDecorator):
             - self.model(lbda, params).mueller_matrix
         )
 
+    def fit_jacobian(
+        self, params: Parameters, lbda: npt.NDArray, mueller_matrix: pd.DataFrame
+    ) -> npt.NDArray:
+        """The Jacobian of the fit function, taken from the derivatives
+        stored in the result of the model.
+
+        Args:
+            params (Parameters): The lmfit fitting Parameters to construct the simulation
+            lbda (npt.NDArray): Wavelengths in nm
+            mueller_matrix (pd.DataFrame): The experimental data to compare to the fitted model
+
+        Returns:
+            npt.NDArray: Derivatives of the residual with respect to the varied parameters,
+                with the shape (residuals, parameters)
+        """
+        result = self.model(lbda, params, jacobian=True)
+        d_mm = self.varied_derivatives(params, result, result.mueller_matrix_jacobian)
+
+        return -d_mm.reshape(len(d_mm), -1).T
+
     def fit(self, method: str = "leastsq") -> MinimizerResult:
         """Execute lmfit with the current fitting parameters
 
+        If the decorator was created with ``jacobian=True``, the derivatives
+        returned by ``model(lbda, params, jacobian=True)`` are used as Jacobian
+        by the 'leastsq' and 'least_squares' methods, see :meth:`use_jacobian`.
+
         Args:
             method (str, optional): The fitting method to use.
                 Any method supported by scipys curve_fit is allowed.
@@ -186,11 +212,18 @@ class FitMuellerMatrix(FitDecorator):
         Returns:
             Result: The fitting result
         """
+        lbda = self.exp_mm.index.values
+
+        kwargs = {}
+        if self.use_jacobian(method):
+            kwargs["Dfun"] = self.fit_jacobian
+
         res = minimize(
             self.fit_function,
             self.params,
-            args=(self.exp_mm.index.values, self.exp_mm),
+            args=(lbda, self.exp_mm),
             method=method,
+            **kwargs,
         )
 
         self.fitted_params = res.params
@@ -312,6 +345,7 @@ class FitMuellerMatrix(FitDecorator):
         exp_mm: pd.DataFrame,
         params: Parameters,
         model: Callable[[npt.NDArray, Parameters], Result],
+        jacobian: bool = False,
         **kwargs,
     ) -> None:
         """Intialize the mueller matrix fitting class
@@ -326,6 +360,12 @@ class FitMuellerMatrix(FitDecorator):
                 and fitting parameters as second,
                 which returns a pyEllis Result object.
                 This function contains the actual model which should be fitted
+            jacobian (bool, optional): Uses the derivatives of the model as Jacobian
+                of the fit. The model then has to accept a keyword argument
+                ``jacobian`` and return the derivatives for all varied parameters,
+                if it is True, e.g. by evaluating an EvaluationPlan with
+                ``jacobian=True``. The derivatives are only calculated for the
+                Jacobian, which is evaluated once per iteration. Defaults to False.
 
             **display_single (bool):
                 Returns a figure containing a single graph, if set to true.
@@ -339,14 +379,13 @@ class FitMuellerMatrix(FitDecorator):
         self.fitted_params = params.copy()
         self.initial_params = params.copy()
         self.model = model
+        self.jacobian = jacobian
         self.param_widgets = {}
         self.show_residual = False
 
-        mm_kwargs = ("display_single", "sharex", "full_scale")
-        for kwarg in mm_kwargs:
-            if kwarg in kwargs:
-                setattr(self, kwarg, kwargs[kwarg])
-                del kwargs[kwarg]
+        self.display_single = kwargs.pop("display_single", True)
+        self.sharex = kwargs.pop("sharex", False)
+        self.full_scale = kwargs.pop("full_scale", False)
         self.fit_kwargs = kwargs
 
         model_df = mmatrix_to_dataframe(
@@ -378,6 +417,8 @@ def fit_mueller_matrix(
             Returns a grid of figures otherwise.
         **sharex (bool): Ties the zoom of the x-axes together for grid view.
         **full_scale (bool): Sets the y-axis scale to [-1, 1] if set to True.
+        **jacobian (bool): Uses the derivatives of the model as Jacobian of the fit,
+            see :class:`FitMuellerMatrix`.
 
     Returns:
         Callable[[npt.NDArray, Parameters], Result]:
@@ -257,9 +257,40 @@ class FitRho(FitDecorator):
 
         return np.concatenate((resid_rhor, resid_rhoi))
 
+    def fit_jacobian(
+        self,
+        params: Parameters,
+        lbda: npt.NDArray,
+        rhor: npt.NDArray,
+        rhoi: npt.NDArray,
+    ) -> npt.NDArray:
+        """The Jacobian of the fit function, taken from the derivatives
+        stored in the result of the model.
+
+        Args:
+            params (Parameters):
+                The lmfit fitting Parameters to construct the simulation
+            lbda (npt.NDArray): Wavelengths in nm
+            rhor (npt.NDArray): The real part of the experimental rho
+            rhoi (npt.NDArray): The imaginary part of the experimental rho
+
+        Returns:
+            npt.NDArray:
+                Derivatives of the residual with respect to the varied parameters,
+                with the shape (residuals, parameters)
+        """
+        result = self.model(lbda, params, jacobian=True)
+        d_rho = self.varied_derivatives(params, result, result.rho_jacobian)
+
+        return -np.concatenate((d_rho.real, d_rho.imag), axis=1).T
+
     def fit(self, method="leastsq"):
         """Execute lmfit with the current fitting parameters
 
+        If the decorator was created with ``jacobian=True``, the derivatives
+        returned by ``model(lbda, params, jacobian=True)`` are used as Jacobian
+        by the 'leastsq' and 'least_squares' methods, see :meth:`use_jacobian`.
+
         Args:
             method (str, optional): The fitting method to use.
                                     Any method supported by scipys curve_fit is allowed.
@@ -269,11 +300,18 @@ class FitRho(FitDecorator):
             Result: The fitting result
         """
         rho = calc_rho(self.exp_data)
+        lbda = rho.index.to_numpy()
+
+        kwargs = {}
+        if self.use_jacobian(method):
+            kwargs["Dfun"] = self.fit_jacobian
+
         res = minimize(
             self.fit_function,
             self.params,
-            args=(rho.index.to_numpy(), rho.values.real, rho.values.imag),
+            args=(lbda, rho.values.real, rho.values.imag),
             method=method,
+            **kwargs,
         )
 
         self.fitted_params = res.params
@@ -370,6 +408,7 @@ class FitRho(FitDecorator):
         params: Parameters,
         model: Callable[[npt.NDArray, Parameters], Result],
         angle: float = 70,
+        jacobian: bool = False,
         **kwargs,
     ) -> None:
         """Intialize the psi/delta fitting class
@@ -387,6 +426,12 @@ class FitRho(FitDecorator):
             angle (float, optional): The angle of incident of the measurement.
                                      Used to calculate the Pseudo-Dielectric function.
                                      Defaults to 70.
+            jacobian (bool, optional): Uses the derivatives of the model as Jacobian
+                of the fit. The model then has to accept a keyword argument
+                ``jacobian`` and return the derivatives for all varied parameters,
+                if it is True, e.g. by evaluating an EvaluationPlan with
+                ``jacobian=True``. The derivatives are only calculated for the
+                Jacobian, which is evaluated once per iteration. Defaults to False.
         """
         super().__init__()
         self.model = model
@@ -394,6 +439,7 @@ class FitRho(FitDecorator):
         self.params = params
         self.fitted_params = params.copy()
         self.angle = angle
+        self.jacobian = jacobian
         self.param_widgets = {}
         self.selector = widgets.Dropdown()
         self.last_params = None
@@ -438,6 +484,8 @@ def fit(
         angle (float, optional): The angle of incident of the measurement.
                                  Used to calculate the Pseudo-Dielectric function.
                                  Defaults to 70.
+        **jacobian (bool): Uses the derivatives of the model as Jacobian of the fit,
+            see :class:`FitRho`.
 
     Returns:
         Callable[[npt.NDArray, Parameters], Result]:
@@ -1,15 +1,48 @@
 """This modules creates a formula parser"""
 
-from functools import lru_cache
+from collections import OrderedDict
+from functools import lru_cache, partial
+from hashlib import blake2b
 import os
 from operator import add, mul, neg, sub, truediv
-from typing import Dict
+from typing import Callable, Dict, Tuple
 
 import numpy as np
 import scipy.constants as sc
 from lark import Lark, Transformer, v_args
 from scipy.special import dawsn  # pylint: disable=no-name-in-module
 
+from ..kkr.kkr import _hilbert
+
+#: Ratio of the upper limit of the Kramers-Kronig grid to the highest energy.
+KKR_PADDING = 16
+#: Minimum number of points of the Kramers-Kronig grid.
+KKR_MIN_POINTS = 2**14
+#: Maximum number of points of the Kramers-Kronig grid.
+KKR_MAX_POINTS = 2**20
+#: Number of cached Kramers-Kronig transforms per term.
+KKR_CACHE_SIZE = 8
+
+FUNCTIONS = {
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "sqrt": np.emath.sqrt,
+    "dawsn": dawsn,
+    "ln": np.log,
+    "log": np.log10,
+    "heaviside": lambda x: np.heaviside(x, 0),
+}
+
+BUILTINS = {
+    "1j": 1j,
+    "pi": sc.pi,
+    "eps_0": sc.epsilon_0,
+    "hbar": sc.hbar,
+    "h": sc.h,
+    "c": sc.c,
+}
+
 
 @v_args(inline=True)
 class FormulaTransformer(Transformer):
@@ -89,41 +122,29 @@ class FormulaTransformer(Transformer):
         """Return an index type formula"""
         return "n", inp
 
-    def kkr_term(self, term):
-        """Calculate the kramers kronig transformation on the function"""
-        raise NotImplementedError("kkr transformation not yet implemented")
+    def transform(self, tree):
+        """Transforms the formula tree into its values.
+        Formulas containing a Kramers-Kronig term are evaluated by
+        the :class:`FormulaCompiler`, which needs the term as function."""
+        if any(tree.find_data("kkr_term")):
+            representation, function = FormulaCompiler(self.x_axis_name).transform(tree)
+            return representation, function(
+                self.x_axis_values, self.single_params, self.repeated_params
+            )
+
+        return super().transform(tree)
 
     def func(self, name, val):
         """Evaluates a function"""
-        names = {
-            "sin": np.sin,
-            "cos": np.cos,
-            "tan": np.tan,
-            "sqrt": np.emath.sqrt,
-            "dawsn": dawsn,
-            "ln": np.log,
-            "log": np.log10,
-            "heaviside": np.heaviside,
-        }
-
-        if name in names:
-            return names[name](val)
+        if name in FUNCTIONS:
+            return FUNCTIONS[name](val)
 
         raise ValueError(f"Unknown function: {name}")
 
     def builtin(self, name):
         """Returns the values for builtin tokens"""
-        names = {
-            "1j": 1j,
-            "pi": sc.pi,
-            "eps_0": sc.epsilon_0,
-            "hbar": sc.hbar,
-            "h": sc.h,
-            "c": sc.c,
-        }
-
-        if name in names:
-            return names[name]
+        if name in BUILTINS:
+            return BUILTINS[name]
 
         raise ValueError(f"Unknown constant: {name}")
 
@@ -157,6 +178,237 @@ class FormulaTransformer(Transformer):
         raise ValueError(f"No such parameter {name}")
 
 
+def _is_constant(node) -> bool:
+    return not callable(node)
+
+
+def _apply(operation: Callable, *nodes):
+    """Combines compiled nodes with an operation.
+    Operations on constants are evaluated directly."""
+    if all(_is_constant(node) for node in nodes):
+        return operation(*nodes)
+
+    evaluators = [
+        node if callable(node) else (lambda *_, value=node: value) for node in nodes
+    ]
+    if len(evaluators) == 1:
+        (first,) = evaluators
+        return lambda *env: operation(first(*env))
+
+    first, second = evaluators
+    return lambda *env: operation(first(*env), second(*env))
+
+
+class KramersKronigTerm:
+    """Evaluates the formula term ``<kkr> + 1j * term``,
+    where the real part is the Kramers-Kronig transform of the imaginary part.
+
+    The imaginary part is evaluated on an internal grid, which is uniform in energy.
+    It starts at zero and extends to :data:`KKR_PADDING` times the highest energy
+    of the evaluation, rounded up to a power of two. Hence, the same grid is used
+    for similar wavelength ranges. The transformation is calculated with a fast
+    Fourier transform and linearly interpolated to the evaluated points.
+    The transformed grid is cached for the last :data:`KKR_CACHE_SIZE` parameter sets,
+    so e.g. an evaluation with a changed wavelength range but the same parameters
+    only needs the interpolation.
+
+    As in :mod:`elli.kkr`, the differential formulation is used,
+    i.e. the real part vanishes at infinite energy.
+    """
+
+    def __init__(self, term, reciprocal: bool = True) -> None:
+        """Creates the Kramers-Kronig term.
+
+        Args:
+            term (Callable): Compiled imaginary part of the term.
+            reciprocal (bool, optional): Whether the axis is reciprocal to the energy.
+                Defaults to True.
+        """
+        self.term = term
+        self.reciprocal = reciprocal
+        self._cache = OrderedDict()
+
+    def _evaluate_term(self, x, single_params, repeated_params):
+        if callable(self.term):
+            return self.term(x, single_params, repeated_params)
+        return np.full(np.shape(x), self.term)
+
+    @staticmethod
+    def _grid(energy: np.ndarray) -> Tuple[float, int]:
+        """Returns the step size and number of points of the internal grid."""
+        if not np.all(energy > 0):
+            raise ValueError("The Kramers-Kronig term needs a positive axis.")
+
+        upper = KKR_PADDING * 2.0 ** np.ceil(np.log2(energy.max()))
+        points = 2 ** int(np.ceil(np.log2(16 * upper / energy.min())))
+        points = min(max(points, KKR_MIN_POINTS), KKR_MAX_POINTS)
+
+        return upper / points, points
+
+    @staticmethod
+    def _parameter_digest(single_params, repeated_params) -> bytes:
+        """Returns a digest of the parameter values."""
+        digest = blake2b(digest_size=16)
+        for params in (single_params, repeated_params):
+            for name in sorted(params):
+                value = np.asarray(getattr(params[name], "value", params[name]))
+                digest.update(f"{name}{value.shape}{value.dtype}".encode())
+                digest.update(np.ascontiguousarray(value).data)
+        return digest.digest()
+
+    def __call__(self, x, single_params, repeated_params):
+        x = np.asarray(x, dtype=float)
+        energy = 1 / x if self.reciprocal else x
+        step, points = self._grid(energy)
+
+        key = (step, points, self._parameter_digest(single_params, repeated_params))
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            real = self._cache[key]
+        else:
+            grid = (np.arange(points) + 0.5) * step
+            real = _hilbert(
+                self._evaluate_term(
+                    1 / grid if self.reciprocal else grid,
+                    single_params,
+                    repeated_params,
+                )
+            )
+            self._cache[key] = real
+            if len(self._cache) > KKR_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+        position = energy / step - 0.5
+        index = np.clip(np.floor(position).astype(int), 0, points - 2)
+        fraction = position - index
+
+        return (
+            real[..., index] * (1 - fraction)
+            + real[..., index + 1] * fraction
+            + 1j * self._evaluate_term(x, single_params, repeated_params)
+        )
+
+
+@v_args(inline=True)
+class FormulaCompiler(Transformer):
+    """Transformer class compiling a formula into a python function.
+
+    Every node of the syntax tree is transformed into a closure, which takes
+    the wavelength axis, the single and the repeated parameters.
+    Constant sub-expressions are evaluated during the compilation.
+    The compiled function is reused for all evaluations of the formula.
+
+    Args:
+        x_axis_name (str): Name of the wavelength axis in the formula.
+        reciprocal (bool, optional): Whether the axis is reciprocal to the energy,
+            i.e. a wavelength, which is needed for Kramers-Kronig terms.
+            Defaults to True.
+    """
+
+    def __init__(self, x_axis_name: str, reciprocal: bool = True):
+        super().__init__()
+        if not isinstance(x_axis_name, str):
+            raise TypeError("x_axis_name must be a string.")
+        self.x_axis_name = x_axis_name
+        self.reciprocal = reciprocal
+
+    def number(self, value):
+        """Return a number constant"""
+        return float(value)
+
+    def add(self, left, right):
+        """Add two expressions"""
+        return _apply(add, left, right)
+
+    def sub(self, left, right):
+        """Subtract two expressions"""
+        return _apply(sub, left, right)
+
+    def mul(self, left, right):
+        """Multiply two expressions"""
+        return _apply(mul, left, right)
+
+    def div(self, left, right):
+        """Divide two expressions"""
+        return _apply(truediv, left, right)
+
+    def neg(self, value):
+        """Negate an expression"""
+        return _apply(neg, value)
+
+    def power(self, base, exponent):
+        """Raise an expression to a power"""
+        return _apply(pow, base, exponent)
+
+    def eps(self, inp):
+        """Return an epsilon type formula"""
+        return "eps", inp
+
+    # pylint: disable=invalid-name
+    def n(self, inp):
+        """Return an index type formula"""
+        return "n", inp
+
+    def kkr_term(self, term):
+        """Calculate the kramers kronig transformation on the function"""
+        return KramersKronigTerm(term, self.reciprocal)
+
+    def func(self, name, val):
+        """Evaluates a function"""
+        if name in FUNCTIONS:
+            return _apply(FUNCTIONS[name], val)
+
+        raise ValueError(f"Unknown function: {name}")
+
+    def builtin(self, name):
+        """Returns the values for builtin tokens"""
+        if name in BUILTINS:
+            return BUILTINS[name]
+
+        raise ValueError(f"Unknown constant: {name}")
+
+    def sum_expr(self, expr):
+        """Sum an expression over all repeated parameter sets"""
+        return _apply(partial(np.sum, axis=-1), expr)
+
+    def single_param_name(self, name):
+        """Return a parameter inside a non-repeated section"""
+        name = str(name)
+        if name == self.x_axis_name:
+            return lambda x, *_: x
+
+        def evaluate(_, single_params, __):
+            if name in single_params:
+                return single_params[name]
+            raise ValueError(f"No such parameter {name}")
+
+        return evaluate
+
+    def param_name(self, name):
+        """Return a parameter inside a repeated section"""
+        name = str(name)
+        if name == self.x_axis_name:
+
+            def evaluate_axis(x, _, repeated_params):
+                no_repeated_params = (
+                    next(iter(repeated_params.values())).shape[-1]
+                    if repeated_params
+                    else 0
+                )
+                return np.expand_dims(x, -1) * np.ones(no_repeated_params)
+
+            return evaluate_axis
+
+        def evaluate(_, single_params, repeated_params):
+            if name in single_params:
+                return np.expand_dims(single_params[name], -1)
+            if name in repeated_params:
+                return repeated_params[name]
+            raise ValueError(f"No such parameter {name}")
+
+        return evaluate
+
+
 __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 
 with open(
@@ -182,3 +434,30 @@ def parse_formula(formula: str):
         Lark.Tree: The parsed formula Tree.
     """
     return grammar.parse(formula)
+
+
+@lru_cache(maxsize=128)
+def compile_formula(
+    formula: str, x_axis_name: str, reciprocal: bool = True
+) -> Callable:
+    """
+    Compiles a dispersion formula string into a function.
+    Uses caching to avoid re-compilation of the formula.
+
+    Args:
+        formula (str): The formula string to compile.
+        x_axis_name (str): Name of the wavelength axis in the formula.
+        reciprocal (bool, optional): Whether the axis is reciprocal to the energy,
+            i.e. a wavelength, which is needed for Kramers-Kronig terms.
+            Defaults to True.
+
+    Returns:
+        Callable: Function taking the wavelength axis, a dict of the single parameters
+            and a dict of the repeated parameter arrays. It returns the dispersion values.
+    """
+    _, function = FormulaCompiler(x_axis_name, reciprocal).transform(
+        parse_formula(formula)
+    )
+    if callable(function):
+        return function
+    return lambda *_: function
@@ -22,16 +22,41 @@ as it suffers from major uncertanties.
 Hence, this transformation is included in pyElli only for completeness and for the
 special cases it may be applicable.
 
+Two methods are available for all transformations.
+The default method ``"maclaurin"`` evaluates Maclaurin's formula directly.
+It scales quadratically with the number of points, but is calculated in chunks
+of at most :data:`MACLAURIN_CHUNK_ELEMENTS` matrix elements to bound the memory.
+The method ``"fft"`` interpolates the spectrum onto a uniform energy grid,
+which is zero-padded to :data:`FFT_PADDING` times the highest energy,
+and calculates the Hilbert transform with a fast Fourier transform in
+:math:`O(n \log n)`. The spectrum is assumed to be zero outside of the given range,
+optionally tapered by a Tukey window of relative width :data:`FFT_WINDOW`.
+Its accuracy depends on a dense sampling of the energy axis,
+so it is best suited for large spectra on (nearly) uniform energy axes.
+
 .. rubric:: References
 
 .. [1] Ohta and Ishida, Appl. Spectroscopy 42, 952 (1988), https://doi.org/10.1366/0003702884430380
 """
 
 # pylint: disable=invalid-name
-from typing import Callable
+from typing import Callable, Literal, Optional
 
 import numpy as np
 
+#: Maximum number of matrix elements calculated at once by the Maclaurin method.
+MACLAURIN_CHUNK_ELEMENTS = 2**22
+#: Ratio of the upper limit of the fft grid to the highest energy of the spectrum.
+FFT_PADDING = 4
+#: Ratio of the smallest energy step of the spectrum to the step of the fft grid.
+FFT_OVERSAMPLING = 2
+#: Maximum number of points of the fft grid.
+FFT_MAX_POINTS = 2**20
+#: Relative width of the Tukey window applied to the spectrum by the fft method.
+FFT_WINDOW = 0.0
+
+Method = Literal["maclaurin", "fft"]
+
 
 def _integrate_im(im: np.ndarray, x: np.ndarray, x_i: np.ndarray) -> np.ndarray:
     """Calculate the discrete imaginary sum (integral) for the kkr.
@@ -98,10 +123,63 @@ def _integrate_re_reciprocal(
     return np.sum(re / (x_i - x * x / x_i), axis=1)
 
 
+def _hilbert(values: np.ndarray, odd: bool = True) -> np.ndarray:
+    r"""Calculates the differential Kramers-Kronig relation with a fast Fourier transform.
+
+    The values are sampled on the uniform grid :math:`x_k = (k + 1/2) \Delta x`
+    for :math:`k = 0, \dots, n - 1`. They are continued as odd (imaginary part) or
+    even (real part) function to negative :math:`x` and zero-padded to twice the length
+    to suppress the periodic images of the discrete transform.
+    The Hilbert transform is then a multiplication with :math:`i \operatorname{sign}(f)`
+    in the frequency domain, which scales with :math:`O(n \log n)`.
+
+    Args:
+        values (numpy.ndarray): The values on the grid.
+            The grid is expected along the last axis.
+        odd (bool, optional): Whether the values are continued as odd function,
+            i.e. for a transformation from the imaginary to the real part.
+            Defaults to True.
+
+    Returns:
+        numpy.ndarray: The transformed values on the grid.
+    """
+    if np.iscomplexobj(values):
+        return _hilbert(values.real, odd) + 1j * _hilbert(values.imag, odd)
+
+    n = values.shape[-1]
+    mirrored = -values[..., ::-1] if odd else values[..., ::-1]
+    spectrum = np.fft.rfft(
+        np.concatenate([mirrored, values], axis=-1), n=4 * n, axis=-1
+    )
+    spectrum[..., 0] = 0
+    spectrum[..., -1] = 0
+    spectrum *= 1j
+
+    return np.fft.irfft(spectrum, n=4 * n, axis=-1)[..., n : 2 * n]
+
+
+def _check_axes(t: np.ndarray, x: np.ndarray) -> None:
+    """Checks the axes of a transformation.
+
+    Args:
+        t (numpy.ndarray): The y-axis on which to transform.
+        x (numpy.ndarray): The x-axis on which to transform.
+
+    Raises:
+        ValueError: y and x axis must have the same length.
+    """
+    if len(t) != len(x):
+        raise ValueError(
+            "y- and x-axes arrays must have the same length, "
+            f"but have lengths {len(t)} and {len(x)}."
+        )
+
+
 def _calc_kkr(
     t: np.ndarray,
     x: np.ndarray,
     trafo: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray],
+    chunk_size: Optional[int] = None,
 ) -> np.ndarray:
     """Calculates the Kramers-Kronig relation
     according to Maclaurin's formula.
@@ -111,6 +189,9 @@ def _calc_kkr(
         x (numpy.ndarray): The x-axis on which to transform.
         trafo (Callable[[numpy.ndarray, numpy.ndarray, numpy.ndarray], numpy.ndarray]):
             The transformation function.
+        chunk_size (Optional[int], optional): Number of points transformed at once.
+            Defaults to None, which limits the chunks to
+            :data:`MACLAURIN_CHUNK_ELEMENTS` matrix elements.
 
     Raises:
         ValueError: y and x axis must have the same length.
@@ -118,33 +199,116 @@ def _calc_kkr(
     Returns:
         np.ndarray: The kkr transformed y-axis
     """
+    _check_axes(t, x)
 
-    if len(t) != len(x):
-        raise ValueError(
-            "y- and x-axes arrays must have the same length, "
-            f"but have lengths {len(t)} and {len(x)}."
-        )
+    if chunk_size is None:
+        chunk_size = max(MACLAURIN_CHUNK_ELEMENTS // max(len(x) // 2, 1), 1)
 
-    integral = np.empty(len(t))
+    integral = np.empty(len(t), dtype=np.result_type(t, float))
     interval = np.diff(x, prepend=x[1] - x[0])
-    odd_slice = slice(1, None, 2)
-    even_slice = slice(0, None, 2)
 
-    integral[even_slice] = trafo(
-        t[np.newaxis, odd_slice],
-        x[np.newaxis, odd_slice],
-        x[even_slice, np.newaxis],
-    )
-    integral[odd_slice] = trafo(
-        t[np.newaxis, even_slice],
-        x[np.newaxis, even_slice],
-        x[odd_slice, np.newaxis],
-    )
+    # Points of even index are integrated over the odd points and vice versa
+    for start, source in ((0, slice(1, None, 2)), (1, slice(0, None, 2))):
+        for chunk_start in range(start, len(x), 2 * chunk_size):
+            chunk = slice(chunk_start, chunk_start + 2 * chunk_size, 2)
+            integral[chunk] = trafo(
+                t[np.newaxis, source],
+                x[np.newaxis, source],
+                x[chunk, np.newaxis],
+            )
 
     return 4 / np.pi * interval * integral
 
 
-def re2im(re: np.ndarray, x: np.ndarray) -> np.ndarray:
+def _calc_kkr_fft(
+    t: np.ndarray, x: np.ndarray, odd: bool, reciprocal: bool
+) -> np.ndarray:
+    """Calculates the Kramers-Kronig relation with a fast Fourier transform.
+
+    Args:
+        t (numpy.ndarray): The y-axis on which to transform.
+        x (numpy.ndarray): The x-axis on which to transform.
+        odd (bool): Whether the transformation is from the imaginary to the real part.
+        reciprocal (bool): Whether the x-axis is reciprocal to the energy.
+
+    Raises:
+        ValueError: y and x axis must have the same length.
+        ValueError: The x-axis must be positive.
+
+    Returns:
+        np.ndarray: The kkr transformed y-axis
+    """
+    _check_axes(t, x)
+
+    x = np.asarray(x, dtype=float)
+    if not np.all(x > 0):
+        raise ValueError("The x-axis must be positive for the fft method.")
+
+    energy = 1 / x if reciprocal else x
+    order = np.argsort(energy)
+    energy_sorted = energy[order]
+    t_sorted = np.asarray(t)[order]
+
+    upper = FFT_PADDING * energy_sorted[-1]
+    steps = np.diff(energy_sorted)
+    step = np.min(steps[steps > 0], initial=upper) / FFT_OVERSAMPLING
+    points = min(2 ** int(np.ceil(np.log2(upper / step))), FFT_MAX_POINTS)
+    grid = (np.arange(points) + 0.5) * upper / points
+
+    values = np.interp(grid, energy_sorted, t_sorted.real, left=0, right=0)
+    if np.iscomplexobj(t_sorted):
+        values = values + 1j * np.interp(
+            grid, energy_sorted, t_sorted.imag, left=0, right=0
+        )
+
+    if FFT_WINDOW > 0:
+        position = (grid - energy_sorted[0]) / (energy_sorted[-1] - energy_sorted[0])
+        edge = np.clip(np.minimum(position, 1 - position) / (FFT_WINDOW / 2), 0, 1)
+        values = values * (1 - np.cos(np.pi * edge)) / 2
+
+    return np.interp(energy, grid, _hilbert(values.real, odd)) + (
+        1j * np.interp(energy, grid, _hilbert(values.imag, odd))
+        if np.iscomplexobj(values)
+        else 0
+    )
+
+
+def _kkr(
+    t: np.ndarray,
+    x: np.ndarray,
+    method: Method,
+    trafo: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray],
+    odd: bool,
+    reciprocal: bool,
+) -> np.ndarray:
+    """Calculates the Kramers-Kronig relation with the selected method.
+
+    Args:
+        t (numpy.ndarray): The y-axis on which to transform.
+        x (numpy.ndarray): The x-axis on which to transform.
+        method (Method): The method of the transformation, "maclaurin" or "fft".
+        trafo (Callable[[numpy.ndarray, numpy.ndarray, numpy.ndarray], numpy.ndarray]):
+            The transformation function of Maclaurin's formula.
+        odd (bool): Whether the transformation is from the imaginary to the real part.
+        reciprocal (bool): Whether the x-axis is reciprocal to the energy.
+
+    Raises:
+        ValueError: Unknown method.
+
+    Returns:
+        np.ndarray: The kkr transformed y-axis
+    """
+    if method == "maclaurin":
+        return _calc_kkr(t, x, trafo)
+    if method == "fft":
+        return _calc_kkr_fft(t, x, odd, reciprocal)
+
+    raise ValueError(
+        f"Unknown method `{method}`, it has to be either 'maclaurin' or 'fft'."
+    )
+
+
+def re2im(re: np.ndarray, x: np.ndarray, method: Method = "maclaurin") -> np.ndarray:
     r"""Calculates the differential Kramers-Kronig relation from the
     real to imaginary part
     according to Maclaurin's formula.
@@ -158,15 +322,17 @@ def re2im(re: np.ndarray, x: np.ndarray) -> np.ndarray:
     Args:
         re (numpy.ndarray): The real values to transform.
         x (numpy.ndarray): The axis on which to transform.
+        method (Method, optional): The method of the transformation,
+            "maclaurin" or "fft". Defaults to "maclaurin".
 
     Returns:
         numpy.ndarray: The transformed imaginary part.
     """
 
-    return _calc_kkr(re, x, _integrate_re)
+    return _kkr(re, x, method, _integrate_re, odd=False, reciprocal=False)
 
 
-def im2re(im: np.ndarray, x: np.ndarray) -> np.ndarray:
+def im2re(im: np.ndarray, x: np.ndarray, method: Method = "maclaurin") -> np.ndarray:
     r"""Calculates the differential Kramers-Kronig relation from the
     imaginary to real part
     according to Maclaurin's formula.
@@ -180,15 +346,19 @@ def im2re(im: np.ndarray, x: np.ndarray) -> np.ndarray:
     Args:
         im (numpy.ndarray): The imaginary values to transform.
         x (numpy.ndarray): The axis on which to transform.
+        method (Method, optional): The method of the transformation,
+            "maclaurin" or "fft". Defaults to "maclaurin".
 
     Returns:
         numpy.ndarray: The transformed real part.
     """
 
-    return _calc_kkr(im, x, _integrate_im)
+    return _kkr(im, x, method, _integrate_im, odd=True, reciprocal=False)
 
 
-def re2im_reciprocal(re: np.ndarray, x: np.ndarray) -> np.ndarray:
+def re2im_reciprocal(
+    re: np.ndarray, x: np.ndarray, method: Method = "maclaurin"
+) -> np.ndarray:
     r"""Calculates the differential Kramers-Kronig relation from the
     real to imaginary part
     according to Maclaurin's formula.
@@ -203,15 +373,19 @@ def re2im_reciprocal(re: np.ndarray, x: np.ndarray) -> np.ndarray:
     Args:
         re (numpy.ndarray): The real values to transform.
         x (numpy.ndarray): The reciprocal axis on which to transform.
+        method (Method, optional): The method of the transformation,
+            "maclaurin" or "fft". Defaults to "maclaurin".
 
     Returns:
         numpy.ndarray: The transformed imaginary part.
     """
 
-    return _calc_kkr(re, x, _integrate_re_reciprocal)
+    return _kkr(re, x, method, _integrate_re_reciprocal, odd=False, reciprocal=True)
 
 
-def im2re_reciprocal(im: np.ndarray, x: np.ndarray) -> np.ndarray:
+def im2re_reciprocal(
+    im: np.ndarray, x: np.ndarray, method: Method = "maclaurin"
+) -> np.ndarray:
     r"""Calculates the differential Kramers-Kronig relation from the
     imaginary to real part
     according to Maclaurin's formula.
@@ -226,9 +400,11 @@ def im2re_reciprocal(im: np.ndarray, x: np.ndarray) -> np.ndarray:
     Args:
         im (numpy.ndarray): The imaginary values to transform.
         x (numpy.ndarray): The reciprocal axis on which to transform.
+        method (Method, optional): The method of the transformation,
+            "maclaurin" or "fft". Defaults to "maclaurin".
 
     Returns:
         numpy.ndarray: The transformed real part.
     """
 
-    return _calc_kkr(im, x, _integrate_im_reciprocal)
+    return _kkr(im, x, method, _integrate_im_reciprocal, odd=True, reciprocal=True)
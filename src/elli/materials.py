@@ -18,6 +18,12 @@ book 'Spectroscopic Ellipsometry' [1]_.
 Additionally two materials can be combined via various :ref:'Effective medium approximations',
 to create mixtures or account for interface roughness.
 
+Every material carries a tag of the structure of its permittivity tensor
+(:attr:`Material.tensor_form`), which is either ``"isotropic"``, ``"diagonal"`` or ``"full"``.
+The compact form of the tensor (:meth:`Material.get_compact_tensor`) only contains
+the independent components and is kept through the effective medium approximations,
+so isotropic and unrotated materials are evaluated without the zero components.
+
 .. rubric:: References
 
 .. [1] H. Fujiwara,
@@ -28,6 +34,7 @@ to create mixtures or account for interface roughness.
 """
 
 from abc import ABC, abstractmethod
+from typing import Literal, Tuple
 
 import numpy as np
 import numpy.typing as npt
@@ -36,9 +43,59 @@ from numpy.lib.scimath import sqrt, power
 from .dispersions.base_dispersion import BaseDispersion
 
 
+TensorForm = Literal["isotropic", "diagonal", "full"]
+TENSOR_FORMS = ("isotropic", "diagonal", "full")
+
+
+def widest_tensor_form(*forms: TensorForm) -> TensorForm:
+    """Returns the most general of the given tensor forms.
+
+    Args:
+        forms (TensorForm): Tensor forms to combine.
+
+    Returns:
+        TensorForm: The form which can represent all given forms.
+    """
+    return TENSOR_FORMS[max(TENSOR_FORMS.index(form) for form in forms)]
+
+
+def convert_tensor(
+    epsilon: npt.NDArray, form: TensorForm, target: TensorForm
+) -> npt.NDArray:
+    """Converts a compact permittivity tensor into a more general form.
+
+    The compact forms have the trailing shape (1,) for isotropic,
+    (3,) for diagonal and (3, 3) for full tensors.
+
+    Args:
+        epsilon (npt.NDArray): Compact permittivity tensor.
+        form (TensorForm): Form of the given tensor.
+        target (TensorForm): Form to convert to, which has to be at least as general.
+
+    Returns:
+        npt.NDArray: Permittivity tensor in the target form.
+    """
+    if form == target or form == "full":
+        return epsilon
+
+    if target == "diagonal":
+        return np.broadcast_to(epsilon, epsilon.shape[:-1] + (3,))
+
+    tensor = np.zeros(epsilon.shape[:-1] + (3, 3), dtype=np.complex128)
+    diagonal = np.arange(3)
+    tensor[..., diagonal, diagonal] = epsilon
+    return tensor
+
+
 class Material(ABC):
     """Base class for materials (abstract class)."""
 
+    @property
+    def tensor_form(self) -> TensorForm:
+        """Structure of the permittivity tensor of the material:
+        "isotropic", "diagonal" or "full"."""
+        return "full"
+
     @abstractmethod
     def get_tensor(self, lbda: npt.ArrayLike) -> npt.NDArray:
         """Gets the permittivity tensor of the material for wavelength 'lbda'.
@@ -50,6 +107,18 @@ class Material(ABC):
             npt.NDArray: Permittivity tensor.
         """
 
+    def get_compact_tensor(self, lbda: npt.ArrayLike) -> npt.NDArray:
+        """Gets the permittivity tensor of the material for wavelength 'lbda'
+        in the compact form given by :attr:`tensor_form`, see :func:`convert_tensor`.
+
+        Args:
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+
+        Returns:
+            npt.NDArray: Compact permittivity tensor.
+        """
+        return self.get_tensor(lbda)
+
     def get_refractive_index(self, lbda: npt.ArrayLike) -> npt.NDArray:
         """Gets the refractive index tensor for wavelength 'lbda'.
 
@@ -85,35 +154,63 @@ class SingleMaterial(Material):
         self.rotated = True
         self.rotation_matrix = r
 
-    def get_tensor(self, lbda: npt.ArrayLike) -> npt.NDArray:
-        """Gets the permittivity tensor of the material for wavelength 'lbda'.
+    @property
+    def tensor_form(self) -> TensorForm:
+        """Structure of the permittivity tensor of the material:
+        "isotropic", "diagonal" or "full".
+
+        Materials with the same dispersion in all directions are isotropic,
+        also if they are rotated. Other materials are diagonal, unless they are rotated.
+        """
+        if self.dispersion_x is self.dispersion_y is self.dispersion_z:
+            return "isotropic"
+        if self.rotated:
+            return "full"
+        return "diagonal"
+
+    def get_compact_tensor(self, lbda: npt.ArrayLike) -> npt.NDArray:
+        """Gets the permittivity tensor of the material for wavelength 'lbda'
+        in the compact form given by :attr:`tensor_form`, see :func:`convert_tensor`.
 
         Args:
             lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
 
         Returns:
-            npt.NDArray: Permittivity tensor.
+            npt.NDArray: Compact permittivity tensor.
         """
-        # Check for shape of lbda
-        shape = np.shape(lbda)
-        if shape == ():
-            length = 1
-        else:
-            length = shape[0]
-
-        # create empty tensor
-        epsilon = np.zeros((length, 3, 3), dtype=np.complex128)
+        form = self.tensor_form
 
         # get get dielectric functions from dispersion
-        epsilon[:, 0, 0] = self.dispersion_x.get_dielectric(lbda)
-        epsilon[:, 1, 1] = self.dispersion_y.get_dielectric(lbda)
-        epsilon[:, 2, 2] = self.dispersion_z.get_dielectric(lbda)
+        dispersions = [self.dispersion_x]
+        if form != "isotropic":
+            dispersions += [self.dispersion_y, self.dispersion_z]
+        eps = [np.atleast_1d(d._cached_dielectric(lbda)) for d in dispersions]
+
+        # dispersion parameters may add leading batch axes
+        shape = np.broadcast_shapes(
+            np.shape(np.atleast_1d(lbda)), *[np.shape(e) for e in eps]
+        )
+        epsilon = np.empty(shape + (len(eps),), dtype=np.complex128)
+        for i, e in enumerate(eps):
+            epsilon[..., i] = e
 
-        if self.rotated:
+        if form == "full":
+            epsilon = convert_tensor(epsilon, "diagonal", "full")
             epsilon = self.rotation_matrix @ epsilon @ self.rotation_matrix.T
 
         return epsilon
 
+    def get_tensor(self, lbda: npt.ArrayLike) -> npt.NDArray:
+        """Gets the permittivity tensor of the material for wavelength 'lbda'.
+
+        Args:
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+
+        Returns:
+            npt.NDArray: Permittivity tensor.
+        """
+        return convert_tensor(self.get_compact_tensor(lbda), self.tensor_form, "full")
+
 
 class IsotropicMaterial(SingleMaterial):
     """Isotropic material."""
@@ -277,7 +374,92 @@ class MixtureMaterial(Material):
 
         self.fraction = fraction
 
+    @property
+    def tensor_form(self) -> TensorForm:
+        """Structure of the permittivity tensor of the mixture,
+        which is the most general form of both constituents."""
+        return widest_tensor_form(
+            self.host_material.tensor_form, self.guest_material.tensor_form
+        )
+
     @abstractmethod
+    def mix(
+        self, e_h: npt.NDArray, e_g: npt.NDArray, fraction: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Calculates the effective permittivity of the mixture component-wise.
+
+        Args:
+            e_h (npt.NDArray): Compact permittivity tensor of the host material.
+            e_g (npt.NDArray): Compact permittivity tensor of the guest material,
+                in the same form as the host tensor.
+            fraction (npt.ArrayLike): Fraction of the guest material (Range 0 - 1),
+                broadcastable to the tensors.
+
+        Returns:
+            npt.NDArray: Compact effective permittivity tensor.
+        """
+
+    def get_compact_tensor_fraction(
+        self, lbda: npt.ArrayLike, fraction: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Gets the permittivity tensor of the material for wavelength 'lbda'
+        in the compact form given by :attr:`tensor_form`, while overwriting the set fraction.
+
+        Args:
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+            fraction (npt.ArrayLike): Fraction of the guest material used for evaluation
+                (Range 0 - 1), broadcastable to the compact tensor.
+
+        Returns:
+            npt.NDArray: Compact permittivity tensor.
+        """
+        return self.mix(*self.get_compact_constituents(lbda), fraction)
+
+    def get_compact_constituents(
+        self, lbda: npt.ArrayLike
+    ) -> Tuple[npt.NDArray, npt.NDArray]:
+        """Gets the permittivity tensors of the host and guest material
+        in the common compact form of the mixture given by :attr:`tensor_form`.
+
+        Args:
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray]: Compact tensors of the host and guest material.
+        """
+        form = self.tensor_form
+        e_h = convert_tensor(
+            self.host_material.get_compact_tensor(lbda),
+            self.host_material.tensor_form,
+            form,
+        )
+        e_g = convert_tensor(
+            self.guest_material.get_compact_tensor(lbda),
+            self.guest_material.tensor_form,
+            form,
+        )
+        return e_h, e_g
+
+    def get_tensor_fractions(
+        self, lbda: npt.ArrayLike, fractions: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Gets the permittivity tensors of the material for wavelength 'lbda'
+        for a sequence of fractions, e.g. for the slices of a VaryingMixtureLayer.
+        The constituents are evaluated only once and mixed for all fractions in one broadcast.
+
+        Args:
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+            fractions (npt.ArrayLike): 1d array of fractions of the guest material (Range 0 - 1).
+
+        Returns:
+            npt.NDArray: Stack of permittivity tensors with a leading fraction axis.
+        """
+        e_h, e_g = self.get_compact_constituents(lbda)
+        fractions = np.asarray(fractions, dtype=float).reshape(
+            (-1,) + (1,) * max(e_h.ndim, e_g.ndim)
+        )
+        return convert_tensor(self.mix(e_h, e_g, fractions), self.tensor_form, "full")
+
     def get_tensor_fraction(self, lbda: npt.ArrayLike, fraction: float) -> npt.NDArray:
         """Gets the permittivity tensor of the material for wavelength 'lbda',
         while overwriting the set fraction. Used in VaryingMixtureLayers.
@@ -289,6 +471,27 @@ class MixtureMaterial(Material):
         Returns:
             npt.NDArray: Permittivity tensor.
         """
+        return convert_tensor(
+            self.get_compact_tensor_fraction(lbda, fraction), self.tensor_form, "full"
+        )
+
+    def get_compact_tensor(self, lbda: npt.ArrayLike) -> npt.NDArray:
+        """Gets the permittivity tensor of the material for wavelength 'lbda'
+        in the compact form given by :attr:`tensor_form`, see :func:`convert_tensor`.
+
+        Args:
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+
+        Returns:
+            npt.NDArray: Compact permittivity tensor.
+        """
+        fraction = self.fraction
+        if np.ndim(fraction) > 0:
+            # Batched fractions broadcast against the wavelength axis of the tensor
+            trailing = 2 if self.tensor_form == "full" else 1
+            fraction = np.asarray(fraction)[(...,) + (np.newaxis,) * trailing]
+
+        return self.get_compact_tensor_fraction(lbda, fraction)
 
     def get_tensor(self, lbda: npt.ArrayLike) -> npt.NDArray:
         """Gets the permittivity tensor of the material for wavelength 'lbda'.
@@ -299,7 +502,7 @@ class MixtureMaterial(Material):
         Returns:
             npt.NDArray: Permittivity tensor.
         """
-        return self.get_tensor_fraction(lbda, self.fraction)
+        return convert_tensor(self.get_compact_tensor(lbda), self.tensor_form, "full")
 
 
 class VCAMaterial(MixtureMaterial):
@@ -316,22 +519,20 @@ class VCAMaterial(MixtureMaterial):
     * :math:`f` is the volume fraction of the guest in the host material.
     """
 
-    def get_tensor_fraction(self, lbda: npt.ArrayLike, fraction: float) -> npt.NDArray:
-        """Gets the permittivity tensor of the marterial for wavelength 'lbda',
-        while overwriting the set fraction.
+    def mix(
+        self, e_h: npt.NDArray, e_g: npt.NDArray, fraction: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Calculates the effective permittivity of the mixture component-wise.
 
         Args:
-            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
-            fraction (float): Fraction of the guest material used for evaluation. (Range 0 - 1).
+            e_h (npt.NDArray): Compact permittivity tensor of the host material.
+            e_g (npt.NDArray): Compact permittivity tensor of the guest material.
+            fraction (npt.ArrayLike): Fraction of the guest material (Range 0 - 1).
 
         Returns:
-            npt.NDArray: Permittivity tensor.
+            npt.NDArray: Compact effective permittivity tensor.
         """
-        epsilon = (
-            self.host_material.get_tensor(lbda) * (1 - fraction)
-            + self.guest_material.get_tensor(lbda) * fraction
-        )
-        return epsilon
+        return e_h * (1 - fraction) + e_g * fraction
 
 
 class LooyengaEMA(MixtureMaterial):
@@ -352,22 +553,20 @@ class LooyengaEMA(MixtureMaterial):
         Looyenga, H. (1965). Physica, 31(3), 401–406.
     """
 
-    def get_tensor_fraction(self, lbda: npt.ArrayLike, fraction: float) -> npt.NDArray:
-        """Gets the permittivity tensor of the material for wavelength 'lbda',
-        while overwriting the set fraction.
+    def mix(
+        self, e_h: npt.NDArray, e_g: npt.NDArray, fraction: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Calculates the effective permittivity of the mixture component-wise.
 
         Args:
-            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
-            fraction (float): Fraction of the guest material used for evaluation. (Range 0 - 1).
+            e_h (npt.NDArray): Compact permittivity tensor of the host material.
+            e_g (npt.NDArray): Compact permittivity tensor of the guest material.
+            fraction (npt.ArrayLike): Fraction of the guest material (Range 0 - 1).
 
         Returns:
-            npt.NDArray: Permittivity tensor.
+            npt.NDArray: Compact effective permittivity tensor.
         """
-        epsilon = (
-            self.host_material.get_tensor(lbda) ** (1 / 3) * (1 - fraction)
-            + self.guest_material.get_tensor(lbda) ** (1 / 3) * fraction
-        ) ** 3
-        return epsilon
+        return (e_h ** (1 / 3) * (1 - fraction) + e_g ** (1 / 3) * fraction) ** 3
 
 
 class MaxwellGarnettEMA(MixtureMaterial):
@@ -387,20 +586,19 @@ class MaxwellGarnettEMA(MixtureMaterial):
     * :math:`f` is the volume fraction of the guest in the host material.
     """
 
-    def get_tensor_fraction(self, lbda: npt.ArrayLike, fraction: float) -> npt.NDArray:
-        """Gets the permittivity tensor of the material for wavelength 'lbda',
-        while overwriting the set fraction.
+    def mix(
+        self, e_h: npt.NDArray, e_g: npt.NDArray, fraction: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Calculates the effective permittivity of the mixture component-wise.
 
         Args:
-            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
-            fraction (float): Fraction of the guest material used for evaluation. (Range 0 - 1).
+            e_h (npt.NDArray): Compact permittivity tensor of the host material.
+            e_g (npt.NDArray): Compact permittivity tensor of the guest material.
+            fraction (npt.ArrayLike): Fraction of the guest material (Range 0 - 1).
 
         Returns:
-            npt.NDArray: Permittivity tensor.
+            npt.NDArray: Compact effective permittivity tensor.
         """
-        e_h = self.host_material.get_tensor(lbda)
-        e_g = self.guest_material.get_tensor(lbda)
-
         # Catch calculation warnings
         old_settings = np.geterr()
         np.seterr(invalid="ignore")
@@ -438,26 +636,26 @@ class BruggemanEMA(MixtureMaterial):
         * Ph.J. Rouseel; J. Vanhellemont; H.E. Maes. (1993) Thin Solid Films, 234, 423-427
     """
 
-    def get_tensor_fraction(self, lbda: npt.ArrayLike, fraction: float) -> npt.NDArray:
-        """Gets the permittivity tensor of the material for wavelength 'lbda',
-        while overwriting the set fraction.
+    def mix(
+        self, e_h: npt.NDArray, e_g: npt.NDArray, fraction: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Calculates the effective permittivity of the mixture component-wise.
 
         Args:
-            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
-            fraction (float): Fraction of the guest material used for evaluation. (Range 0 - 1).
+            e_h (npt.NDArray): Compact permittivity tensor of the host material.
+            e_g (npt.NDArray): Compact permittivity tensor of the guest material.
+            fraction (npt.ArrayLike): Fraction of the guest material (Range 0 - 1).
 
         Returns:
-            npt.NDArray: Permittivity tensor.
+            npt.NDArray: Compact effective permittivity tensor.
         """
-        e_h = self.host_material.get_tensor(lbda)
-        e_g = self.guest_material.get_tensor(lbda)
-        f = fraction
+        e_h, e_g, f = np.broadcast_arrays(e_h, e_g, fraction)
 
         mask_equal = np.nonzero(np.equal(e_h, e_g))
         mask_different = np.nonzero(np.not_equal(e_h, e_g))
 
         p = sqrt(e_h[mask_different]) / sqrt(e_g[mask_different])
-        b = 0.25 * ((3 * f - 1) * (1 / p - p) + p)
+        b = 0.25 * ((3 * f[mask_different] - 1) * (1 / p - p) + p)
         z = b + sqrt(power(b, 2) + 0.5)
 
         e_mix = np.full_like(e_h, np.nan)
@@ -0,0 +1,552 @@
+# Encoding: utf-8
+"""An evaluation plan is a compiled version of a structure for a fixed experiment.
+
+It is created by :meth:`Structure.compile<elli.structure.Structure.compile>`
+and intended for the repeated evaluation of a structure, e.g. in a fitting loop.
+Instead of building a new experiment and solver for every evaluation,
+the plan keeps one solver, which memoizes the dielectric tensors of all materials.
+Materials used in multiple layers are only evaluated once.
+
+All lmfit Parameters used in the structure, e.g. as layer thickness or as
+dispersion parameter, are collected as parameter slots during compilation.
+When :meth:`EvaluationPlan.evaluate` is called with new parameter values,
+only the materials and layers depending on changed parameters are reevaluated.
+
+With :meth:`EvaluationPlan.evaluate_batch` a whole batch of parameter sets,
+e.g. from population based optimizers or Monte Carlo sampling, is evaluated at once.
+The parameter values are inserted as arrays with a leading batch axis,
+so dispersions, Delta matrices, propagators and the transfer matrix products
+are all calculated batched. This is supported for dispersion parameters,
+layer thicknesses and mixture fractions.
+
+With ``jacobian=True``, :meth:`EvaluationPlan.evaluate` additionally calculates
+the derivatives of the Jones matrices with respect to the parameters.
+The result then provides e.g. ``rho_jacobian`` and ``mueller_matrix_jacobian``,
+which are used by the fitting decorators as Jacobian for the least squares fit.
+
+The plan works on a copy of the structure. Changes to the structure after
+the compilation need a new compilation, parameter values are passed
+to :meth:`EvaluationPlan.evaluate` instead.
+"""
+
+from typing import (
+    Dict,
+    List,
+    Mapping,
+    MutableMapping,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+import numpy as np
+import numpy.typing as npt
+
+try:
+    from lmfit import Parameter
+except ImportError:
+    LMFIT_AVAILABLE = False
+else:
+    LMFIT_AVAILABLE = True
+
+from .dispersions.base_dispersion import BaseDispersion, RepeatedParameters
+from .experiment import Experiment, select_solver
+from .materials import Material
+from .result import IncoherentResult, Result
+from .solver import Solver
+from .solver4x4 import Solver4x4
+
+# Relative step size for the difference quotients in the Jacobian
+DIFFERENCE_STEP = 1e-6
+
+
+class ParameterSlot:
+    """Location of a parameter in the compiled structure."""
+
+    def __init__(self, container: object, key: Union[str, int], owner: object) -> None:
+        """Creates a parameter slot.
+
+        Args:
+            container (object): Object, mapping or list holding the parameter.
+            key (Union[str, int]): Attribute name, key or index of the parameter.
+            owner (object): Innermost material or layer containing the parameter.
+        """
+        self.container = container
+        self.key = key
+        self.owner = owner
+
+    def get(self) -> object:
+        """Returns the current value of the slot."""
+        if isinstance(self.container, (MutableMapping, list)):
+            return self.container[self.key]
+        return getattr(self.container, self.key)
+
+    def set(self, value: object) -> None:
+        """Sets a new value in the slot.
+
+        Args:
+            value (object): New value of the parameter.
+        """
+        if isinstance(self.container, (MutableMapping, list)):
+            self.container[self.key] = value
+        else:
+            setattr(self.container, self.key, value)
+
+
+class EvaluationPlan:
+    """Compiled structure for repeated evaluations with changing parameters."""
+
+    def __init__(
+        self,
+        structure: "Structure",
+        lbda: npt.ArrayLike,
+        theta_i: npt.ArrayLike,
+        solver: Union[Type[Solver], str] = "auto",
+        **solver_kwargs,
+    ) -> None:
+        """Compiles the structure for the given experiment.
+
+        Args:
+            structure (Structure): Structure to evaluate.
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+            theta_i (npt.ArrayLike): Single value or array of incident angles (in degrees).
+            solver (Union[Type[Solver], str], optional): Choose which solver class is used.
+                With "auto", the solver is selected by
+                :func:`select_solver<elli.experiment.select_solver>`. Defaults to "auto".
+            solver_kwargs (optional): Keyword arguments for the Solver can be appended as arguments.
+        """
+        solver = select_solver(structure, solver, **solver_kwargs)
+        self.solver = solver(Experiment(structure, lbda, theta_i), **solver_kwargs)
+        self.solver.enable_memoization()
+
+        self.slots: Dict[str, List[ParameterSlot]] = {}
+        # Materials and layers containing a material or layer, by id
+        self._parents: Dict[int, List[object]] = {}
+        self._collect_slots(self.solver, None, set())
+
+        # Replace the parameters by their plain values,
+        # so they can be changed without lmfit in the loop
+        for slots in self.slots.values():
+            for slot in slots:
+                slot.set(slot.get().value)
+
+    @property
+    def parameter_names(self) -> List[str]:
+        """Names of all parameters, which can be changed in the evaluation."""
+        return list(self.slots.keys())
+
+    def _collect_slots(self, obj: object, owner: object, visited: Set[int]) -> None:
+        """Recursively searches the compiled structure for lmfit Parameters.
+
+        Args:
+            obj (object): Object to search.
+            owner (object): Innermost material or layer containing the object.
+            visited (Set[int]): Ids of the already searched objects.
+        """
+        # Imported locally to avoid circular imports
+        from .structure import AbstractLayer, Structure
+
+        if not LMFIT_AVAILABLE:
+            return
+
+        if isinstance(obj, (Material, AbstractLayer)):
+            # Materials can be shared, so all containing objects are recorded
+            if owner is not None:
+                self._parents.setdefault(id(obj), []).append(owner)
+            owner = obj
+
+        if id(obj) in visited:
+            return
+        visited.add(id(obj))
+
+        if isinstance(
+            obj,
+            (Solver, Experiment, Structure, Material, AbstractLayer, BaseDispersion),
+        ):
+            items = [(obj, key, value) for key, value in vars(obj).items()]
+        elif isinstance(obj, MutableMapping):
+            items = [(obj, key, value) for key, value in obj.items()]
+        elif isinstance(obj, (list, RepeatedParameters)):
+            items = [(obj, key, value) for key, value in enumerate(obj)]
+        else:
+            return
+
+        for container, key, value in items:
+            if isinstance(value, Parameter):
+                self.slots.setdefault(value.name, []).append(
+                    ParameterSlot(container, key, owner)
+                )
+            else:
+                self._collect_slots(value, owner, visited)
+
+    def _dependents(self, owners: List[object]) -> List[object]:
+        """Returns the given materials and layers and all objects containing them.
+
+        Args:
+            owners (List[object]): Materials and layers with changed parameters.
+
+        Returns:
+            List[object]: All materials and layers, which need to be reevaluated.
+        """
+        dependents = {}
+        stack = [owner for owner in owners if owner is not None]
+        while stack:
+            obj = stack.pop()
+            if id(obj) not in dependents:
+                dependents[id(obj)] = obj
+                stack.extend(self._parents.get(id(obj), []))
+        return list(dependents.values())
+
+    def update(self, params: Mapping[str, Union[float, "Parameter"]]) -> None:
+        """Sets new parameter values and invalidates all dependent materials and layers.
+
+        Args:
+            params (Mapping[str, Union[float, Parameter]]):
+                Parameter values by name, e.g. lmfit Parameters or a dictionary.
+                Names, which are not used in the structure, are ignored.
+        """
+        changed = []
+        for name, value in params.items():
+            if name not in self.slots:
+                continue
+
+            if LMFIT_AVAILABLE and isinstance(value, Parameter):
+                value = value.value
+
+            for slot in self.slots[name]:
+                if np.array_equal(slot.get(), value):
+                    continue
+                slot.set(value)
+                changed.append(slot.owner)
+
+        if changed:
+            self.solver.invalidate(self._dependents(changed))
+
+    def evaluate(
+        self,
+        params: Mapping[str, Union[float, "Parameter"]] = None,
+        jacobian: Union[bool, Sequence[str]] = False,
+    ) -> Result:
+        """Evaluates the compiled structure.
+
+        Args:
+            params (Mapping[str, Union[float, Parameter]], optional):
+                Parameter values by name, e.g. lmfit Parameters or a dictionary.
+                Only materials and layers depending on changed parameters are reevaluated.
+                Uses the current values, if not provided. Defaults to None.
+            jacobian (Union[bool, Sequence[str]], optional):
+                If True, the derivatives with respect to all parameters are calculated
+                and stored in the result, see :meth:`jacobian`.
+                A sequence of names restricts the derivatives to these parameters.
+                Defaults to False.
+
+        Raises:
+            ValueError: If derivatives are requested for a structure
+                with incoherent layers.
+
+        Returns:
+            Result: Result of the experiment.
+        """
+        if params is not None:
+            self.update(params)
+
+        result = self.solver.calculate()
+
+        if jacobian is not False:
+            if isinstance(result, IncoherentResult):
+                raise ValueError(
+                    "Derivatives are not supported for structures with incoherent layers."
+                )
+            names = self.parameter_names if jacobian is True else list(jacobian)
+            result.set_jacobian(names, *self.jacobian(names))
+
+        return result
+
+    def _step(self, name: str) -> float:
+        """Returns the step size for the difference quotients of a parameter."""
+        return DIFFERENCE_STEP * max(abs(float(self.slots[name][0].get())), 1.0)
+
+    def _is_local(self, name: str) -> bool:
+        """Checks whether a parameter only changes layers of the structure,
+        i.e. neither the incident angle nor the front or back material.
+        Inhomogeneous layers, which are not propagated as slices of their
+        permittivity profile or which are sliced adaptively depending on the
+        parameters, are not local either."""
+        # Imported locally to avoid circular imports
+        from .structure import InhomogeneousLayer
+
+        if not isinstance(self.solver, Solver4x4):
+            return False
+
+        if any(
+            isinstance(slot.container, (Solver, Experiment))
+            for slot in self.slots[name]
+        ):
+            return False
+
+        half_spaces = {
+            id(self.solver.structure.front_material),
+            id(self.solver.structure.back_material),
+        }
+        return not any(
+            id(obj) in half_spaces
+            or (
+                isinstance(obj, InhomogeneousLayer)
+                and (obj.propagation != "slices" or obj.tolerance is not None)
+            )
+            for obj in self._dependents([slot.owner for slot in self.slots[name]])
+        )
+
+    def _unit_profile(self, layer: "AbstractLayer") -> List[Tuple[float, npt.NDArray]]:
+        """Returns the permittivity profile of a layer of the structure,
+        for RepeatedLayers the profile of one period."""
+        # Imported locally to avoid circular imports
+        from .structure import RepeatedLayers
+
+        if not isinstance(layer, RepeatedLayers):
+            return layer.get_permittivity_profile(self.solver.lbda)
+
+        profile = []
+        for sublayer in layer.layers:
+            profile += sublayer.get_permittivity_profile(self.solver.lbda)
+        return profile
+
+    def _layer_tangents(self, name: str) -> List[Tuple]:
+        """Calculates the derivatives of the permittivity profiles of all layers
+        depending on a parameter by central differences of the profiles.
+
+        Args:
+            name (str): Name of the parameter.
+
+        Returns:
+            List[Tuple]: Changed layers with their profile and its derivative.
+        """
+        slots = self.slots[name]
+        value = slots[0].get()
+        step = self._step(name)
+
+        top_level = {id(layer) for layer in self.solver.structure.layers}
+        layers = [
+            obj
+            for obj in self._dependents([slot.owner for slot in slots])
+            if id(obj) in top_level
+        ]
+
+        profiles = []
+        for shifted in (value + step, value - step, value):
+            for slot in slots:
+                slot.set(shifted)
+            profiles.append([self._unit_profile(layer) for layer in layers])
+
+        tangents = []
+        for layer, plus, minus, profile in zip(layers, *profiles):
+            tangent = [
+                ((d_p - d_m) / (2 * step), (eps_p - eps_m) / (2 * step))
+                for (d_p, eps_p), (d_m, eps_m) in zip(plus, minus)
+            ]
+            tangents.append((layer, profile, tangent))
+        return tangents
+
+    def _difference_jacobian(
+        self, names: List[str]
+    ) -> Dict[str, Tuple[npt.NDArray, npt.NDArray]]:
+        """Calculates the derivatives of the Jones matrices by central differences.
+        All parameters except the incident angle are evaluated in one batch.
+
+        Args:
+            names (List[str]): Names of the parameters.
+
+        Returns:
+            Dict[str, Tuple[npt.NDArray, npt.NDArray]]:
+                Derivatives of the Jones matrices for reflection and transmission.
+        """
+        derivatives = {}
+
+        batched = [
+            name
+            for name in names
+            if not any(
+                isinstance(slot.container, (Solver, Experiment))
+                for slot in self.slots[name]
+            )
+        ]
+        if batched:
+            columns = {
+                name: np.full(2 * len(batched), float(self.slots[name][0].get()))
+                for name in batched
+            }
+            for i, name in enumerate(batched):
+                columns[name][2 * i] += self._step(name)
+                columns[name][2 * i + 1] -= self._step(name)
+
+            result = self.evaluate_batch(columns)
+            for i, name in enumerate(batched):
+                derivatives[name] = tuple(
+                    (jones[2 * i] - jones[2 * i + 1]) / (2 * self._step(name))
+                    for jones in (result.jones_matrix_r, result.jones_matrix_t)
+                )
+
+        for name in names:
+            if name in derivatives:
+                continue
+
+            value = self.slots[name][0].get()
+            step = self._step(name)
+            results = []
+            for shifted in (value + step, value - step):
+                self.update({name: shifted})
+                results.append(self.solver.calculate())
+            self.update({name: value})
+
+            derivatives[name] = tuple(
+                (getattr(results[0], jones) - getattr(results[1], jones)) / (2 * step)
+                for jones in ("jones_matrix_r", "jones_matrix_t")
+            )
+
+        return derivatives
+
+    def jacobian(self, names: Sequence[str] = None) -> Tuple[npt.NDArray, npt.NDArray]:
+        """Calculates the derivatives of the Jones matrices with respect to parameters
+        at the current parameter values.
+
+        With the Solver4x4, derivatives with respect to layer thicknesses and
+        the materials of the layers are propagated in forward mode through the
+        transfer matrices. Only the layers depending on a parameter are differentiated,
+        combined with the memoized prefix and suffix products of the layer chain.
+        The derivatives of the dielectric functions are taken as central differences,
+        which needs no additional solver evaluation.
+        For the incident angle, the front and back materials and for other solvers,
+        the derivatives are calculated by central differences of the whole
+        experiment, evaluated as one batch.
+
+        Args:
+            names (Sequence[str], optional): Names of the parameters.
+                Defaults to all parameters of the plan.
+
+        Raises:
+            ValueError: If a parameter is not used in the structure.
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray]: Derivatives of the Jones matrices for
+                reflection and transmission, with a leading axis for the parameters.
+        """
+        names = self.parameter_names if names is None else list(names)
+        for name in names:
+            if name not in self.slots:
+                raise ValueError(f"Parameter {name} is not used in the structure.")
+
+        derivatives = {}
+
+        local = [name for name in names if self._is_local(name)]
+        if local:
+            jacobian_r, jacobian_t = self.solver.calculate_derivatives(
+                [self._layer_tangents(name) for name in local]
+            )
+            for i, name in enumerate(local):
+                derivatives[name] = (jacobian_r[i], jacobian_t[i])
+
+        derivatives.update(
+            self._difference_jacobian([name for name in names if name not in local])
+        )
+
+        if not names:
+            shape = (0,) + self.solver.calculate().jones_matrix_r.shape
+            return np.zeros(shape, dtype=np.complex128), np.zeros(shape, np.complex128)
+
+        return tuple(
+            np.stack(np.broadcast_arrays(*[derivatives[name][i] for name in names]))
+            for i in range(2)
+        )
+
+    def _batch_columns(
+        self,
+        params_batch: Union[
+            Mapping[str, npt.ArrayLike],
+            Sequence[Mapping[str, Union[float, "Parameter"]]],
+        ],
+    ) -> Dict[str, npt.NDArray]:
+        """Converts a batch of parameter sets into one array of values per parameter.
+
+        Args:
+            params_batch: Either a mapping of parameter names to arrays of values
+                or a sequence of parameter sets, e.g. lmfit Parameters or dictionaries.
+
+        Returns:
+            Dict[str, npt.NDArray]: Array of values for each parameter of the structure.
+        """
+        if isinstance(params_batch, Mapping):
+            return {
+                name: np.asarray(values, dtype=float).reshape(-1)
+                for name, values in params_batch.items()
+                if name in self.slots
+            }
+
+        columns = {}
+        for name, slots in self.slots.items():
+            values = []
+            for params in params_batch:
+                value = params.get(name, slots[0].get())
+                if LMFIT_AVAILABLE and isinstance(value, Parameter):
+                    value = value.value
+                values.append(value)
+            columns[name] = np.asarray(values, dtype=float)
+        return columns
+
+    def evaluate_batch(
+        self,
+        params_batch: Union[
+            Mapping[str, npt.ArrayLike],
+            Sequence[Mapping[str, Union[float, "Parameter"]]],
+        ],
+    ) -> Result:
+        """Evaluates the compiled structure for a batch of parameter sets at once.
+
+        The parameter values of the plan are not changed by a batch evaluation.
+
+        Args:
+            params_batch: Either a mapping of parameter names to arrays with
+                one value per parameter set or a sequence of parameter sets,
+                e.g. a list of lmfit Parameters or dictionaries.
+                Parameters missing in a set keep their current value.
+
+        Raises:
+            ValueError: If the number of values differs between the parameters,
+                no parameter of the structure is given or the incident angle varies.
+
+        Returns:
+            Result: Result of the experiment with a leading batch axis,
+                i.e. with the shape (batch, wavelengths, ...)
+                or (batch, angles, wavelengths, ...) for multiple angles.
+        """
+        columns = self._batch_columns(params_batch)
+        if not columns:
+            raise ValueError("The batch contains no parameters of the structure.")
+
+        if len({len(values) for values in columns.values()}) > 1:
+            raise ValueError("All parameters need the same number of values.")
+
+        batch = {}
+        for name, values in columns.items():
+            if any(
+                isinstance(slot.container, (Solver, Experiment))
+                for slot in self.slots[name]
+            ):
+                if np.any(values != values[0]):
+                    raise ValueError(
+                        "The incident angle can't be varied in a batch evaluation."
+                    )
+                batch[name] = values[0]
+            else:
+                # Batch axis first, followed by the angle and wavelength axes
+                batch[name] = values.reshape(
+                    (-1,) + (1,) * np.ndim(self.solver.theta_i) + (1,)
+                )
+
+        previous = {name: self.slots[name][0].get() for name in batch}
+        self.update(batch)
+        try:
+            return self.solver.calculate()
+        finally:
+            self.update(previous)
@@ -15,13 +15,9 @@ from ..utils import E_X
 
 
 def get_permittivity_profile(structure, lbda):
-    """Returns permittivity tensor profile."""
-    layers = []
-    for L in structure.layers:
-        layers.extend(L.get_permittivity_profile(lbda))
-    front = (float("inf"), structure.front_material.get_tensor(lbda))
-    back = (float("inf"), structure.back_material.get_tensor(lbda))
-    return sum([[front], layers, [back]], [])
+    """Returns the compact permittivity tensor profile, see
+    :class:`PermittivityProfile<elli.structure.PermittivityProfile>`."""
+    return structure.get_permittivity_profile(lbda)
 
 
 def get_index_profile(structure, lbda, v=E_X):
@@ -31,9 +27,10 @@ def get_index_profile(structure, lbda, v=E_X):
           Default value is v = e_x.
     """
     profile = get_permittivity_profile(structure, lbda)
-    (h, epsilon) = list(zip(*profile))  # unzip
-    n = [sqrt((v.T * eps * v)[0, 0, 0]) for eps in epsilon]
-    return list(zip(h, n))
+    # The index is evaluated once per distinct tensor at the first wavelength
+    epsilon = profile.tensors.reshape((len(profile.tensor_list), -1, 3, 3))[:, 0]
+    n = sqrt(np.einsum("i,uij,j->u", v, epsilon, v))[profile.indices]
+    return list(zip(profile.thickness, n))
 
 
 def draw_structure(structure, lbda=1000, method="graph", margin=0.15):
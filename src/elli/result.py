@@ -6,7 +6,9 @@ Jones matrices and ellipsometric parameters (psi, delta, rho, mueller matrices).
 A list of all properties is given below.
 
 All properties will return an array in the length of the provided wavelength array
-of the requested property.
+of the requested property. If the experiment was evaluated for an array of
+incident angles, an additional leading angle axis is present, i.e. the
+properties have the shape (angles, wavelengths, ...).
 
 These can be accessed by different methods:
 
@@ -49,6 +51,25 @@ def _convert_index(index: str) -> int:
     raise ValueError("Wrong index given for variable.")
 
 
+def jones_to_mueller(jones_matrix: npt.NDArray) -> npt.NDArray:
+    """Converts Jones matrices into the respective (non-depolarizing) Mueller matrices.
+
+    Args:
+        jones_matrix (npt.NDArray): Jones matrices with shape (..., 2, 2).
+
+    Returns:
+        npt.NDArray: Mueller matrices with shape (..., 4, 4).
+    """
+    a = np.array([[1, 0, 0, 1], [1, 0, 0, -1], [0, 1, 1, 0], [0, 1j, -1j, 0]])
+
+    # Kronecker product of S and S*
+    s_kron_s_star = np.einsum(
+        "...ij,...kl->...ikjl", np.conjugate(jones_matrix), jones_matrix
+    ).reshape(jones_matrix.shape[:-2] + (4, 4))
+
+    return np.real(a @ s_kron_s_star @ np.linalg.inv(a))
+
+
 class Result:
     """Record of a simulation result."""
 
@@ -64,7 +85,7 @@ class Result:
             M_{\text{$\rho$, exp}} = M_\rho \cdot \vec{E}
         """
         rho = np.dot(self.rho_matrix, self.experiment.jones_vector)
-        rho = rho[:, 0] / rho[:, 1]
+        rho = rho[..., 0] / rho[..., 1]
 
         if self._delta_range == (0, 180):
             rho.imag = -abs(rho.imag)
@@ -74,7 +95,7 @@ class Result:
     def rho_t(self) -> npt.NDArray:
         r"""Returns the ellipsometric parameter :math:`\rho_\text{t}` in transmission direction."""
         rho_t = np.dot(self.rho_matrix_t, self.experiment.jones_vector)
-        rho_t = rho_t[:, 0] / rho_t[:, 1]
+        rho_t = rho_t[..., 0] / rho_t[..., 1]
         if self._delta_range == (0, 180):
             rho_t.imag = -abs(rho_t.imag)
         return rho_t
@@ -141,7 +162,7 @@ class Result:
             \end{bmatrix}
         """
         r_ss = self.jones_matrix_r[..., 1, 1]
-        return self.jones_matrix_r / r_ss[:, None, None]
+        return self.jones_matrix_r / r_ss[..., None, None]
 
     @property
     def rho_matrix_t(self) -> npt.NDArray:
@@ -157,7 +178,7 @@ class Result:
             \end{bmatrix}
         """
         t_ss = self.jones_matrix_t[..., 1, 1]
-        return self.jones_matrix_t / t_ss[:, None, None]
+        return self.jones_matrix_t / t_ss[..., None, None]
 
     @property
     def psi_matrix(self) -> npt.NDArray:
@@ -210,17 +231,90 @@ class Result:
     @property
     def mueller_matrix(self) -> npt.NDArray:
         """Returns the Mueller matrix for reflection, calculated from the rho matrix."""
+        mueller_matrix = jones_to_mueller(self.rho_matrix)
+        mm11 = mueller_matrix[..., 0, 0]
+
+        return mueller_matrix / mm11[..., None, None]
+
+    @property
+    def jacobian_names(self) -> List[str]:
+        """Returns the names of the parameters, for which the derivatives are stored.
+        The derivative properties have a leading axis in this order."""
+        return list(self._jacobian_names)
+
+    def _check_jacobian(self) -> None:
+        """Raises a ValueError, if no derivatives are stored."""
+        if self._jacobian_r is None:
+            raise ValueError(
+                "The result contains no derivatives. "
+                "Evaluate an EvaluationPlan with jacobian=True to calculate them."
+            )
+
+    @property
+    def jones_matrix_r_jacobian(self) -> npt.NDArray:
+        """Returns the derivatives of the Jones matrix for reflection
+        with respect to the parameters in jacobian_names."""
+        self._check_jacobian()
+        return self._jacobian_r
+
+    @property
+    def jones_matrix_t_jacobian(self) -> npt.NDArray:
+        """Returns the derivatives of the Jones matrix for transmission
+        with respect to the parameters in jacobian_names."""
+        self._check_jacobian()
+        return self._jacobian_t
+
+    @property
+    def rho_jacobian(self) -> npt.NDArray:
+        r"""Returns the derivatives of :math:`\rho` with respect to the parameters
+        in jacobian_names, with the shape (parameters, wavelengths)."""
+        self._check_jacobian()
+        jones_vector = self.experiment.jones_vector
+        rho = self.jones_matrix_r @ jones_vector
+        d_rho = self._jacobian_r @ jones_vector
+
+        d_rho = (d_rho[..., 0] * rho[..., 1] - rho[..., 0] * d_rho[..., 1]) / rho[
+            ..., 1
+        ] ** 2
+
+        if self._delta_range == (0, 180):
+            rho = rho[..., 0] / rho[..., 1]
+            d_rho.imag = -np.sign(rho.imag) * d_rho.imag
+        return d_rho
+
+    @property
+    def mueller_matrix_jacobian(self) -> npt.NDArray:
+        """Returns the derivatives of the Mueller matrix with respect to the parameters
+        in jacobian_names, with the shape (parameters, wavelengths, 4, 4)."""
+        self._check_jacobian()
         a = np.array([[1, 0, 0, 1], [1, 0, 0, -1], [0, 1, 1, 0], [0, 1j, -1j, 0]])
+        a_inv = np.linalg.inv(a)
+
+        r_ss = self.jones_matrix_r[..., 1, 1, None, None]
+        d_r_ss = self._jacobian_r[..., 1, 1, None, None]
+        rho_matrix = self.rho_matrix
+        d_rho_matrix = self._jacobian_r / r_ss - self.jones_matrix_r * d_r_ss / r_ss**2
 
-        # Kronecker product of S and S*
+        shape = d_rho_matrix.shape[:-2] + (4, 4)
         s_kron_s_star = np.einsum(
-            "aij,akl->aikjl", np.conjugate(self.rho_matrix), self.rho_matrix
-        ).reshape([self.rho_matrix.shape[0], 4, 4])
+            "...ij,...kl->...ikjl", np.conjugate(rho_matrix), rho_matrix
+        ).reshape(rho_matrix.shape[:-2] + (4, 4))
+        d_s_kron_s_star = (
+            np.einsum("...ij,...kl->...ikjl", np.conjugate(d_rho_matrix), rho_matrix)
+            + np.einsum("...ij,...kl->...ikjl", np.conjugate(rho_matrix), d_rho_matrix)
+        ).reshape(shape)
 
-        mueller_matrix = np.real(a @ s_kron_s_star @ np.linalg.inv(a))
-        mm11 = mueller_matrix[:, 0, 0]
+        mueller_matrix = np.real(a @ s_kron_s_star @ a_inv)
+        d_mueller_matrix = np.real(a @ d_s_kron_s_star @ a_inv)
+        mm11 = mueller_matrix[..., 0, 0, None, None]
+        d_mm11 = d_mueller_matrix[..., 0, 0, None, None]
 
-        return mueller_matrix / mm11[:, None, None]
+        return d_mueller_matrix / mm11 - mueller_matrix * d_mm11 / mm11**2
+
+    @property
+    def theta_i(self) -> npt.NDArray:
+        """Returns the incident angle(s) of the evaluated experiment (in degrees)."""
+        return np.asarray(self.experiment.theta_i)
 
     @property
     def jones_matrix_r(self) -> npt.NDArray:
@@ -282,7 +376,7 @@ class Result:
         .. math::
             R = (R_{pp} + R_{ss}) / 2
         """
-        return (self.R_matrix[:, 0, 0] + self.R_matrix[:, 1, 1]) / 2
+        return (self.R_matrix[..., 0, 0] + self.R_matrix[..., 1, 1]) / 2
 
     @property
     def R_matrix(self) -> npt.NDArray:
@@ -300,7 +394,7 @@ class Result:
         .. math::
             T = (T_{pp} / T_{ss}) / 2
         """
-        return (self.T_matrix[:, 0, 0] + self.T_matrix[:, 1, 1]) / 2
+        return (self.T_matrix[..., 0, 0] + self.T_matrix[..., 1, 1]) / 2
 
     @property
     def T_matrix(self) -> npt.NDArray:
@@ -309,7 +403,9 @@ class Result:
         .. math::
             M_T = \begin{bmatrix} T_{pp} & T_{ps} \\ T_{sp} & T_{ss} \end{bmatrix}
         """
-        return np.abs(self._jones_matrix_t) ** 2 * self._power_correction[:, None, None]
+        return (
+            np.abs(self._jones_matrix_t) ** 2 * self._power_correction[..., None, None]
+        )
 
     @property
     def Rc_matrix(self) -> npt.NDArray:
@@ -327,7 +423,9 @@ class Result:
         .. math::
             M_{Tc} = \begin{bmatrix} T_{LL} & T_{LR} \\ T_{RL} & T_{RR} \end{bmatrix}
         """
-        return np.abs(self.jones_matrix_tc) ** 2 * self._power_correction[:, None, None]
+        return (
+            np.abs(self.jones_matrix_tc) ** 2 * self._power_correction[..., None, None]
+        )
 
     def __init__(
         self,
@@ -350,11 +448,30 @@ class Result:
         self._jones_matrix_r = jones_matrix_r
         self._jones_matrix_t = jones_matrix_t
         self._delta_range = (-180, 180)
+        self._jacobian_names = []
+        self._jacobian_r = None
+        self._jacobian_t = None
         if power_correction is None:
-            self._power_correction = np.ones_like(self.experiment.lbda)
+            self._power_correction = np.ones(jones_matrix_r.shape[:-2])
         else:
             self._power_correction = power_correction
 
+    def set_jacobian(
+        self, names: List[str], jacobian_r: npt.NDArray, jacobian_t: npt.NDArray
+    ) -> None:
+        """Stores the derivatives of the Jones matrices. Gets called by evaluation plans.
+
+        Args:
+            names (List[str]): Names of the parameters.
+            jacobian_r (npt.NDArray): Derivatives of the Jones matrix for reflection,
+                with a leading axis for the parameters.
+            jacobian_t (npt.NDArray): Derivatives of the Jones matrix for transmission,
+                with a leading axis for the parameters.
+        """
+        self._jacobian_names = list(names)
+        self._jacobian_r = jacobian_r
+        self._jacobian_t = jacobian_t
+
     def get(self, name: str) -> npt.NDArray:
         """Return the data for the requested variable 'name'.
 
@@ -412,19 +529,19 @@ class Result:
         if names[0] in ["psi", "delta", "rho", "R", "T"]:
             if len(names) == 1:
                 return self.__getattribute__(names[0])
-            return self.__getattribute__(names[0] + "_matrix")[:, i, j]
+            return self.__getattribute__(names[0] + "_matrix")[..., i, j]
 
         if names[0] in ["r", "rc", "t", "tc"]:
             if len(names) == 1:
                 return self.__getattribute__("jones_matrix_" + names[0])
-            return self.__getattribute__("jones_matrix_" + names[0])[:, i, j]
+            return self.__getattribute__("jones_matrix_" + names[0])[..., i, j]
 
         if names[0] in ["Rc", "Tc"]:
             if len(names) == 1:
                 return self.__getattribute__(names[0] + "_matrix")
-            return self.__getattribute__(names[0] + "_matrix")[:, i, j]
+            return self.__getattribute__(names[0] + "_matrix")[..., i, j]
 
-        return self.__getattribute__(names[0])[:, i, j]
+        return self.__getattribute__(names[0])[..., i, j]
 
     def as_delta_range(self, lower: int, upper: int):
         """Returns this result in another delta range
@@ -452,6 +569,155 @@ class Result:
         return self
 
 
+class IncoherentResult(Result):
+    r"""Record of a simulation result of a structure with incoherent
+    or partially coherent layers.
+
+    The partial waves, which pass an incoherent layer a different number of times,
+    add up in intensity instead of amplitude. Thus, the result is described by the
+    (depolarizing) Mueller matrices for reflection and transmission,
+    while the Jones matrices and all properties derived from them are not defined.
+
+    Like measured by an ellipsometer, :math:`\rho` is obtained from the elements
+    :math:`N = -m_{12}`, :math:`C = m_{33}` and :math:`S = m_{34}`
+    of the normalized Mueller matrix:
+
+    .. math::
+        \rho = \tan \psi \exp(-i \Delta) = \frac{C - i S}{1 + N}
+    """
+
+    _jones_error = (
+        "Jones matrices are not defined for structures with incoherent layers, "
+        "use the Mueller matrices instead."
+    )
+
+    @property
+    def rho(self) -> npt.NDArray:
+        r"""Returns the ellipsometric parameter :math:`\rho` in reflection direction,
+        calculated from the normalized Mueller matrix."""
+        return self._mueller_rho(self.mueller_matrix)
+
+    @property
+    def rho_t(self) -> npt.NDArray:
+        r"""Returns the ellipsometric parameter :math:`\rho_\text{t}` in transmission direction,
+        calculated from the normalized Mueller matrix."""
+        return self._mueller_rho(self.mueller_matrix_t)
+
+    @property
+    def mueller_matrix(self) -> npt.NDArray:
+        """Returns the normalized Mueller matrix for reflection."""
+        mm11 = self._mueller_matrix_r[..., 0, 0]
+        return self._mueller_matrix_r / mm11[..., None, None]
+
+    @property
+    def mueller_matrix_t(self) -> npt.NDArray:
+        """Returns the normalized Mueller matrix for transmission."""
+        mm11 = self._mueller_matrix_t[..., 0, 0]
+        return self._mueller_matrix_t / mm11[..., None, None]
+
+    @property
+    def jones_matrix_r(self) -> npt.NDArray:
+        """Not defined for incoherent results, raises a ValueError."""
+        raise ValueError(self._jones_error)
+
+    @property
+    def jones_matrix_t(self) -> npt.NDArray:
+        """Not defined for incoherent results, raises a ValueError."""
+        raise ValueError(self._jones_error)
+
+    @property
+    def jones_matrix_rc(self) -> npt.NDArray:
+        """Not defined for incoherent results, raises a ValueError."""
+        raise ValueError(self._jones_error)
+
+    @property
+    def jones_matrix_tc(self) -> npt.NDArray:
+        """Not defined for incoherent results, raises a ValueError."""
+        raise ValueError(self._jones_error)
+
+    @property
+    def R_matrix(self) -> npt.NDArray:
+        r"""Returns the reflectance matrix separated for s and p polarization,
+        calculated from the Mueller matrix.
+
+        .. math::
+            M_R = \begin{bmatrix} R_{pp} & R_{ps} \\ R_{sp} & R_{ss} \end{bmatrix}
+        """
+        return self._intensity_matrix(self._mueller_matrix_r)
+
+    @property
+    def T_matrix(self) -> npt.NDArray:
+        r"""Returns the transmittance matrix separated for s and p polarization,
+        calculated from the Mueller matrix.
+
+        .. math::
+            M_T = \begin{bmatrix} T_{pp} & T_{ps} \\ T_{sp} & T_{ss} \end{bmatrix}
+        """
+        return (
+            self._intensity_matrix(self._mueller_matrix_t)
+            * self._power_correction[..., None, None]
+        )
+
+    @property
+    def Rc_matrix(self) -> npt.NDArray:
+        """Not defined for incoherent results, raises a ValueError."""
+        raise ValueError(self._jones_error)
+
+    @property
+    def Tc_matrix(self) -> npt.NDArray:
+        """Not defined for incoherent results, raises a ValueError."""
+        raise ValueError(self._jones_error)
+
+    def __init__(
+        self,
+        experiment: "Experiment",
+        mueller_matrix_r: npt.NDArray,
+        mueller_matrix_t: npt.NDArray,
+        power_correction: npt.NDArray = None,
+    ) -> None:
+        """Creates result object, to store simulation data. Gets called by solvers.
+
+        Args:
+            experiment (Experiment):
+                Evaluated experiment, with structure and experimental parameters.
+            mueller_matrix_r (npt.NDArray): Mueller matrix for the reflection direction,
+                not normalized.
+            mueller_matrix_t (npt.NDArray): Mueller matrix for the transmission direction,
+                not normalized.
+            power_correction (npt.NDArray):
+                Correction factors, to get the power transmission values.
+        """
+        if power_correction is None:
+            power_correction = np.ones(mueller_matrix_r.shape[:-2])
+
+        super().__init__(experiment, None, None, power_correction)
+        self._mueller_matrix_r = mueller_matrix_r
+        self._mueller_matrix_t = mueller_matrix_t
+
+    def set_jacobian(
+        self, names: List[str], jacobian_r: npt.NDArray, jacobian_t: npt.NDArray
+    ) -> None:
+        """Not supported for incoherent results, raises a ValueError."""
+        raise ValueError(
+            "Derivatives are not supported for structures with incoherent layers."
+        )
+
+    def _mueller_rho(self, mueller_matrix: npt.NDArray) -> npt.NDArray:
+        """Calculates rho from the elements N, C and S of a normalized Mueller matrix."""
+        rho = (mueller_matrix[..., 2, 2] - 1j * mueller_matrix[..., 2, 3]) / (
+            1 - mueller_matrix[..., 0, 1]
+        )
+        if self._delta_range == (0, 180):
+            rho.imag = -abs(rho.imag)
+        return rho
+
+    @staticmethod
+    def _intensity_matrix(mueller_matrix: npt.NDArray) -> npt.NDArray:
+        """Calculates the intensities for p and s polarization from a Mueller matrix."""
+        b = np.array([[1, 1, 0, 0], [1, -1, 0, 0]])
+        return b @ mueller_matrix @ b.T / 2
+
+
 class ResultList:
     """Class to make a row of Results easier to handle."""
 
@@ -1,8 +1,13 @@
 # Encoding: utf-8
 from abc import ABC, abstractmethod
-from copy import deepcopy
+from copy import copy, deepcopy
+from typing import List, Tuple
 
-from .result import Result
+import numpy as np
+import numpy.typing as npt
+from numpy.lib.scimath import sqrt
+
+from .result import IncoherentResult, Result, jones_to_mueller
 
 
 class Solver(ABC):
@@ -13,6 +18,10 @@ class Solver(ABC):
 
     The actual simulation is handled by subclasses.
     Therefore, this class should never be called directly.
+
+    If the experiment contains multiple angles of incidence, the solvers
+    broadcast over an additional leading angle axis, so that all results
+    have the shape (angles, wavelengths, ...).
     """
 
     experiment = None
@@ -20,7 +29,9 @@ class Solver(ABC):
     lbda = None
     theta_i = None
     jones_vector = None
-    permittivity_profile = None
+    _permittivity_profile = None
+    _tensor_memo = None
+    _profile_memo = None
 
     @abstractmethod
     def calculate(self) -> Result:
@@ -32,4 +43,378 @@ class Solver(ABC):
         self.lbda = self.experiment.lbda
         self.theta_i = self.experiment.theta_i
         self.jones_vector = self.experiment.jones_vector
-        self.permittivity_profile = self.structure.get_permittivity_profile(self.lbda)
+
+    @staticmethod
+    def chain_product(matrices: npt.NDArray) -> npt.NDArray:
+        """Calculates the ordered matrix product M_0 @ M_1 @ ... @ M_N-1
+        of a stack of matrices along the first axis.
+
+        The product is calculated as pairwise tree reduction,
+        which needs only log2(N) batched matrix multiplications.
+
+        Args:
+            matrices (npt.NDArray): Stack of matrices with shape (N, ..., M, M)
+
+        Returns:
+            npt.NDArray: Ordered product of all matrices
+        """
+        while len(matrices) > 1:
+            paired = matrices[0:-1:2] @ matrices[1::2]
+            if len(matrices) % 2:
+                paired = np.concatenate((paired, matrices[-1:]))
+            matrices = paired
+        return matrices[0]
+
+    @property
+    def permittivity_profile(self) -> "PermittivityProfile":
+        """Permittivity profile of the whole structure, including the half-spaces.
+        It is only evaluated on first access, as not all solvers need the expanded profile.
+
+        Returns:
+            PermittivityProfile: Compact profile, which can be iterated
+                as tuples (thickness, dielectric tensor).
+        """
+        if self._permittivity_profile is None:
+            # Imported locally to avoid circular imports
+            from .structure import Layer
+
+            self._permittivity_profile = self.get_compact_profile(
+                [Layer(self.structure.front_material, np.inf)]
+                + self.structure.layers
+                + [Layer(self.structure.back_material, np.inf)]
+            )
+        return self._permittivity_profile
+
+    def get_compact_profile(
+        self, layers: List["AbstractLayer"]
+    ) -> "PermittivityProfile":
+        """Returns the compact permittivity profile of a sequence of layers.
+        Every material is evaluated only once, also without memoization,
+        and repeated layers are not expanded.
+
+        Args:
+            layers (List[AbstractLayer]): List of layers, starting from z=0
+
+        Returns:
+            PermittivityProfile: Compact profile of the layers.
+        """
+        # Imported locally to avoid circular imports
+        from .structure import PermittivityProfile
+
+        if self._tensor_memo is not None:
+            return PermittivityProfile.from_layers(
+                layers, self.get_material_tensor, self.get_layer_profile
+            )
+
+        tensors = {}
+
+        def get_tensor(material: "Material") -> npt.NDArray:
+            if id(material) not in tensors:
+                tensors[id(material)] = self.get_material_tensor(material)
+            return tensors[id(material)]
+
+        return PermittivityProfile.from_layers(
+            layers, get_tensor, self.get_layer_profile
+        )
+
+    def enable_memoization(self) -> None:
+        """Memoizes the evaluated dielectric tensors of materials and the profiles
+        of inhomogeneous layers, so they are evaluated only once,
+        even if the solver is used for multiple calculations.
+        Memoized entries need to be invalidated with :meth:`invalidate`,
+        if the parameters of the respective object change.
+        """
+        self._tensor_memo = {}
+        self._profile_memo = {}
+
+    def invalidate(self, objects: List[object] = None) -> None:
+        """Removes memoized tensors and profiles.
+
+        Args:
+            objects (List[object], optional): Materials and layers to invalidate.
+                Invalidates all memoized entries, if not provided. Defaults to None.
+        """
+        self._permittivity_profile = None
+        if self._tensor_memo is None:
+            return
+
+        if objects is None:
+            self._tensor_memo.clear()
+            self._profile_memo.clear()
+            return
+
+        for obj in objects:
+            self._tensor_memo.pop(id(obj), None)
+            self._profile_memo.pop(id(obj), None)
+
+    def get_material_tensor(self, material: "Material") -> npt.NDArray:
+        """Returns the dielectric tensor of a material for the wavelengths of the experiment.
+
+        Args:
+            material (Material): Material to evaluate.
+
+        Returns:
+            npt.NDArray: Permittivity tensor.
+        """
+        if self._tensor_memo is None:
+            return material.get_tensor(self.lbda)
+
+        key = id(material)
+        if key not in self._tensor_memo:
+            self._tensor_memo[key] = material.get_tensor(self.lbda)
+        return self._tensor_memo[key]
+
+    def get_layer_profile(
+        self, layer: "AbstractLayer"
+    ) -> List[Tuple[float, npt.NDArray]]:
+        """Returns the permittivity profile of a layer for the wavelengths of the experiment.
+
+        Args:
+            layer (AbstractLayer): Layer to evaluate.
+
+        Returns:
+            List[Tuple[float, npt.NDArray]]:
+                List of tuples [(thickness, dielectric tensor), ...]
+        """
+        # Imported locally to avoid circular imports
+        from .structure import InhomogeneousLayer, Layer
+
+        if isinstance(layer, Layer):
+            return [(layer.thickness, self.get_material_tensor(layer.material))]
+
+        def evaluate() -> List[Tuple[float, npt.NDArray]]:
+            if isinstance(layer, InhomogeneousLayer) and layer.tolerance is not None:
+                # Adaptive slices are refined for the incident angles of the experiment
+                return layer.get_permittivity_profile(self.lbda, self.get_k_x())
+            return layer.get_permittivity_profile(self.lbda)
+
+        if self._profile_memo is None:
+            return evaluate()
+
+        key = id(layer)
+        if key not in self._profile_memo:
+            self._profile_memo[key] = evaluate()
+        return self._profile_memo[key]
+
+    def get_k_x(self, epsilon_front: npt.NDArray = None) -> npt.NDArray:
+        """Returns the reduced wavenumber Kx = kx/k0 = n sin(Φ) of the incident light.
+
+        Args:
+            epsilon_front (npt.NDArray, optional): Dielectric tensor of the front half-space.
+                Gets evaluated from the structure, if not provided. Defaults to None.
+
+        Returns:
+            npt.NDArray: Reduced wavenumber with the shape (wavelengths)
+                or (angles, wavelengths) for multiple angles of incidence.
+        """
+        theta = np.deg2rad(self.theta_i)
+        if np.ndim(theta) > 0:
+            theta = np.asarray(theta)[:, np.newaxis]
+
+        if epsilon_front is None:
+            epsilon_front = self.get_material_tensor(self.structure.front_material)
+
+        n_x = sqrt(epsilon_front[..., 0, 0])
+        return n_x * np.sin(theta)
+
+    def is_coherent(self) -> bool:
+        """Checks whether all layers of the structure are calculated coherently.
+
+        Returns:
+            bool: False, if the structure contains incoherent or partially coherent layers.
+        """
+        # Imported locally to avoid circular imports
+        from .structure import Layer
+
+        return all(
+            not isinstance(layer, Layer) or layer.coherence == "coherent"
+            for layer in self.structure.layers
+        )
+
+    def segment_jones_matrices(
+        self,
+        layers: List["AbstractLayer"],
+        front: "Material",
+        back: "Material",
+        k_x: npt.ArrayLike,
+    ) -> Tuple[npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray]:
+        """Calculates the Jones matrices of a coherent sequence of layers
+        between two half-spaces, for light incident from both sides.
+        Needs to be implemented by solvers supporting incoherent layers.
+
+        Args:
+            layers (List[AbstractLayer]): List of layers, starting from z=0
+            front (Material): Isotropic material of the front half-space.
+            back (Material): Material of the back half-space.
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray]:
+                Jones matrices for reflection and transmission of light incident
+                from the front and reflection and transmission of light incident
+                from the back half-space.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support incoherent layers."
+        )
+
+    def calculate_incoherent(self) -> IncoherentResult:
+        """Calculates a structure with incoherent or partially coherent layers
+        with the generalized transfer matrix method.
+
+        The structure is split at the incoherent layers into coherent segments.
+        The Jones matrices of each segment for light incident from both sides are
+        converted into Mueller matrices, which are combined with the intensity
+        attenuation a of the incoherent layer in between. For the reflection R and
+        transmission T of the segments in front and the combined Mueller matrices
+        R' and T' of the structure behind an incoherent layer, the sum over
+        all multiple reflections inside the layer is
+
+        * R = R_f + T_b a R' a (1 - R_b a R' a)⁻¹ T_f
+        * T = T' a (1 - R_b a R' a)⁻¹ T_f
+
+        Partially coherent layers are calculated coherently within their segment
+        for each of their samples. The samples are wavelength offsets shared by
+        all partially coherent layers, so the structure is calculated once per
+        sample of the layer with the most samples and the Mueller matrices
+        are averaged.
+
+        Raises:
+            ValueError: If an incoherent layer is not isotropic.
+
+        Returns:
+            IncoherentResult: Result object with the Mueller matrices.
+        """
+        # Imported locally to avoid circular imports
+        from .structure import Layer
+
+        epsilon_front = self.get_material_tensor(self.structure.front_material)
+        k_x = self.get_k_x(epsilon_front)
+
+        half_spaces = [self.structure.front_material]
+        segments = [[]]
+        attenuations = []
+        for layer in self.structure.layers:
+            if not isinstance(layer, Layer) or layer.coherence != "incoherent":
+                segments[-1].append(layer)
+                continue
+
+            if layer.material.tensor_form != "isotropic":
+                raise ValueError("Incoherent layers need an isotropic material.")
+
+            # Intensity attenuation for a single pass through the layer
+            k_z = sqrt(self.get_material_tensor(layer.material)[..., 0, 0] - k_x**2)
+            attenuations.append(
+                np.exp(-4 * np.pi * k_z.imag * layer.thickness / self.lbda)[
+                    ..., np.newaxis, np.newaxis
+                ]
+            )
+            half_spaces.append(layer.material)
+            segments.append([])
+        half_spaces.append(self.structure.back_material)
+
+        # All partially coherent layers share the wavelength offsets
+        samples = max(
+            (
+                layer.samples
+                for layer in self.structure.layers
+                if isinstance(layer, Layer) and layer.coherence == "partial"
+            ),
+            default=1,
+        )
+
+        # Mueller matrices (R_f, T_f, R_b, T_b) of every segment,
+        # for each wavelength offset of its partially coherent layers
+        segment_matrices = [
+            [
+                jones_to_mueller(
+                    np.stack(
+                        np.broadcast_arrays(
+                            *self.segment_jones_matrices(variant, front, back, k_x)
+                        )
+                    )
+                )
+                for variant in self.coherence_samples(layers, samples)
+            ]
+            for layers, front, back in zip(segments, half_spaces, half_spaces[1:])
+        ]
+
+        identity = np.identity(4)
+        mueller_matrix_r = 0
+        mueller_matrix_t = 0
+        for sample in range(samples):
+            combination = [
+                matrices[sample % len(matrices)] for matrices in segment_matrices
+            ]
+            m_r, m_t = combination[-1][:2]
+            for (r_f, t_f, r_b, t_b), a in zip(
+                reversed(combination[:-1]), reversed(attenuations)
+            ):
+                round_trip = a * m_r * a
+                multiple = np.linalg.inv(identity - r_b @ round_trip) @ t_f
+                m_r = r_f + t_b @ round_trip @ multiple
+                m_t = m_t * a @ multiple
+            mueller_matrix_r = mueller_matrix_r + m_r
+            mueller_matrix_t = mueller_matrix_t + m_t
+
+        mueller_matrix_r = mueller_matrix_r / samples
+        mueller_matrix_t = mueller_matrix_t / samples
+
+        if self.structure.back_material.tensor_form == "isotropic":
+            epsilon_back = self.get_material_tensor(self.structure.back_material)
+            k_z_f = sqrt(epsilon_front[..., 0, 0] - k_x**2)
+            k_z_b = sqrt(epsilon_back[..., 0, 0] - k_x**2)
+            power_correction = np.broadcast_to(
+                k_z_b.real / k_z_f.real, mueller_matrix_r.shape[:-2]
+            )
+            return IncoherentResult(
+                self.experiment, mueller_matrix_r, mueller_matrix_t, power_correction
+            )
+
+        return IncoherentResult(self.experiment, mueller_matrix_r, mueller_matrix_t)
+
+    def coherence_samples(
+        self, layers: List["AbstractLayer"], samples: int
+    ) -> List[List["AbstractLayer"]]:
+        """Returns the sequence of layers for each of the common wavelength offsets
+        of the partially coherent layers, see
+        :meth:`Layer.set_coherence<elli.structure.Layer.set_coherence>`.
+
+        A layer with fewer samples than requested repeats its samples,
+        the n-th offset of a layer with m samples is its (n * m // samples)-th sample.
+
+        Args:
+            layers (List[AbstractLayer]): List of layers, starting from z=0
+            samples (int): Number of wavelength offsets.
+
+        Returns:
+            List[List[AbstractLayer]]: Sequences of layers, where each partially
+                coherent layer is replaced by its sample for the offset.
+                Contains a single sequence, if there are no partially coherent layers.
+        """
+        # Imported locally to avoid circular imports
+        from .structure import Layer
+
+        if not any(
+            isinstance(layer, Layer) and layer.coherence == "partial"
+            for layer in layers
+        ):
+            return [layers]
+
+        variants = []
+        for index in range(samples):
+            variant = []
+            for layer in layers:
+                if not isinstance(layer, Layer) or layer.coherence != "partial":
+                    variant.append(layer)
+                    continue
+
+                offset = (index * layer.samples // samples + 0.5) / layer.samples - 0.5
+                sample = copy(layer)
+                sample.thickness = layer.thickness * (
+                    1 + offset * layer.bandwidth / np.asarray(self.lbda)
+                )
+                variant.append(sample)
+            variants.append(variant)
+
+        return variants
@@ -1,7 +1,9 @@
 # Encoding: utf-8
 import warnings
+from typing import List, Tuple
 
 import numpy as np
+import numpy.typing as npt
 from numpy.lib.scimath import arcsin, sqrt
 
 from .result import Result
@@ -16,9 +18,35 @@ class Solver2x2(Solver):
     thus Jonas and Mueller matrices cannot be calculated (respective functions return None).
     """
 
-    def list_snell(self, n_list):
-        angles = arcsin(n_list[0] * np.sin(np.deg2rad(self.theta_i)) / n_list)
+    def list_snell(self, n_list: npt.NDArray, k_x: npt.NDArray = None) -> npt.NDArray:
+        """Calculates the propagation angles in all layers with Snell's law.
 
+        Args:
+            n_list (npt.NDArray): Refractive indices of all layers,
+                stacked along the first axis.
+            k_x (npt.NDArray, optional): Reduced wavenumber of the incident light.
+                Gets evaluated from the structure, if not provided. Defaults to None.
+
+        Returns:
+            npt.NDArray: Propagation angles with the same shape as n_list.
+        """
+        if k_x is None:
+            k_x = self.get_k_x(self.permittivity_profile[0][1])
+        return Solver2x2.forward_angles(n_list, arcsin(k_x / n_list))
+
+    @staticmethod
+    def forward_angles(n_list: npt.NDArray, angles: npt.NDArray) -> npt.NDArray:
+        """Selects the forward propagating solution in the front and back half-spaces.
+
+        Args:
+            n_list (npt.NDArray): Refractive indices of all layers,
+                stacked along the first axis.
+            angles (npt.NDArray): Propagation angles of all layers,
+                which get corrected in place.
+
+        Returns:
+            npt.NDArray: Corrected propagation angles.
+        """
         angles[0] = np.where(
             np.invert(Solver2x2.is_forward_angle(n_list[0], angles[0])),
             np.pi - angles[0],
@@ -32,87 +60,202 @@ class Solver2x2(Solver):
 
         return angles
 
-    def calculate(self) -> Result:
-        """Calculates the transfer matrix for the given material stack"""
-        if len(self.permittivity_profile) > 2:
-            d, eps = list(zip(*self.permittivity_profile[1:-1]))
-            d_list = np.array(d)
-            n_list = sqrt(
-                np.vstack(
-                    [
-                        self.permittivity_profile[0][1][:, 0, 0],
-                        np.array(eps)[..., 0, 0],
-                        self.permittivity_profile[-1][1][:, 0, 0],
-                    ]
-                )
-            )
-        else:
-            d_list = np.array([])
-            n_list = sqrt(
-                np.vstack(
-                    [
-                        self.permittivity_profile[0][1][:, 0, 0],
-                        self.permittivity_profile[-1][1][:, 0, 0],
-                    ]
-                )
-            )
+    def profile_transfer_matrix(
+        self, profile: "PermittivityProfile", k_x: npt.NDArray
+    ) -> Tuple[npt.NDArray, npt.NDArray]:
+        """Calculates the transfer matrices of a profile, including the half-spaces,
+        for s- and p-polarization.
 
-        for layer in n_list:
-            if np.any(np.logical_and(layer.real > 0, layer.imag < 0)):
-                warnings.warn(
-                    """Solver2x2 can't handle active media (n > 0 and k < 0).
-                    Check if all materials are defined correctly or switch to Solver4x4 instead."""
-                )
-            elif np.any(np.logical_and(layer.real < 0, layer.imag > 0)):
-                warnings.warn(
-                    """Solver2x2 can't handle media with n < 0 and k > 0.
-                    Check if all materials are defined correctly or switch to Solver4x4 instead."""
-                )
-
-        num_layers = n_list.shape[0]
-        th_list = self.list_snell(n_list)
-        kz_list = 2 * np.pi * n_list * np.cos(th_list) / self.lbda
-
-        delta = kz_list[1:-1] * (d_list if n_list.ndim == 1 else d_list[:, None])
-
-        esum = "ij...,jk...->ik..."
-        ones = np.repeat(1, n_list.shape[1]) if n_list.ndim > 1 else 1
-
-        rs, rp, ts, tp = Solver2x2.fresnel(n_list[0], n_list[1], th_list[0], th_list[1])
-        Ms = np.array([[ones, rs], [rs, ones]], dtype=complex) / ts
-        Mp = np.array([[ones, rp], [rp, ones]], dtype=complex) / tp
-
-        for i in range(1, num_layers - 1):
-            rs, rp, ts, tp = Solver2x2.fresnel(
-                n_list[i], n_list[i + 1], th_list[i], th_list[i + 1]
-            )
-            em = np.exp(-1j * delta[i - 1])
-            ep = np.exp(1j * delta[i - 1])
+        All interfaces and both polarizations are calculated at once:
+        The Fresnel coefficients of all interfaces are evaluated in one broadcast,
+        s- and p-polarization are stacked along a common axis and
+        the transfer matrices of all layers are multiplied as batched chain product.
+        Besides the angle and wavelength axes, the permittivities may carry
+        further leading batch axes, e.g. for a batch of parameter sets.
+
+        Args:
+            profile (PermittivityProfile): Compact profile, starting with the front
+                and ending with the back half-space.
+            k_x (npt.NDArray): Reduced wavenumber of the incident light.
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray]: Transfer matrices with shape
+                (2, 2, s/p, ...) and n cos(Φ) of all layers.
+        """
+        # Refractive indices of the distinct tensors, mapped to the layers afterwards.
+        # Only the first diagonal element is needed, so the full tensors are not stacked.
+        n_unique = sqrt(profile.diagonal[..., 0])
 
-            Ms = np.einsum(
-                esum, Ms, np.array([[em, rs * em], [rs * ep, ep]], dtype=complex) / ts
+        if np.any(np.logical_and(n_unique.real > 0, n_unique.imag < 0)):
+            warnings.warn(
+                """Solver2x2 can't handle active media (n > 0 and k < 0).
+                Check if all materials are defined correctly or switch to Solver4x4 instead."""
             )
-            Mp = np.einsum(
-                esum, Mp, np.array([[em, rp * em], [rp * ep, ep]], dtype=complex) / tp
+        if np.any(np.logical_and(n_unique.real < 0, n_unique.imag > 0)):
+            warnings.warn(
+                """Solver2x2 can't handle media with n < 0 and k > 0.
+                Check if all materials are defined correctly or switch to Solver4x4 instead."""
             )
 
-        rtots = Ms[1, 0] / Ms[0, 0]
-        ttots = 1 / Ms[0, 0]
-        rtotp = Mp[1, 0] / Mp[0, 0]
-        ttotp = 1 / Mp[0, 0]
+        # Common batch shape of all layers, e.g. (samples, angles, wavelengths)
+        shape = np.broadcast_shapes(
+            np.shape(k_x), n_unique.shape[1:], profile.thickness.shape[1:]
+        )
+        n_unique = self.align(n_unique, shape)
+        n_list = np.broadcast_to(n_unique[profile.indices], (len(profile),) + shape)
+
+        # Snell's law is solved once per distinct tensor
+        angles = np.broadcast_to(arcsin(k_x / n_unique), (len(n_unique),) + shape)
+        cos_list = np.cos(self.forward_angles(n_list, angles[profile.indices]))
+        ncos_list = n_list * cos_list
+
+        # Fresnel coefficients of all interfaces in one broadcast, with s- and
+        # p-polarization stacked as (interfaces, s/p, ...). The interface matrices
+        # [[1, r], [r, 1]] / t are written as [[sum, diff], [diff, sum]] / (2 n_i cos_i).
+        n_i, n_t = n_list[:-1], n_list[1:]
+        cos_i, cos_t = cos_list[:-1], cos_list[1:]
+        ncos_i, ncos_t = ncos_list[:-1], ncos_list[1:]
+        pcos_i, pcos_t = n_t * cos_i, n_i * cos_t
+        norm = 1 / (2 * ncos_i)
+        m_sum = np.stack((ncos_i + ncos_t, pcos_i + pcos_t), axis=1) * norm[:, None]
+        m_diff = np.stack((ncos_i - ncos_t, pcos_i - pcos_t), axis=1) * norm[:, None]
+
+        # Propagation through the layers in front of the inner interfaces
+        matrices = np.empty((2, 2) + m_sum.shape, dtype=complex)
+        matrices[0, 0, 0] = m_sum[0]
+        matrices[0, 1, 0] = m_diff[0]
+        matrices[1, 0, 0] = m_diff[0]
+        matrices[1, 1, 0] = m_sum[0]
+
+        if len(n_list) > 2:
+            d_list = self.align(profile.thickness[1:-1], shape)
+            phase = 2j * np.pi * ncos_list[1:-1] * d_list / self.lbda
+            ep = np.exp(phase)[:, np.newaxis]
+            em = np.exp(-phase)[:, np.newaxis]
+            matrices[0, 0, 1:] = em * m_sum[1:]
+            matrices[0, 1, 1:] = em * m_diff[1:]
+            matrices[1, 0, 1:] = ep * m_diff[1:]
+            matrices[1, 1, 1:] = ep * m_sum[1:]
+
+        return self.chain_product_2x2(matrices), ncos_list
+
+    def segment_jones_matrices(
+        self,
+        layers: List["AbstractLayer"],
+        front: "Material",
+        back: "Material",
+        k_x: npt.ArrayLike,
+    ) -> Tuple[npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray]:
+        """Calculates the Jones matrices of a coherent sequence of layers
+        between two half-spaces, for light incident from both sides.
+
+        Args:
+            layers (List[AbstractLayer]): List of layers, starting from z=0
+            front (Material): Isotropic material of the front half-space.
+            back (Material): Isotropic material of the back half-space.
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray]:
+                Jones matrices for reflection and transmission of light incident
+                from the front and reflection and transmission of light incident
+                from the back half-space.
+        """
+        # Imported locally to avoid circular imports
+        from .structure import Layer
+
+        m_t, _ = self.profile_transfer_matrix(
+            self.get_compact_profile(
+                [Layer(front, np.inf)] + layers + [Layer(back, np.inf)]
+            ),
+            k_x,
+        )
+        r_b = -m_t[0, 1] / m_t[0, 0]
+
+        return (
+            self.diagonal_jones_matrix(m_t[1, 0] / m_t[0, 0]),
+            self.diagonal_jones_matrix(1 / m_t[0, 0]),
+            self.diagonal_jones_matrix(r_b),
+            self.diagonal_jones_matrix(m_t[1, 1] + m_t[1, 0] * r_b),
+        )
+
+    def calculate(self) -> Result:
+        """Calculates the transfer matrix for the given material stack.
+        Structures with incoherent layers are calculated by :meth:`calculate_incoherent`.
+
+        Returns:
+            Result: Result object with calculation results
+        """
+        if not self.is_coherent():
+            return self.calculate_incoherent()
 
-        zeros = np.repeat(0, n_list.shape[1]) if n_list.ndim > 1 else 1
+        profile = self.permittivity_profile
+        k_x = self.get_k_x(profile[0][1])
 
-        jones_matrix_r = np.moveaxis(np.array([[rtotp, zeros], [zeros, rtots]]), 2, 0)
-        jones_matrix_t = np.moveaxis(np.array([[ttotp, zeros], [zeros, ttots]]), 2, 0)
+        m_t, ncos_list = self.profile_transfer_matrix(profile, k_x)
+        jones_matrix_r = self.diagonal_jones_matrix(m_t[1, 0] / m_t[0, 0])
+        jones_matrix_t = self.diagonal_jones_matrix(1 / m_t[0, 0])
 
         # TODO: Test if p and s correction formulas are needed.
-        power_correction = ((n_list[-1] * np.cos(th_list[-1])).real) / (
-            n_list[0] * np.cos(th_list[0])
-        ).real
+        power_correction = ncos_list[-1].real / ncos_list[0].real
 
         return Result(self.experiment, jones_matrix_r, jones_matrix_t, power_correction)
 
+    @staticmethod
+    def diagonal_jones_matrix(coefficients: npt.NDArray) -> npt.NDArray:
+        """Builds diagonal Jones matrices from coefficients stacked as (s/p, ...).
+
+        Args:
+            coefficients (npt.NDArray): Coefficients for s- and p-polarization.
+
+        Returns:
+            npt.NDArray: Jones matrices with shape (..., 2, 2)
+        """
+        jones_matrix = np.zeros(coefficients.shape[1:] + (2, 2), dtype=complex)
+        jones_matrix[..., 0, 0] = coefficients[1]
+        jones_matrix[..., 1, 1] = coefficients[0]
+        return jones_matrix
+
+    @staticmethod
+    def align(stack: npt.NDArray, shape: Tuple[int, ...]) -> npt.NDArray:
+        """Inserts axes after the first axis of a stack, so that the remaining
+        axes are aligned with the trailing axes of a batch shape.
+
+        Args:
+            stack (npt.NDArray): Stack of values with shape (N, ...)
+            shape (Tuple[int, ...]): Batch shape to align with
+
+        Returns:
+            npt.NDArray: View of the stack
+        """
+        return stack.reshape(
+            stack.shape[:1] + (1,) * (len(shape) + 1 - stack.ndim) + stack.shape[1:]
+        )
+
+    @staticmethod
+    def chain_product_2x2(matrices: npt.NDArray) -> npt.NDArray:
+        """Calculates the ordered matrix product M_0 @ M_1 @ ... @ M_N-1
+        of a stack of 2x2 matrices as pairwise tree reduction.
+
+        The matrix axes lead, so each reduction step multiplies all pairs with
+        a single einsum over contiguous batch axes, which is considerably faster
+        than a batched matmul of tiny matrices.
+
+        Args:
+            matrices (npt.NDArray): Stack of matrices with shape (2, 2, N, ...)
+
+        Returns:
+            npt.NDArray: Ordered product of all matrices with shape (2, 2, ...)
+        """
+        while matrices.shape[2] > 1:
+            left = matrices[:, :, 0:-1:2]
+            right = matrices[:, :, 1::2]
+            paired = np.einsum("ij...,jk...->ik...", left, right)
+            if matrices.shape[2] % 2:
+                paired = np.concatenate((paired, matrices[:, :, -1:]), axis=2)
+            matrices = paired
+        return matrices[:, :, 0]
+
     @staticmethod
     def fresnel(n_i, n_t, th_i, th_t):
         r"""Calculate fresnel coefficients at the interface of two materials
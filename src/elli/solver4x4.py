@@ -1,6 +1,8 @@
 # Encoding: utf-8
 from abc import ABC, abstractmethod
-from typing import Literal
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Dict, List, Literal, Mapping, Optional, Tuple, Union
 
 import numpy as np
 import numpy.typing as npt
@@ -16,13 +18,103 @@ else:
 from numpy.lib.scimath import sqrt
 from scipy.linalg import expm as scipy_expm
 
-from .materials import IsotropicMaterial
+from .materials import IsotropicMaterial, TensorForm, widest_tensor_form
 from .result import Result
 from .solver import Solver
+from .utils import E_Z, rotation_v_theta
 
 
 class Propagator(ABC):
-    """Propagator abstract base class."""
+    """Propagator abstract base class.
+
+    Calculated propagators are memoized in a least-recently-used cache.
+    The cache key is built from the Delta matrix, the thickness and the wavelengths,
+    so identical layers, i.e. same material state, thickness, wavelengths and Kx,
+    are calculated only once and reused within one and across multiple evaluations.
+    """
+
+    cache_size = 0
+    _cache = None
+
+    def __init__(self, cache_size: int = 32) -> None:
+        """Creates the propagator and its cache.
+
+        Args:
+            cache_size (int, optional): Maximum number of cached propagators.
+                A value of 0 disables the cache. Defaults to 32.
+        """
+        self._cache = OrderedDict()
+        self.set_cache_size(cache_size)
+
+    def set_cache_size(self, cache_size: int) -> None:
+        """Sets the maximum number of cached propagators.
+        If the cache holds more entries, the least recently used are discarded.
+
+        Args:
+            cache_size (int): Maximum number of cached propagators.
+                A value of 0 disables the cache.
+        """
+        if cache_size < 0:
+            raise ValueError("Cache size can't be negative.")
+
+        if self._cache is None:
+            self._cache = OrderedDict()
+
+        self.cache_size = cache_size
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        """Removes all cached propagators."""
+        if self._cache is not None:
+            self._cache.clear()
+
+    @staticmethod
+    def _cache_key(
+        delta: npt.NDArray, thickness: npt.ArrayLike, lbda: npt.ArrayLike
+    ) -> bytes:
+        """Returns a digest of all arguments of the propagation, used as cache key."""
+        key = blake2b(digest_size=16)
+        for array in (
+            np.asarray(delta, dtype=np.complex128),
+            np.asarray(thickness, dtype=float),
+            np.asarray(lbda, dtype=float),
+        ):
+            key.update(repr(array.shape).encode())
+            key.update(np.ascontiguousarray(array).data)
+        return key.digest()
+
+    def propagate(
+        self, delta: npt.NDArray, thickness: float, lbda: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Returns the propagation for a given Delta matrix and layer thickness.
+        The result is taken from the cache if available, otherwise it is calculated
+        by calculate_propagation and stored in the cache.
+
+        Args:
+            delta (npt.NDArray): Delta Matrix
+            thickness (float): Thickness of layer (nm)
+            lbda (npt.ArrayLike): Wavelengths to evaluate (nm)
+
+        Returns:
+            npt.NDArray: Read-only propagator for the given layer
+        """
+        if self.cache_size == 0:
+            return self.calculate_propagation(delta, thickness, lbda)
+
+        key = self._cache_key(delta, thickness, lbda)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        propagator = np.asarray(self.calculate_propagation(delta, thickness, lbda))
+        propagator.flags.writeable = False
+
+        self._cache[key] = propagator
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return propagator
 
     @abstractmethod
     def calculate_propagation(
@@ -30,6 +122,10 @@ class Propagator(ABC):
     ) -> npt.NDArray:
         """Calculates propagation for a given Delta matrix and layer thickness.
 
+        The Delta matrix may carry additional leading batch axes, e.g. for multiple
+        angles of incidence. The batch shape ``delta.shape[:-2]`` is broadcast
+        against the shapes of thickness and wavelengths.
+
         Args:
             delta (npt.NDArray): Delta Matrix
             thickness (float): Thickness of layer (nm)
@@ -39,6 +135,47 @@ class Propagator(ABC):
             npt.NDArray: Propagator for the given layer
         """
 
+    def propagate_derivative(
+        self,
+        delta: npt.NDArray,
+        d_delta: npt.NDArray,
+        thickness: npt.ArrayLike,
+        d_thickness: npt.ArrayLike,
+        lbda: npt.ArrayLike,
+    ) -> Tuple[npt.NDArray, npt.NDArray]:
+        """Calculates the propagator and its directional derivative.
+
+        The derivative of the matrix exponential exp(X) in direction dX is the
+        upper right block of the exponential of the block matrix [[X, dX], [0, X]].
+        It is exact for any Delta matrix, independent of the approximation
+        used by the propagator itself.
+
+        Args:
+            delta (npt.NDArray): Delta Matrix
+            d_delta (npt.NDArray): Derivative of the Delta Matrix
+            thickness (npt.ArrayLike): Thickness of layer (nm)
+            d_thickness (npt.ArrayLike): Derivative of the thickness
+            lbda (npt.ArrayLike): Wavelengths to evaluate (nm)
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray]: Propagator and its derivative
+        """
+        k_0 = 2 * sc.pi / np.asarray(lbda)
+        mats = 1j * (k_0 * thickness)[..., np.newaxis, np.newaxis] * delta
+        d_mats = (
+            1j * (k_0 * d_thickness)[..., np.newaxis, np.newaxis] * delta
+            + 1j * (k_0 * thickness)[..., np.newaxis, np.newaxis] * d_delta
+        )
+        mats, d_mats = np.broadcast_arrays(mats, d_mats)
+
+        block = np.zeros(mats.shape[:-2] + (8, 8), dtype=np.complex128)
+        block[..., :4, :4] = mats
+        block[..., 4:, 4:] = mats
+        block[..., :4, 4:] = d_mats
+        block = scipy_expm(block)
+
+        return block[..., :4, :4], block[..., :4, 4:]
+
 
 class PropagatorLinear(Propagator):
     """Propagator class using a simple linear approximation of the matrix exponential."""
@@ -56,8 +193,9 @@ class PropagatorLinear(Propagator):
         Returns:
             npt.NDArray: Propagator for the given layer
         """
-        p_hs_lin = np.identity(4) + 1j * thickness * np.einsum(
-            "nij,n->nij", delta, 2 * sc.pi / lbda
+        p_hs_lin = (
+            np.identity(4)
+            + 1j * (2 * sc.pi * thickness / lbda)[..., np.newaxis, np.newaxis] * delta
         )
         return p_hs_lin
 
@@ -65,7 +203,11 @@ class PropagatorLinear(Propagator):
 class PropagatorExpm(Propagator):
     """Propagator class using the Padé approximation of the matrix exponential."""
 
-    def __init__(self, backend: Literal["torch", "scipy", "automatic"] = "automatic"):
+    def __init__(
+        self,
+        backend: Literal["torch", "scipy", "automatic"] = "automatic",
+        cache_size: int = 32,
+    ) -> None:
         """The Propagator can use two different backends: SciPy and PyTorch.
         The default installation only provides SciPy.
         PyTorch is faster and will be used automatically if available.
@@ -73,7 +215,10 @@ class PropagatorExpm(Propagator):
 
         Args:
             backend (Literal["torch", "scipy", "automatic"], optional): Setting to change the linear algebra provider. Defaults to "automatic".
+            cache_size (int, optional): Maximum number of cached propagators. Defaults to 32.
         """
+        super().__init__(cache_size)
+
         backends = {
             "torch": lambda mats: torch.linalg.matrix_exp(
                 torch.from_numpy(mats)
@@ -110,7 +255,7 @@ class PropagatorExpm(Propagator):
         Returns:
             npt.NDArray: Propagator for the given layer
         """
-        mats = 1j * thickness * np.einsum("nij,n->nij", delta, 2 * sc.pi / lbda)
+        mats = 1j * (2 * sc.pi * thickness / lbda)[..., np.newaxis, np.newaxis] * delta
 
         propagator = self.expm(mats)
 
@@ -133,72 +278,313 @@ class PropagatorEig(Propagator):
         Returns:
             npt.NDArray: Propagator for the given layer
         """
+        return self.propagate_decomposition(*self.decompose(delta), thickness, lbda)
+
+    @staticmethod
+    def decompose(delta: npt.NDArray) -> Tuple[npt.NDArray, npt.NDArray, npt.NDArray]:
+        """Calculates the eigendecomposition of a Delta matrix.
+        Only the propagation depends on the thickness, so the decomposition
+        can be reused for multiple thicknesses of the same layer.
+
+        Args:
+            delta (npt.NDArray): Delta Matrix
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray, npt.NDArray]:
+                Eigenvalues, eigenvectors and the inverse of the eigenvectors
+        """
         q, w = np.linalg.eig(delta)
 
         # Sort according to z propagation direction, by Re(q) first, then Im(q)
         i = np.lexsort((-np.real(q), -np.imag(q)))
 
         q = np.take_along_axis(q, i, axis=-1)
-        w = np.take_along_axis(w, i[:, np.newaxis, :], axis=-1)
+        w = np.take_along_axis(w, i[..., np.newaxis, :], axis=-1)
+
+        return q, w, np.linalg.inv(w)
+
+    @staticmethod
+    def propagate_decomposition(
+        q: npt.NDArray,
+        w: npt.NDArray,
+        w_i: npt.NDArray,
+        thickness: npt.ArrayLike,
+        lbda: npt.ArrayLike,
+    ) -> npt.NDArray:
+        """Calculates the propagation from the eigendecomposition of a Delta matrix.
+
+        Args:
+            q (npt.NDArray): Eigenvalues of the Delta matrix
+            w (npt.NDArray): Eigenvectors of the Delta matrix
+            w_i (npt.NDArray): Inverse of the eigenvectors
+            thickness (npt.ArrayLike): Thickness of layer (nm),
+                may carry additional leading batch axes.
+            lbda (npt.ArrayLike): Wavelengths to evaluate (nm)
+
+        Returns:
+            npt.NDArray: Propagator for the given layer
+        """
+        q = np.exp(q * (2j * sc.pi * thickness / lbda)[..., np.newaxis])
+
+        return (w * q[..., np.newaxis, :]) @ w_i
+
+
+class PropagatorAnalytic(Propagator):
+    r"""Propagator class using the closed-form solution for decoupled s and p polarizations.
+
+    For isotropic materials and materials with a diagonal permittivity tensor
+    the Delta matrix decouples into a p-block (Ex, Hy) and an s-block (Ey, Hx).
+    Both blocks have the form [[0, b], [c, 0]], which squares to k_z² = b·c times
+    the identity, so the matrix exponential can be written exactly as
+
+    .. math::
+        \exp(i \phi M) = \cos(\phi k_z) I + i \frac{\sin(\phi k_z)}{k_z} M
+
+    Layers with coupled polarizations, i.e. genuinely anisotropic layers,
+    are handed over to the fallback propagator.
+    """
+
+    # Entries of the Delta matrix, which are non-zero only for coupled polarizations
+    _coupling_mask = np.array(
+        [
+            [True, True, True, False],
+            [True, True, False, True],
+            [True, False, True, True],
+            [False, True, True, True],
+        ]
+    )
+
+    def __init__(self, fallback: Propagator = None, cache_size: int = 32) -> None:
+        """Creates an analytic propagator.
+
+        Args:
+            fallback (Propagator, optional): Propagator used for layers with coupled
+                s and p polarizations. Defaults to PropagatorExpm().
+            cache_size (int, optional): Maximum number of cached propagators. Defaults to 32.
+        """
+        super().__init__(cache_size)
+        if fallback is None:
+            fallback = PropagatorExpm()
+        self.fallback = fallback
 
-        w_i = np.linalg.inv(w)
+    @classmethod
+    def is_decoupled(cls, delta: npt.NDArray) -> npt.NDArray:
+        """Checks which Delta matrices decouple into independent s and p blocks.
 
-        q = np.exp(q * 2j * thickness * sc.pi / lbda[:, None])
+        Args:
+            delta (npt.NDArray): Delta Matrix
+
+        Returns:
+            npt.NDArray: Boolean array with the batch shape of the Delta matrix,
+                True where all coupling entries of the Delta matrix are zero.
+        """
+        return ~np.any(delta[..., cls._coupling_mask], axis=-1)
+
+    def calculate_propagation(
+        self, delta: npt.NDArray, thickness: float, lbda: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Calculates propagation for a given Delta matrix and layer thickness.
+        Uses the closed-form solution if possible and the fallback propagator otherwise.
+
+        Args:
+            delta (npt.NDArray): Delta Matrix
+            thickness (float): Thickness of layer (nm)
+            lbda (npt.ArrayLike): Wavelengths to evaluate (nm)
+
+        Returns:
+            npt.NDArray: Propagator for the given layer
+        """
+        decoupled = self.is_decoupled(delta)
+        if not np.any(decoupled):
+            return self.fallback.calculate_propagation(delta, thickness, lbda)
+
+        phi = 2 * sc.pi * thickness / lbda
+        shape = np.broadcast_shapes(delta.shape[:-2], np.shape(phi))
+        delta = np.broadcast_to(delta, shape + (4, 4))
+        decoupled = np.broadcast_to(decoupled, shape)
+        phi = np.broadcast_to(phi, shape)
+        propagator = np.zeros(delta.shape, dtype=np.complex128)
+
+        for i, j in [(0, 3), (1, 2)]:
+            b = delta[..., i, j]
+            c = delta[..., j, i]
+            phase = phi * sqrt(b * c)
+
+            cos_term = np.cos(phase)
+            # sin(φ k_z) / k_z = φ sinc(φ k_z / π) is well-defined for k_z = 0
+            sin_term = 1j * phi * np.sinc(phase / sc.pi)
+
+            propagator[..., i, i] = cos_term
+            propagator[..., j, j] = cos_term
+            propagator[..., i, j] = sin_term * b
+            propagator[..., j, i] = sin_term * c
+
+        if not np.all(decoupled):
+            # Mixed batches, e.g. multiple layers evaluated at once
+            coupled = ~decoupled
+            thickness = np.broadcast_to(thickness, delta.shape[:-2])[coupled]
+            lbda = np.broadcast_to(lbda, delta.shape[:-2])[coupled]
+            propagator[coupled] = self.fallback.calculate_propagation(
+                delta[coupled], thickness, lbda
+            )
+
+        return propagator
+
+
+class TransferMatrixChain:
+    """Ordered product of the transfer matrices of a sequence of layers.
 
-        p = np.zeros((lbda.shape[0], 4, 4), dtype=np.complex128)
-        for i in range(4):
-            p[:, i, i] = q[:, i]
+    The prefix products P_i = U_0 @ ... @ U_i-1 and suffix products
+    S_i = U_i @ ... @ U_K-1 of the unit matrices U_i are kept between evaluations.
+    If only the unit k changed, the product is obtained by two matrix multiplications
+    S_k = U_k @ S_k+1 and P_k @ S_k, instead of recalculating the whole chain.
+    If the changed units span the range from i to j, the prefixes are extended
+    and the suffixes are rebuilt up to the last changed unit, which needs
+    j - i + 2 multiplications. Thus, alternating changes of two units
+    need one multiplication per unit between them.
+    """
 
-        return w @ p @ w_i
+    def __init__(self, size: int, k_x: npt.ArrayLike) -> None:
+        """Creates an empty chain.
+
+        Args:
+            size (int): Number of units in the chain.
+            k_x (npt.ArrayLike): Reduced wavenumber, for which the chain is valid.
+        """
+        self.k_x = k_x
+        self.units = [None] * size
+        self.prefix = [np.identity(4)] + [None] * size
+        self.suffix = [None] * size + [np.identity(4)]
+        # Prefixes are valid up to this index, suffixes from this index on
+        self.prefix_valid = 0
+        self.suffix_valid = size
+        self.last_changed = size - 1
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    def invalidate_unit(self, index: int) -> None:
+        """Marks a unit as changed, which needs to be set again.
+
+        Args:
+            index (int): Index of the unit.
+        """
+        self.units[index] = None
+        self.prefix_valid = min(self.prefix_valid, index)
+        self.suffix_valid = max(self.suffix_valid, index + 1)
+        self.last_changed = index
+
+    def set_unit(self, index: int, matrix: npt.NDArray) -> None:
+        """Sets the transfer matrix of a unit.
+
+        Args:
+            index (int): Index of the unit.
+            matrix (npt.NDArray): Transfer matrix of the unit.
+        """
+        self.invalidate_unit(index)
+        self.units[index] = matrix
+
+    def product(self) -> npt.NDArray:
+        """Returns the ordered product of all units.
+
+        Returns:
+            npt.NDArray: Transfer matrix of the whole chain
+        """
+        if self.prefix_valid >= self.suffix_valid:
+            i = self.suffix_valid
+            return self.prefix[i] @ self.suffix[i]
+
+        # Split the changed range at the last changed unit, so a following
+        # change of the same or a nearby unit only needs a few multiplications
+        split = self.last_changed
+        for i in range(self.prefix_valid, split):
+            self.prefix[i + 1] = self.prefix[i] @ self.units[i]
+        for i in reversed(range(split, self.suffix_valid)):
+            self.suffix[i] = self.units[i] @ self.suffix[i + 1]
+        self.prefix_valid = split
+        self.suffix_valid = split
+
+        return self.prefix[split] @ self.suffix[split]
+
+    def derivative(self, unit_derivatives: Dict[int, npt.NDArray]) -> npt.NDArray:
+        """Returns the derivative of the ordered product by the product rule,
+        i.e. the sum of P_i @ dU_i @ S_i+1 over all units with a derivative dU_i.
+
+        All prefix and suffix products are completed, so derivatives for
+        multiple parameters are obtained by two multiplications per changed unit.
+
+        Args:
+            unit_derivatives (Dict[int, npt.NDArray]): Derivatives of the units by index.
+
+        Returns:
+            npt.NDArray: Derivative of the transfer matrix of the whole chain
+        """
+        size = len(self.units)
+        self.product()
+
+        for i in range(self.prefix_valid, size):
+            self.prefix[i + 1] = self.prefix[i] @ self.units[i]
+        for i in reversed(range(self.suffix_valid)):
+            self.suffix[i] = self.units[i] @ self.suffix[i + 1]
+        self.prefix_valid = size
+        self.suffix_valid = 0
+
+        derivative = 0
+        for i, d_unit in unit_derivatives.items():
+            derivative = derivative + self.prefix[i] @ d_unit @ self.suffix[i + 1]
+        return derivative
 
 
 class Solver4x4(Solver):
     """Solver class to evaluate Experiment objects. Based on Berreman's 4x4 method."""
 
     @staticmethod
-    def build_delta_matrix(k_x: npt.ArrayLike, eps: npt.NDArray) -> npt.NDArray:
+    def build_delta_matrix(
+        k_x: npt.ArrayLike, eps: npt.NDArray, form: TensorForm = "full"
+    ) -> npt.NDArray:
         """Calculates Delta matrix for given permittivity and reduced wave number.
 
+        For isotropic and diagonal tensors, only the non-zero elements are calculated.
+
         Args:
             k_x (npt.ArrayLike): reduce wave number, Kx = kx/k0
-            eps (npt.NDArray): permittivity tensor
+            eps (npt.NDArray): permittivity tensor, in the compact form for
+                isotropic (..., 1) and diagonal (..., 3) tensors
+            form (TensorForm, optional): Form of the permittivity tensor,
+                "isotropic", "diagonal" or "full". Defaults to "full".
 
         Returns:
             npt.NDArray: Delta 4x4 matrix: infinitesimal propagation matrix
         """
-        if np.shape(k_x) == ():
-            length = 1
-        else:
-            length = np.shape(k_x)[0]
-
-        zeros = np.tile(0, length)
-        ones = np.tile(1, length)
-
-        delta = np.array(
-            [
-                [
-                    -k_x * eps[:, 2, 0] / eps[:, 2, 2],
-                    -k_x * eps[:, 2, 1] / eps[:, 2, 2],
-                    zeros,
-                    ones - k_x**2 / eps[:, 2, 2],
-                ],
-                [zeros, zeros, -ones, zeros],
-                [
-                    eps[:, 1, 2] * eps[:, 2, 0] / eps[:, 2, 2] - eps[:, 1, 0],
-                    k_x**2 - eps[:, 1, 1] + eps[:, 1, 2] * eps[:, 2, 1] / eps[:, 2, 2],
-                    zeros,
-                    k_x * eps[:, 1, 2] / eps[:, 2, 2],
-                ],
-                [
-                    eps[:, 0, 0] - eps[:, 0, 2] * eps[:, 2, 0] / eps[:, 2, 2],
-                    eps[:, 0, 1] - eps[:, 0, 2] * eps[:, 2, 1] / eps[:, 2, 2],
-                    zeros,
-                    -k_x * eps[:, 0, 2] / eps[:, 2, 2],
-                ],
-            ],
-            dtype=np.complex128,
+        if form != "full":
+            eps_xx = eps[..., 0]
+            eps_yy = eps[..., 1] if form == "diagonal" else eps_xx
+            eps_zz = eps[..., 2] if form == "diagonal" else eps_xx
+            shape = np.broadcast_shapes(np.shape(k_x), np.shape(eps_zz))
+
+            delta = np.zeros(shape + (4, 4), dtype=np.complex128)
+            delta[..., 0, 3] = 1 - k_x**2 / eps_zz
+            delta[..., 1, 2] = -1
+            delta[..., 2, 1] = k_x**2 - eps_yy
+            delta[..., 3, 0] = eps_xx
+            return delta
+
+        eps_zz = eps[..., 2, 2]
+        shape = np.broadcast_shapes(np.shape(k_x), np.shape(eps_zz))
+
+        delta = np.zeros(shape + (4, 4), dtype=np.complex128)
+        delta[..., 0, 0] = -k_x * eps[..., 2, 0] / eps_zz
+        delta[..., 0, 1] = -k_x * eps[..., 2, 1] / eps_zz
+        delta[..., 0, 3] = 1 - k_x**2 / eps_zz
+        delta[..., 1, 2] = -1
+        delta[..., 2, 0] = eps[..., 1, 2] * eps[..., 2, 0] / eps_zz - eps[..., 1, 0]
+        delta[..., 2, 1] = (
+            k_x**2 - eps[..., 1, 1] + eps[..., 1, 2] * eps[..., 2, 1] / eps_zz
         )
-        delta = np.moveaxis(delta, 2, 0)
+        delta[..., 2, 3] = k_x * eps[..., 1, 2] / eps_zz
+        delta[..., 3, 0] = eps[..., 0, 0] - eps[..., 0, 2] * eps[..., 2, 0] / eps_zz
+        delta[..., 3, 1] = eps[..., 0, 1] - eps[..., 0, 2] * eps[..., 2, 1] / eps_zz
+        delta[..., 3, 3] = -k_x * eps[..., 0, 2] / eps_zz
         return delta
 
     @staticmethod
@@ -222,39 +608,39 @@ class Solver4x4(Solver):
         idx = np.lexsort((-np.real(q), -np.imag(q)))
 
         q = np.take_along_axis(q, idx, axis=-1)
-        p = np.take_along_axis(p, idx[:, np.newaxis, :], axis=-1)
+        p = np.take_along_axis(p, idx[..., np.newaxis, :], axis=-1)
         # Result should be (+,+,-,-)
 
         # For each direction, sort according to Ey component, highest Ey first
-        i1 = np.argsort(-np.abs(p[:, 1, :2]))
-        i2 = 2 + np.argsort(-np.abs(p[:, 1, 2:]))
-        i = np.hstack((i1, i2))
+        i1 = np.argsort(-np.abs(p[..., 1, :2]))
+        i2 = 2 + np.argsort(-np.abs(p[..., 1, 2:]))
+        i = np.concatenate((i1, i2), axis=-1)
         # Result should be (s+,p+,s-,p-)
 
         # Reorder
-        i[:, [1, 2]] = i[:, [2, 1]]
+        i[..., [1, 2]] = i[..., [2, 1]]
 
         q = np.take_along_axis(q, i, axis=-1)
-        p = np.take_along_axis(p, i[:, np.newaxis, :], axis=-1)
+        p = np.take_along_axis(p, i[..., np.newaxis, :], axis=-1)
         # Result should be(s+,s-,p+,p-)
 
         # Adjust Ey in ℝ⁺ for 's', and Ex in ℝ⁺ for 'p'
-        e = np.hstack((p[:, 1, :2], p[:, 0, 2:]))
+        e = np.concatenate((p[..., 1, :2], p[..., 0, 2:]), axis=-1)
 
         ne = np.abs(e)
         c = np.ones_like(e)
         i = ne != 0.0
         c[i] = e[i] / ne[i]
 
-        p = p * c[:, np.newaxis, :]
+        p = p * c[..., np.newaxis, :]
 
         # Normalize so that Ey = c1 + c2, analog to Ey = Eis + Ers
         # For an isotropic half-space, this should return the same matrix
         # as IsotropicHalfSpace
-        c = p[:, 1, 0] + p[:, 1, 1]
+        c = p[..., 1, 0] + p[..., 1, 1]
         np.where(np.abs(c) == 0, 1, c)
 
-        p = 2 * p / c[:, np.newaxis, np.newaxis]
+        p = 2 * p / c[..., np.newaxis, np.newaxis]
 
         return p
 
@@ -272,36 +658,32 @@ class Solver4x4(Solver):
         Returns:
             npt.NDArray: transition matrix L
         """
-        n_x = sqrt(epsilon[:, 0, 0])
+        n_x = sqrt(epsilon[..., 0, 0])
         sin_phi = k_x / n_x
         cos_phi = sqrt(1 - sin_phi**2)
 
-        length = np.shape(k_x)[0]
-        zeros = np.tile(0, length)
-        ones = np.tile(1, length)
+        sp_to_xy = np.zeros(np.shape(sin_phi) + (4, 4), dtype=np.complex128)
 
         if inv:
-            sp_to_xy = np.array(
-                [
-                    [zeros, ones, -ones / cos_phi / n_x, zeros],
-                    [zeros, ones, ones / cos_phi / n_x, zeros],
-                    [ones / cos_phi, zeros, zeros, ones / n_x],
-                    [-ones / cos_phi, zeros, zeros, ones / n_x],
-                ],
-                dtype=np.complex128,
-            )
-            return np.moveaxis(0.5 * sp_to_xy, 2, 0)
-
-        sp_to_xy = np.array(
-            [
-                [zeros, zeros, cos_phi, -cos_phi],
-                [ones, ones, zeros, zeros],
-                [-n_x * cos_phi, n_x * cos_phi, zeros, zeros],
-                [zeros, zeros, n_x, n_x],
-            ],
-            dtype=np.complex128,
-        )
-        return np.moveaxis(sp_to_xy, 2, 0)
+            sp_to_xy[..., 0, 1] = 0.5
+            sp_to_xy[..., 0, 2] = -0.5 / cos_phi / n_x
+            sp_to_xy[..., 1, 1] = 0.5
+            sp_to_xy[..., 1, 2] = 0.5 / cos_phi / n_x
+            sp_to_xy[..., 2, 0] = 0.5 / cos_phi
+            sp_to_xy[..., 2, 3] = 0.5 / n_x
+            sp_to_xy[..., 3, 0] = -0.5 / cos_phi
+            sp_to_xy[..., 3, 3] = 0.5 / n_x
+            return sp_to_xy
+
+        sp_to_xy[..., 0, 2] = cos_phi
+        sp_to_xy[..., 0, 3] = -cos_phi
+        sp_to_xy[..., 1, 0] = 1
+        sp_to_xy[..., 1, 1] = 1
+        sp_to_xy[..., 2, 0] = -n_x * cos_phi
+        sp_to_xy[..., 2, 1] = n_x * cos_phi
+        sp_to_xy[..., 3, 2] = n_x
+        sp_to_xy[..., 3, 3] = n_x
+        return sp_to_xy
 
     @staticmethod
     def get_k_z(
@@ -322,50 +704,759 @@ class Solver4x4(Solver):
         return sqrt(k_z2)
 
     def __init__(
-        self, experiment: "Experiment", propagator: Propagator = PropagatorExpm()
+        self,
+        experiment: "Experiment",
+        propagator: Optional[Propagator] = None,
+        batched: bool = False,
     ) -> None:
+        """Creates a 4x4 solver for the given experiment.
+
+        Args:
+            experiment (Experiment): Experiment to evaluate.
+            propagator (Propagator, optional): Propagator used for the layers.
+                Defaults to None, which creates a new PropagatorAnalytic() for this solver.
+                It uses the closed-form solution for layers with decoupled polarizations
+                and PropagatorExpm() for all others. A propagator memoizing its results
+                is only shared between solvers, if it is passed explicitly.
+            batched (bool, optional): If True, the propagators of all layers are
+                calculated in a single batched call of the propagator. This reduces
+                the overhead for structures with many thin slices, but needs memory
+                for the propagators of all layers at once. Defaults to False.
+        """
         super().__init__(experiment)
-        self.propagator = propagator
+        self.propagator = PropagatorAnalytic() if propagator is None else propagator
+        self.batched = batched
+        self._chain = None
+        self._unit_indices = {}
 
-    def calculate(self) -> Result:
-        """Calculates transition matrices for every element in the structure and resulting Jones matrices.
+    def invalidate(self, objects: List[object] = None) -> None:
+        """Removes memoized tensors and profiles and marks the transfer matrices
+        of the respective layers for recalculation.
+
+        Args:
+            objects (List[object], optional): Materials and layers to invalidate.
+                Invalidates all memoized entries, if not provided. Defaults to None.
+        """
+        super().invalidate(objects)
+
+        if objects is None or self._chain is None:
+            self._chain = None
+            return
+
+        for obj in objects:
+            for index in self._unit_indices.get(id(obj), []):
+                self._chain.invalidate_unit(index)
+
+    def profile_transfer_matrix(
+        self,
+        profile: Union["PermittivityProfile", List[Tuple[float, npt.NDArray]]],
+        k_x: npt.ArrayLike,
+    ) -> npt.NDArray:
+        """Calculates the transfer matrix of a permittivity profile.
+
+        The Delta matrices are built only once for every distinct tensor of the profile.
+        In batched mode, the propagators of all distinct pairs of tensors and thicknesses
+        are calculated with a single call of the propagator.
+        The chain product is then calculated as reduction over the stack.
+
+        Args:
+            profile (Union[PermittivityProfile, List[Tuple[float, npt.NDArray]]]):
+                Compact profile or list of tuples [(thickness, dielectric tensor), ...],
+                starting from z=0
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
 
         Returns:
-            Result: Result object with calculation results
+            npt.NDArray: Product of the propagators of all profile entries
         """
-        # Kx = kx/k0 = n sin(Φ) : Reduced wavenumber.
-        nx = self.structure.front_material.get_refractive_index(self.lbda)[:, 0, 0]
-        k_x = nx * np.sin(np.deg2rad(self.theta_i))
+        # Imported locally to avoid circular imports
+        from .structure import PermittivityProfile
+
+        profile = PermittivityProfile.from_list(profile)
+
+        form = profile.tensor_form
+
+        if self.batched and len(profile) > 1:
+            # Isotropic and diagonal profiles only need the diagonal elements
+            if form == "full":
+                epsilon, trailing = profile.tensors, 2
+            else:
+                epsilon, trailing = profile.diagonal, 1
+                if form == "isotropic":
+                    epsilon = epsilon[..., :1]
+
+            # Stack axis first, followed by the batch axes of k_x
+            epsilon = epsilon.reshape(
+                epsilon.shape[:1]
+                + (1,) * max(0, np.ndim(k_x) - epsilon.ndim + 1 + trailing)
+                + epsilon.shape[1:]
+            )
+            delta = self.build_delta_matrix(k_x, epsilon, form)
+
+            thickness = -profile.thickness
+            indices = profile.indices
+            if thickness.ndim == 1:
+                # Repeated slices are propagated only once
+                pairs, inverse = np.unique(
+                    np.stack((indices, thickness), axis=-1),
+                    axis=0,
+                    return_inverse=True,
+                )
+                indices, thickness = pairs[:, 0].astype(int), pairs[:, 1]
+            thickness = thickness.reshape(
+                thickness.shape[:1]
+                + (1,) * (delta.ndim - 2 - thickness.ndim)
+                + thickness.shape[1:]
+            )
 
-        layers = reversed(self.permittivity_profile[1:-1])
+            m_p = self.propagator.propagate(delta[indices], thickness, self.lbda)
+            if profile.thickness.ndim == 1:
+                m_p = m_p[inverse.reshape(-1)]
+            return self.chain_product(m_p)
+
+        deltas = {}
+        m_t = np.identity(4)
+        for thickness, index in zip(profile.thickness, profile.indices):
+            if index not in deltas:
+                epsilon = profile.tensor_list[index]
+                if profile.forms[index] != "full":
+                    epsilon = np.diagonal(epsilon, axis1=-2, axis2=-1)
+                deltas[index] = self.build_delta_matrix(
+                    k_x, epsilon, widest_tensor_form("diagonal", profile.forms[index])
+                )
+            m_p = self.propagator.propagate(deltas[index], -thickness, self.lbda)
+            m_t = m_t @ m_p
+        return m_t
+
+    def layers_transfer_matrix(
+        self, layers: List["AbstractLayer"], k_x: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Calculates the transfer matrix of a sequence of layers.
 
-        if isinstance(self.structure.back_material, IsotropicMaterial):
-            m_t = self.transition_matrix_iso_halfspace(
-                k_x, self.permittivity_profile[-1][1]
+        RepeatedLayers are not expanded, instead the transfer matrix of one period is
+        raised to the power of the repetitions by repeated squaring,
+        so the cost grows only logarithmically with the number of repetitions.
+        Inhomogeneous layers with the "magnus" or "helicoidal" propagation
+        are calculated on their own, all other layers from their permittivity profile.
+
+        Args:
+            layers (List[AbstractLayer]): List of layers, starting from z=0
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            npt.NDArray: Product of the transfer matrices of all layers
+        """
+        # Imported locally to avoid circular imports
+        from .structure import InhomogeneousLayer, RepeatedLayers, TwistedLayer
+
+        m_t = np.identity(4)
+        sequence = []
+        for layer in layers:
+            if isinstance(layer, RepeatedLayers):
+                m_layer = self.repeated_layers_transfer_matrix(layer, k_x)
+            elif isinstance(layer, TwistedLayer) and layer.propagation == "helicoidal":
+                m_layer = self.helicoidal_transfer_matrix(layer, k_x)
+            elif (
+                isinstance(layer, InhomogeneousLayer) and layer.propagation == "magnus"
+            ):
+                m_layer = self.slices_transfer_matrix(
+                    layer,
+                    layer.get_slices(self.lbda, k_x),
+                    self.lbda,
+                    k_x,
+                    self.propagator,
+                )
+            else:
+                sequence.append(layer)
+                continue
+
+            m_t = m_t @ self.profile_transfer_matrix(
+                self.get_compact_profile(sequence), k_x
+            )
+            m_t = m_t @ m_layer
+            sequence = []
+
+        return m_t @ self.profile_transfer_matrix(
+            self.get_compact_profile(sequence), k_x
+        )
+
+    def repeated_layers_transfer_matrix(
+        self, layer: "RepeatedLayers", k_x: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Calculates the transfer matrix of a RepeatedLayers object
+        by exponentiation by squaring of the transfer matrix of one period.
+
+        Args:
+            layer (RepeatedLayers): Repeated structure of layers
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            npt.NDArray: Transfer matrix of the repeated structure
+        """
+        m_period = self.layers_transfer_matrix(layer.layers, k_x)
+        m_t = np.linalg.matrix_power(m_period, layer.repetitions)
+
+        if layer.before > 0 or layer.after > 0:
+            # The partial periods are counted in entries of the period profile
+            profile = self.get_compact_profile(layer.layers)
+
+            if layer.before > 0:
+                m_t = self.profile_transfer_matrix(profile[-layer.before :], k_x) @ m_t
+            if layer.after > 0:
+                m_t = m_t @ self.profile_transfer_matrix(profile[: layer.after], k_x)
+
+        return m_t
+
+    @staticmethod
+    def slices_transfer_matrix(
+        layer: "InhomogeneousLayer",
+        z: npt.NDArray,
+        lbda: npt.ArrayLike,
+        k_x: npt.ArrayLike,
+        propagator: Propagator,
+        magnus: Optional[bool] = None,
+    ) -> npt.NDArray:
+        """Calculates the transfer matrix of an inhomogeneous layer for given slices.
+
+        The tensors of all slices are evaluated at once. For the "magnus" propagation,
+        the Delta matrices Δ1 and Δ2 at the two Gauss points of each slice
+        of thickness h are combined to the effective Delta matrix
+        (Δ1 + Δ2) / 2 + i √3 k0 h / 12 [Δ2, Δ1] of the fourth order Magnus expansion.
+        Otherwise, the Delta matrix is evaluated in the middle of each slice.
+
+        Args:
+            layer (InhomogeneousLayer): Layer to evaluate.
+            z (npt.NDArray): 'z' positions of the slices [z0, z1, ..., zmax].
+            lbda (npt.ArrayLike): Wavelengths to evaluate (nm)
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+            propagator (Propagator): Propagator used for the slices.
+            magnus (bool, optional): Whether the slices are integrated with the
+                Magnus expansion. Defaults to None, i.e. for the "magnus" propagation.
+
+        Returns:
+            npt.NDArray: Transfer matrix of the layer
+        """
+        thickness = np.diff(z)
+        if magnus is None:
+            magnus = layer.propagation == "magnus"
+        if magnus:
+            offset = (0.5 - np.sqrt(3) / 6) * thickness
+            z = np.concatenate((z[:-1] + offset, z[1:] - offset))
+        else:
+            z = (z[:-1] + z[1:]) / 2
+
+        epsilon = layer.get_tensors(z, lbda)
+        # Slice axis first, followed by the batch axes of k_x
+        epsilon = epsilon.reshape(
+            epsilon.shape[:1]
+            + (1,) * max(0, np.ndim(k_x) - epsilon.ndim + 3)
+            + epsilon.shape[1:]
+        )
+        delta = Solver4x4.build_delta_matrix(k_x, epsilon)
+        thickness = thickness.reshape(thickness.shape + (1,) * (delta.ndim - 3))
+
+        if magnus:
+            delta_1, delta_2 = np.split(delta, 2)
+            k_0_h = 2 * sc.pi * thickness / np.asarray(lbda)
+            delta = (delta_1 + delta_2) / 2 + (1j * np.sqrt(3) / 12 * k_0_h)[
+                ..., np.newaxis, np.newaxis
+            ] * (delta_2 @ delta_1 - delta_1 @ delta_2)
+
+        return Solver4x4.chain_product(propagator.propagate(delta, -thickness, lbda))
+
+    def helicoidal_transfer_matrix(
+        self, layer: "TwistedLayer", k_x: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Calculates the transfer matrix of a TwistedLayer in the frame
+        rotating with the material (Oseen transformation).
+
+        With the rotation T(φ) of the in-plane fields (Ex, Ey) and (Hx, Hy),
+        the fields Φ = T(φ)ᵀ Ψ in the rotating frame follow
+        dΦ/dz = (i k0 Δ - q J) Φ at normal incidence, with the Delta matrix Δ
+        of the untwisted material, the twist rate q = dφ/dz and the generator
+        J = Tᵀ dT/dφ of the rotation. The whole layer is therefore propagated exactly
+        by a single propagator with the effective Delta matrix Δ + i q J / k0.
+        At oblique incidence, Kx rotates in this frame, so the layer is integrated
+        with the Magnus expansion on adaptively refined slices instead,
+        see :class:`TwistedLayer<elli.structure.TwistedLayer>`.
+
+        Args:
+            layer (TwistedLayer): Twisted layer to evaluate.
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            npt.NDArray: Transfer matrix of the layer
+        """
+        if np.any(np.asarray(k_x) != 0):
+            z = np.linspace(0, layer.thickness, layer.div + 1)
+            if layer.thickness > 0:
+                tolerance = 1e-4 if layer.tolerance is None else layer.tolerance
+                z = layer.refine_slices(z, self.lbda, k_x, tolerance, magnus=True)
+            return self.slices_transfer_matrix(
+                layer, z, self.lbda, k_x, self.propagator, magnus=True
+            )
+
+        delta = self.build_delta_matrix(k_x, self.get_material_tensor(layer.material))
+
+        generator = np.zeros((4, 4))
+        generator[[1, 3], [0, 2]] = 1
+        generator[[0, 2], [1, 3]] = -1
+        twist = np.deg2rad(layer.angle) / layer.thickness
+        delta = (
+            delta
+            + 1j
+            * (twist * np.asarray(self.lbda) / (2 * sc.pi))[..., np.newaxis, np.newaxis]
+            * generator
+        )
+
+        # Back from the rotating frame at the end of the layer
+        rotation = rotation_v_theta(E_Z, layer.angle)[..., :2, :2]
+        m_r = np.zeros(rotation.shape[:-2] + (4, 4))
+        m_r[..., :2, :2] = m_r[..., 2:, 2:] = rotation
+
+        m_p = self.propagator.propagate(delta, -layer.thickness, self.lbda)
+        return m_p @ np.swapaxes(m_r, -1, -2)
+
+    def layer_transfer_matrix(
+        self, layer: "AbstractLayer", k_x: npt.ArrayLike
+    ) -> npt.NDArray:
+        """Calculates the transfer matrix of a single layer.
+
+        Args:
+            layer (AbstractLayer): Layer to evaluate.
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            npt.NDArray: Transfer matrix of the layer
+        """
+        return self.layers_transfer_matrix([layer], k_x)
+
+    def structure_transfer_matrix(self, k_x: npt.ArrayLike) -> npt.NDArray:
+        """Calculates the transfer matrix of all layers of the structure.
+
+        If memoization is enabled, the transfer matrices of the layers and the
+        prefix and suffix products of the chain are kept between calculations.
+        After invalidating a single layer, only its transfer matrix and
+        two matrix multiplications are needed to update the result.
+
+        Args:
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            npt.NDArray: Transfer matrix of all layers
+        """
+        layers = self.structure.layers
+        if self._tensor_memo is None:
+            return self.layers_transfer_matrix(layers, k_x)
+
+        if (
+            self._chain is None
+            or len(self._chain) != len(layers)
+            or not np.array_equal(self._chain.k_x, k_x)
+        ):
+            self._chain = TransferMatrixChain(len(layers), k_x)
+            self._unit_indices = {}
+            for i, layer in enumerate(layers):
+                self._unit_indices.setdefault(id(layer), []).append(i)
+
+        # Identical layer objects are calculated only once
+        unit_matrices = {}
+        for i, layer in enumerate(layers):
+            if self._chain.units[i] is None:
+                if id(layer) not in unit_matrices:
+                    unit_matrices[id(layer)] = self.layer_transfer_matrix(layer, k_x)
+                self._chain.set_unit(i, unit_matrices[id(layer)])
+
+        return self._chain.product()
+
+    @staticmethod
+    def delta_matrix_derivative(
+        k_x: npt.ArrayLike, eps: npt.NDArray, d_eps: npt.NDArray
+    ) -> npt.NDArray:
+        """Calculates the directional derivative of the Delta matrix
+        with respect to the permittivity tensor.
+
+        Args:
+            k_x (npt.ArrayLike): reduce wave number, Kx = kx/k0
+            eps (npt.NDArray): permittivity tensor
+            d_eps (npt.NDArray): derivative of the permittivity tensor
+
+        Returns:
+            npt.NDArray: Derivative of the Delta 4x4 matrix
+        """
+        eps, d_eps = np.broadcast_arrays(eps, d_eps)
+        r_zz = 1 / eps[..., 2, 2]
+        d_r_zz = -d_eps[..., 2, 2] * r_zz**2
+        shape = np.broadcast_shapes(np.shape(k_x), np.shape(r_zz))
+
+        def d_product(i: int, j: int, k: int, m: int) -> npt.NDArray:
+            """Derivative of eps_ij * eps_km / eps_zz"""
+            return (
+                d_eps[..., i, j] * eps[..., k, m] * r_zz
+                + eps[..., i, j] * d_eps[..., k, m] * r_zz
+                + eps[..., i, j] * eps[..., k, m] * d_r_zz
+            )
+
+        d_delta = np.zeros(shape + (4, 4), dtype=np.complex128)
+        d_delta[..., 0, 0] = -k_x * (d_eps[..., 2, 0] * r_zz + eps[..., 2, 0] * d_r_zz)
+        d_delta[..., 0, 1] = -k_x * (d_eps[..., 2, 1] * r_zz + eps[..., 2, 1] * d_r_zz)
+        d_delta[..., 0, 3] = -(k_x**2) * d_r_zz
+        d_delta[..., 2, 0] = d_product(1, 2, 2, 0) - d_eps[..., 1, 0]
+        d_delta[..., 2, 1] = d_product(1, 2, 2, 1) - d_eps[..., 1, 1]
+        d_delta[..., 2, 3] = k_x * (d_eps[..., 1, 2] * r_zz + eps[..., 1, 2] * d_r_zz)
+        d_delta[..., 3, 0] = d_eps[..., 0, 0] - d_product(0, 2, 2, 0)
+        d_delta[..., 3, 1] = d_eps[..., 0, 1] - d_product(0, 2, 2, 1)
+        d_delta[..., 3, 3] = -k_x * (d_eps[..., 0, 2] * r_zz + eps[..., 0, 2] * d_r_zz)
+        return d_delta
+
+    def profile_transfer_matrix_derivative(
+        self,
+        profile: List[Tuple[float, npt.NDArray]],
+        tangent: List[Tuple[float, npt.NDArray]],
+        k_x: npt.ArrayLike,
+    ) -> Tuple[npt.NDArray, npt.NDArray]:
+        """Calculates the transfer matrix of a permittivity profile and its derivative.
+
+        Args:
+            profile (List[Tuple[float, npt.NDArray]]):
+                List of tuples [(thickness, dielectric tensor), ...], starting from z=0
+            tangent (List[Tuple[float, npt.NDArray]]):
+                Derivatives of the thicknesses and dielectric tensors of the profile
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray]: Transfer matrix and its derivative
+        """
+        m_t = np.identity(4)
+        d_m_t = np.zeros((4, 4))
+        for (thickness, epsilon), (d_thickness, d_epsilon) in zip(profile, tangent):
+            delta = self.build_delta_matrix(k_x, epsilon)
+
+            if np.all(d_thickness == 0) and not np.any(d_epsilon):
+                m_p = self.propagator.propagate(delta, -thickness, self.lbda)
+                d_m_t = d_m_t @ m_p
+            else:
+                m_p, d_m_p = self.propagator.propagate_derivative(
+                    delta,
+                    self.delta_matrix_derivative(k_x, epsilon, d_epsilon),
+                    -thickness,
+                    -d_thickness,
+                    self.lbda,
+                )
+                d_m_t = d_m_t @ m_p + m_t @ d_m_p
+            m_t = m_t @ m_p
+
+        return m_t, d_m_t
+
+    def layer_transfer_matrix_derivative(
+        self,
+        layer: "AbstractLayer",
+        profile: List[Tuple[float, npt.NDArray]],
+        tangent: List[Tuple[float, npt.NDArray]],
+        k_x: npt.ArrayLike,
+    ) -> npt.NDArray:
+        """Calculates the derivative of the transfer matrix of a single layer.
+
+        For RepeatedLayers, the derivative of the power of the period is
+        the upper right block of the power of the block matrix [[M, dM], [0, M]].
+
+        Args:
+            layer (AbstractLayer): Layer to evaluate.
+            profile (List[Tuple[float, npt.NDArray]]):
+                Permittivity profile of the layer or of one period for RepeatedLayers
+            tangent (List[Tuple[float, npt.NDArray]]):
+                Derivatives of the thicknesses and dielectric tensors of the profile
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            npt.NDArray: Derivative of the transfer matrix of the layer
+        """
+        # Imported locally to avoid circular imports
+        from .structure import RepeatedLayers
+
+        m_t, d_m_t = self.profile_transfer_matrix_derivative(profile, tangent, k_x)
+        if not isinstance(layer, RepeatedLayers):
+            return d_m_t
+
+        m_t, d_m_t = np.broadcast_arrays(m_t, d_m_t)
+        block = np.zeros(m_t.shape[:-2] + (8, 8), dtype=np.complex128)
+        block[..., :4, :4] = m_t
+        block[..., 4:, 4:] = m_t
+        block[..., :4, 4:] = d_m_t
+        block = np.linalg.matrix_power(block, layer.repetitions)
+        m_t, d_m_t = block[..., :4, :4], block[..., :4, 4:]
+
+        if layer.before > 0:
+            m_b, d_m_b = self.profile_transfer_matrix_derivative(
+                profile[-layer.before :], tangent[-layer.before :], k_x
             )
+            m_t, d_m_t = m_b @ m_t, d_m_b @ m_t + m_b @ d_m_t
+        if layer.after > 0:
+            m_a, d_m_a = self.profile_transfer_matrix_derivative(
+                profile[: layer.after], tangent[: layer.after], k_x
+            )
+            d_m_t = d_m_t @ m_a + m_t @ d_m_a
+
+        return d_m_t
+
+    def calculate_derivatives(
+        self,
+        layer_tangents: List[List[Tuple["AbstractLayer", List[Tuple], List[Tuple]]]],
+    ) -> Tuple[npt.NDArray, npt.NDArray]:
+        """Calculates the derivatives of the Jones matrices for changes of the layers.
+
+        The derivatives are propagated through the transfer matrices
+        in forward mode, i.e. the derivative of each changed layer is calculated
+        exactly and combined with the prefix and suffix products of the unchanged layers.
+
+        Args:
+            layer_tangents (List[List[Tuple[AbstractLayer, List[Tuple], List[Tuple]]]]):
+                For each parameter, a list of the changed layers of the structure
+                with their permittivity profile and its derivative.
+                See layer_transfer_matrix_derivative for the profiles.
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray]: Derivatives of the Jones matrices for
+                reflection and transmission, with a leading axis for the parameters.
+        """
+        k_x, _, _, m_lf, m_back = self.half_space_matrices()
+
+        layers = self.structure.layers
+        if self._tensor_memo is None:
+            chain = TransferMatrixChain(len(layers), k_x)
+            for i, layer in enumerate(layers):
+                chain.set_unit(i, self.layer_transfer_matrix(layer, k_x))
+            m_t = chain.product()
         else:
-            m_t = self.transition_matrix_halfspace(
-                self.build_delta_matrix(k_x, self.permittivity_profile[-1][1])
+            m_t = self.structure_transfer_matrix(k_x)
+            chain = self._chain
+
+        d_structure = []
+        for tangents in layer_tangents:
+            unit_derivatives = {}
+            for layer, profile, tangent in tangents:
+                d_unit = self.layer_transfer_matrix_derivative(
+                    layer, profile, tangent, k_x
+                )
+                for i, other in enumerate(layers):
+                    if other is layer:
+                        unit_derivatives[i] = d_unit
+            d_structure.append(chain.derivative(unit_derivatives) + np.zeros((4, 4)))
+
+        m_t = m_lf @ m_t @ m_back
+        d_m_t = m_lf @ np.stack(np.broadcast_arrays(*d_structure)) @ m_back
+
+        t_ti = np.linalg.inv(m_t[..., 2::-2, 2::-2])
+        t_rt = m_t[..., 3::-2, 2::-2]
+
+        d_t_ti = -t_ti @ d_m_t[..., 2::-2, 2::-2] @ t_ti
+        d_t_ri = d_m_t[..., 3::-2, 2::-2] @ t_ti + t_rt @ d_t_ti
+
+        return d_t_ri, d_t_ti
+
+    def calculate_thickness_sweep(
+        self, thicknesses: Mapping[int, npt.ArrayLike], chunk_size: int = 1024
+    ) -> Result:
+        """Calculates the experiment for a sweep of layer thicknesses.
+
+        The Delta matrices of the swept layers are decomposed into eigenvalues
+        and eigenvectors only once. Together with the transfer matrices of the unchanged
+        layers, they form thickness independent factors, which are calculated once.
+        Only the phases exp(2πi·q·d/λ) are evaluated for each thickness,
+        vectorized over chunks of the sweep.
+
+        Args:
+            thicknesses (Mapping[int, npt.ArrayLike]):
+                Thicknesses by index of the swept layers in the structure.
+                All arrays need the same length, e.g. the thicknesses of
+                multiple layers for each point of a wafer map.
+            chunk_size (int, optional): Number of thicknesses evaluated at once,
+                to limit the memory usage. Defaults to 1024.
+
+        Raises:
+            ValueError: If a swept layer is not a homogeneous Layer,
+                the index is out of range, the arrays differ in length
+                or the structure contains incoherent layers.
+
+        Returns:
+            Result: Result of the experiment with a leading thickness axis,
+                i.e. with the shape (thicknesses, wavelengths, ...)
+                or (thicknesses, angles, wavelengths, ...) for multiple angles.
+        """
+        # Imported locally to avoid circular imports
+        from .structure import Layer
+
+        if not self.is_coherent():
+            raise ValueError("Thickness sweeps need a coherent structure.")
+
+        layers = self.structure.layers
+        sweep = {}
+        for index, values in thicknesses.items():
+            if not -len(layers) <= index < len(layers):
+                raise ValueError(f"The structure has no layer with index {index}.")
+            if not isinstance(layers[index], Layer):
+                raise ValueError("Only the thickness of a Layer can be swept.")
+            sweep[index % len(layers)] = np.asarray(values, dtype=float).reshape(-1)
+
+        if not sweep:
+            raise ValueError("No layers to sweep.")
+        if len({len(values) for values in sweep.values()}) > 1:
+            raise ValueError("All thickness arrays need the same length.")
+
+        k_x, epsilon_front, epsilon_back, m_lf, m_back = self.half_space_matrices()
+
+        # m_t = F_0 E_1 F_1 ... E_n F_n with the diagonal phase matrices E_i
+        factors = [m_lf]
+        eigenvalues = []
+        start = 0
+        for index in sorted(sweep):
+            q, w, w_i = PropagatorEig.decompose(
+                self.build_delta_matrix(
+                    k_x, self.get_material_tensor(layers[index].material)
+                )
+            )
+            factors[-1] = (
+                factors[-1] @ self.layers_transfer_matrix(layers[start:index], k_x) @ w
             )
+            factors.append(w_i)
+            eigenvalues.append(q)
+            start = index + 1
+
+        # Only the columns {2,0} are needed for the Jones matrices
+        factors[-1] = (
+            factors[-1]
+            @ self.layers_transfer_matrix(layers[start:], k_x)
+            @ m_back[..., 2::-2]
+        )
+
+        size = len(next(iter(sweep.values())))
+        jones_matrix_r = []
+        jones_matrix_t = []
+        for chunk in range(0, size, chunk_size):
+            m_t = factors[0]
+            for index, q, factor in zip(sorted(sweep), eigenvalues, factors[1:]):
+                # Thickness axis first, followed by the angle and wavelength axes
+                thickness = sweep[index][chunk : chunk + chunk_size].reshape(
+                    (-1,) + (1,) * (q.ndim - 1)
+                )
+                phase = np.exp(q * (-2j * sc.pi * thickness / self.lbda)[..., None])
+                m_t = (m_t * phase[..., None, :]) @ factor
+
+            t_ti = np.linalg.inv(m_t[..., 2::-2, :])
+            jones_matrix_t.append(t_ti)
+            jones_matrix_r.append(m_t[..., 3::-2, :] @ t_ti)
+
+        jones_matrix_r = np.concatenate(jones_matrix_r)
+        jones_matrix_t = np.concatenate(jones_matrix_t)
 
-        for thickness, epsilon in layers:
-            m_p = self.propagator.calculate_propagation(
-                self.build_delta_matrix(k_x, epsilon), -thickness, self.lbda
+        if isinstance(self.structure.back_material, IsotropicMaterial):
+            k_z_f = sqrt(epsilon_front[..., 0, 0] - k_x**2)
+            k_z_b = sqrt(epsilon_back[..., 0, 0] - k_x**2)
+            power_correction = np.broadcast_to(
+                k_z_b.real / k_z_f.real, jones_matrix_r.shape[:-2]
             )
-            m_t = m_p @ m_t
+            return Result(
+                self.experiment, jones_matrix_r, jones_matrix_t, power_correction
+            )
+
+        return Result(self.experiment, jones_matrix_r, jones_matrix_t)
+
+    def half_space_matrices(
+        self,
+    ) -> Tuple[npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray]:
+        """Calculates the reduced wavenumber and the transition matrices
+        of the front and back half-spaces.
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray]:
+                Reduced wavenumber Kx, dielectric tensors of the front and back material,
+                inverse transition matrix of the front and transition matrix of the back
+        """
+        epsilon_front = self.get_material_tensor(self.structure.front_material)
+        epsilon_back = self.get_material_tensor(self.structure.back_material)
+
+        # Kx = kx/k0 = n sin(Φ) : Reduced wavenumber.
+        k_x = self.get_k_x(epsilon_front)
 
+        if isinstance(self.structure.back_material, IsotropicMaterial):
+            m_back = self.transition_matrix_iso_halfspace(k_x, epsilon_back)
+        else:
+            m_back = self.transition_matrix_halfspace(
+                self.build_delta_matrix(k_x, epsilon_back)
+            )
+
+        m_lf = self.transition_matrix_iso_halfspace(k_x, epsilon_front, inv=True)
+
+        return k_x, epsilon_front, epsilon_back, m_lf, m_back
+
+    def segment_jones_matrices(
+        self,
+        layers: List["AbstractLayer"],
+        front: "Material",
+        back: "Material",
+        k_x: npt.ArrayLike,
+    ) -> Tuple[npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray]:
+        """Calculates the Jones matrices of a coherent sequence of layers
+        between two half-spaces, for light incident from both sides.
+
+        The transfer matrix M between the modes of the half-spaces is split into the
+        blocks A, B, C, D of the forward and backward propagating modes. For light
+        incident from the front, t = A⁻¹ and r = C A⁻¹, for light incident from the back,
+        r' = -A⁻¹ B and t' = D - C A⁻¹ B.
+
+        Args:
+            layers (List[AbstractLayer]): List of layers, starting from z=0
+            front (Material): Isotropic material of the front half-space.
+            back (Material): Material of the back half-space.
+            k_x (npt.ArrayLike): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            Tuple[npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray]:
+                Jones matrices for reflection and transmission of light incident
+                from the front and reflection and transmission of light incident
+                from the back half-space.
+        """
+        epsilon_back = self.get_material_tensor(back)
+        if isinstance(back, IsotropicMaterial):
+            m_back = self.transition_matrix_iso_halfspace(k_x, epsilon_back)
+        else:
+            m_back = self.transition_matrix_halfspace(
+                self.build_delta_matrix(k_x, epsilon_back)
+            )
         m_lf = self.transition_matrix_iso_halfspace(
-            k_x, self.permittivity_profile[0][1], inv=True
+            k_x, self.get_material_tensor(front), inv=True
         )
-        m_t = m_lf @ m_t
+
+        m_t = m_lf @ self.layers_transfer_matrix(layers, k_x) @ m_back
+
+        # Forward modes {2,0} and backward modes {3,1}
+        t_f = np.linalg.inv(m_t[..., 2::-2, 2::-2])
+        r_f = m_t[..., 3::-2, 2::-2] @ t_f
+        r_b = -t_f @ m_t[..., 2::-2, 3::-2]
+        t_b = m_t[..., 3::-2, 3::-2] + m_t[..., 3::-2, 2::-2] @ r_b
+
+        return r_f, t_f, r_b, t_b
+
+    def calculate(self) -> Result:
+        """Calculates transition matrices for every element in the structure and resulting Jones matrices.
+        Structures with incoherent layers are calculated by :meth:`calculate_incoherent`.
+
+        Returns:
+            Result: Result object with calculation results
+        """
+        if not self.is_coherent():
+            return self.calculate_incoherent()
+
+        k_x, epsilon_front, epsilon_back, m_lf, m_back = self.half_space_matrices()
+
+        m_t = m_lf @ self.structure_transfer_matrix(k_x) @ m_back
 
         # Extraction of t_it out of m_t. "2::-2" means integers {2,0}.
-        t_it = m_t[:, 2::-2, 2::-2]
+        t_it = m_t[..., 2::-2, 2::-2]
         # Calculate the inverse and make sure it is a matrix.
         t_ti = np.linalg.inv(t_it)
 
         # Extraction of t_rt out of m_t. "3::-2" means integers {3,1}.
-        t_rt = m_t[:, 3::-2, 2::-2]
+        t_rt = m_t[..., 3::-2, 2::-2]
 
         # Then we have t_ri = t_rt * t_ti
         t_ri = t_rt @ t_ti
@@ -379,8 +1470,8 @@ class Solver4x4(Solver):
         # The correction coefficient is kb'/kf'
         # Note : For the moment it is only meaningful for isotropic half spaces.
         if isinstance(self.structure.back_material, IsotropicMaterial):
-            k_z_f = self.get_k_z(self.structure.front_material, self.lbda, k_x)
-            k_z_b = self.get_k_z(self.structure.back_material, self.lbda, k_x)
+            k_z_f = sqrt(epsilon_front[..., 0, 0] - k_x**2)
+            k_z_b = sqrt(epsilon_back[..., 0, 0] - k_x**2)
             power_correction = k_z_b.real / k_z_f.real
             return Result(
                 self.experiment, jones_matrix_r, jones_matrix_t, power_correction
@@ -0,0 +1,974 @@
+# Encoding: utf-8
+"""Execution of the 4x4 method with PyTorch tensors.
+
+The :class:`Solver4x4Torch` keeps all calculations from the dielectric tensors
+to the Jones matrices in torch, i.e. the Delta matrices, the propagators,
+the half-space transition matrices, the chain products and the inversions.
+The propagators of all slices of a layer are calculated in one batched
+call of ``torch.linalg.matrix_exp`` and multiplied as tree reduction,
+so torch's multi-threaded batched linear algebra is used without
+conversions between the layers.
+
+Layer thicknesses, the incident angle, mixture fractions and dispersion
+parameters can be given as (scalar) torch tensors with ``requires_grad=True``.
+The results are returned as :class:`TorchResult`, which calculates the
+ellipsometric quantities in torch as well, so gradients of e.g. a
+least squares error of psi and delta are available via autograd
+and any torch optimizer can be used for fitting.
+
+The closed-form dispersion models (Cauchy, CauchyCustomExponent, CauchyUrbach,
+ConstantRefractiveIndex, DrudeEnergy, DrudeResistivity, EpsilonInf, LorentzEnergy,
+LorentzLambda, Poles, Polynomial, Sellmeier, SellmeierCustomExponent, TaucLorentz
+and their sums) of isotropic, uniaxial and biaxial materials are evaluated in
+torch as well, see :data:`TORCH_DISPERSIONS`. All other materials and layers
+with tensor parameters, e.g. dispersions using special functions or numerical
+Kramers-Kronig relations, tabulated and formula dispersions, effective medium
+approximations and inhomogeneous layers, are evaluated with NumPy. Their derivatives
+with respect to the tensors are taken as central differences and attached to the
+torch graph, which needs no additional solver evaluation.
+
+The solver runs on the CPU with double precision.
+"""
+
+from typing import Callable, Dict, List, MutableMapping, Optional, Tuple, Type
+
+import numpy as np
+import numpy.typing as npt
+import scipy.constants as sc
+
+try:
+    import torch
+except ImportError:
+    TORCH_AVAILABLE = False
+else:
+    TORCH_AVAILABLE = True
+
+from . import dispersions
+from .dispersions.base_dispersion import (
+    BaseDispersion,
+    DispersionSum,
+    IndexDispersion,
+    IndexDispersionSum,
+    RepeatedParameters,
+)
+from .materials import BiaxialMaterial, IsotropicMaterial, Material, UniaxialMaterial
+from .plan import DIFFERENCE_STEP, ParameterSlot
+from .result import Result
+from .solver import Solver
+from .utils import conversion_wavelength_energy
+
+
+def _tensor_slots(obj: object, visited: set = None) -> List[ParameterSlot]:
+    """Recursively searches a material or layer for torch tensors used as parameters.
+
+    Args:
+        obj (object): Object to search.
+        visited (set, optional): Ids of the already searched objects. Defaults to None.
+
+    Returns:
+        List[ParameterSlot]: Locations of all tensors.
+    """
+    # Imported locally to avoid circular imports
+    from .structure import AbstractLayer
+
+    if visited is None:
+        visited = set()
+
+    if id(obj) in visited:
+        return []
+    visited.add(id(obj))
+
+    if isinstance(obj, (Material, AbstractLayer, BaseDispersion)):
+        items = [(obj, key, value) for key, value in vars(obj).items()]
+    elif isinstance(obj, MutableMapping):
+        items = list((obj, key, value) for key, value in obj.items())
+    elif isinstance(obj, (list, RepeatedParameters)):
+        items = list((obj, key, value) for key, value in enumerate(obj))
+    else:
+        return []
+
+    slots = []
+    for container, key, value in items:
+        if isinstance(value, torch.Tensor):
+            slots.append(ParameterSlot(container, key, obj))
+        else:
+            slots += _tensor_slots(value, visited)
+    return slots
+
+
+def _value(value: object) -> "torch.Tensor":
+    """Returns a parameter value as real torch tensor, keeping its graph."""
+    return torch.as_tensor(getattr(value, "value", value), dtype=torch.float64)
+
+
+def _single(dispersion: BaseDispersion, name: str) -> "torch.Tensor":
+    """Returns a single parameter of a dispersion as torch tensor."""
+    return _value(dispersion.single_params.get(name))
+
+
+def _repeated(dispersion: BaseDispersion) -> Dict[str, "torch.Tensor"]:
+    """Returns the repeated parameters of a dispersion as torch tensors
+    with the parameter sets along the last axis, like :meth:`RepeatedParameters.arrays`.
+    """
+    rep_params = dispersion.rep_params
+    arrays = {}
+    for name in rep_params.names:
+        values = [
+            _value(rep_params.get_value(index, name))
+            for index in range(len(rep_params))
+        ]
+        arrays[name] = (
+            torch.stack(torch.broadcast_tensors(*values), dim=-1)
+            if values
+            else torch.zeros(0, dtype=torch.float64)
+        )
+    return arrays
+
+
+def _csqrt(value: "torch.Tensor") -> "torch.Tensor":
+    """Complex square root, like numpy.lib.scimath.sqrt for negative values."""
+    return torch.sqrt(value.to(torch.complex128))
+
+
+def _cauchy(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    return (
+        _single(dispersion, "n0")
+        + 1e2 * _single(dispersion, "n1") / lbda**2
+        + 1e7 * _single(dispersion, "n2") / lbda**4
+        + 1j
+        * (
+            _single(dispersion, "k0")
+            + 1e2 * _single(dispersion, "k1") / lbda**2
+            + 1e7 * _single(dispersion, "k2") / lbda**4
+        )
+    )
+
+
+def _cauchy_custom(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    osc = _repeated(dispersion)
+    return _single(dispersion, "n0") + torch.sum(
+        osc["f"] * lbda[..., None] ** osc["e"], dim=-1
+    )
+
+
+def _cauchy_urbach(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    energy = conversion_wavelength_energy(lbda)
+    return (
+        _single(dispersion, "n0")
+        + _single(dispersion, "B") * energy**2
+        + _single(dispersion, "C") * energy**4
+        + 1j
+        * _single(dispersion, "D")
+        * torch.exp((energy - _single(dispersion, "Eg")) / _single(dispersion, "Eu"))
+    )
+
+
+def _constant_refractive_index(
+    dispersion: BaseDispersion, lbda: "torch.Tensor"
+) -> "torch.Tensor":
+    return _single(dispersion, "n") + 0 * lbda
+
+
+def _drude_energy(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    energy = conversion_wavelength_energy(lbda)
+    return _single(dispersion, "A") / (
+        energy**2 - 1j * _single(dispersion, "gamma") * energy
+    )
+
+
+def _drude_resistivity(
+    dispersion: BaseDispersion, lbda: "torch.Tensor"
+) -> "torch.Tensor":
+    energy = conversion_wavelength_energy(lbda)
+    hbar = sc.value("Planck constant in eV/Hz") / 2 / np.pi
+    eps0 = sc.value("vacuum electric permittivity") * 1e-2
+
+    return hbar**2 / (
+        eps0
+        * _single(dispersion, "rho_opt")
+        * (_single(dispersion, "tau") * energy**2 - 1j * hbar * energy)
+    )
+
+
+def _epsilon_inf(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    return _single(dispersion, "eps") + 0 * lbda
+
+
+def _lorentz_energy(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    energy = conversion_wavelength_energy(lbda)[..., None]
+    osc = _repeated(dispersion)
+    return 1 + torch.sum(
+        osc["A"] / (osc["E"] ** 2 - energy**2 - 1j * osc["gamma"] * energy),
+        dim=-1,
+    )
+
+
+def _lorentz_lambda(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    lbda = lbda[..., None]
+    osc = _repeated(dispersion)
+    return 1 + torch.sum(
+        osc["A"]
+        * lbda**2
+        / (lbda**2 - osc["lambda_r"] ** 2 - 1j * osc["gamma"] * lbda),
+        dim=-1,
+    )
+
+
+def _poles(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    energy = conversion_wavelength_energy(lbda)
+    return _single(dispersion, "A_ir") / energy**2 + _single(dispersion, "A_uv") / (
+        _single(dispersion, "E_uv") ** 2 - energy**2
+    )
+
+
+def _polynomial(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    osc = _repeated(dispersion)
+    return _single(dispersion, "e0") + torch.sum(
+        osc["f"] * lbda[..., None] ** osc["e"], dim=-1
+    )
+
+
+def _sellmeier(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    lbda = lbda[..., None] / 1e3
+    osc = _repeated(dispersion)
+    return 1 + torch.sum(osc["A"] * lbda**2 / (lbda**2 - osc["B"]), dim=-1)
+
+
+def _sellmeier_custom(
+    dispersion: BaseDispersion, lbda: "torch.Tensor"
+) -> "torch.Tensor":
+    lbda = lbda[..., None] / 1e3
+    osc = _repeated(dispersion)
+    return torch.sum(
+        osc["A"] * lbda ** osc["e_A"] / (lbda**2 - osc["B"] ** osc["e_B"]),
+        dim=-1,
+    )
+
+
+def _tauc_lorentz(dispersion: BaseDispersion, lbda: "torch.Tensor") -> "torch.Tensor":
+    # pylint: disable=invalid-name
+    E = conversion_wavelength_energy(lbda)[..., None]
+    Eg = _single(dispersion, "Eg")[..., None]
+    osc = _repeated(dispersion)
+    Ai, Ei, Ci = osc["A"], osc["E"], osc["C"]
+
+    eps2 = torch.where(
+        E > Eg,
+        Ai * Ei * Ci * (E - Eg) ** 2 / ((E**2 - Ei**2) ** 2 + Ci**2 * E**2) / E,
+        0,
+    )
+
+    gamma2 = Ei**2 - Ci**2 / 2
+    alpha = _csqrt(4 * Ei**2 - Ci**2)
+    aL = (Eg**2 - Ei**2) * E**2 + Eg**2 * Ci**2 - Ei**2 * (Ei**2 + 3 * Eg**2)
+    aA = (E**2 - Ei**2) * (Ei**2 + Eg**2) + Eg**2 * Ci**2
+    zeta4 = (E**2 - gamma2) ** 2 + alpha**2 * Ci**2 / 4
+
+    # fmt: off
+    eps1 = (
+        Ai*Ci*aL/2.0/np.pi/zeta4/alpha/Ei*torch.log((Ei**2 + Eg**2 + alpha*Eg)/(Ei**2 + Eg**2 - alpha*Eg)) - \
+        Ai*aA/np.pi/zeta4/Ei*(np.pi - torch.arctan((2.0*Eg + alpha)/Ci) + torch.arctan((alpha - 2.0*Eg)/Ci)) + \
+        2.0*Ai*Ei*Eg/np.pi/zeta4/alpha*(E**2 - gamma2)*(np.pi + 2.0*torch.arctan(2.0/alpha/Ci*(gamma2 - Eg**2))) - \
+        Ai*Ei*Ci*(E**2 + Eg**2)/np.pi/zeta4/E*torch.log(torch.abs(E - Eg)/(E + Eg)) + \
+        2.0*Ai*Ei*Ci*Eg/np.pi/zeta4 * \
+        torch.log(torch.abs(E - Eg) * (E + Eg) / torch.sqrt((Ei**2 - Eg**2)**2 + Eg**2 * Ci**2))
+    )
+    # fmt: on
+
+    return torch.sum(1j * eps2 + eps1, dim=-1)
+
+
+def _dispersion_sum(
+    dispersion: BaseDispersion, lbda: "torch.Tensor"
+) -> Optional["torch.Tensor"]:
+    parts = (
+        dispersion.index_dispersions
+        if isinstance(dispersion, IndexDispersionSum)
+        else dispersion.dispersions
+    )
+    values = [dispersion_tensor(part, lbda) for part in parts]
+    if any(value is None for value in values):
+        return None
+    return sum(values)
+
+
+TORCH_DISPERSIONS: Dict[
+    Type[BaseDispersion],
+    Callable[[BaseDispersion, "torch.Tensor"], Optional["torch.Tensor"]],
+] = {
+    dispersions.Cauchy: _cauchy,
+    dispersions.CauchyCustomExponent: _cauchy_custom,
+    dispersions.CauchyUrbach: _cauchy_urbach,
+    dispersions.ConstantRefractiveIndex: _constant_refractive_index,
+    dispersions.DrudeEnergy: _drude_energy,
+    dispersions.DrudeResistivity: _drude_resistivity,
+    dispersions.EpsilonInf: _epsilon_inf,
+    dispersions.LorentzEnergy: _lorentz_energy,
+    dispersions.LorentzLambda: _lorentz_lambda,
+    dispersions.Poles: _poles,
+    dispersions.Polynomial: _polynomial,
+    dispersions.Sellmeier: _sellmeier,
+    dispersions.SellmeierCustomExponent: _sellmeier_custom,
+    dispersions.TaucLorentz: _tauc_lorentz,
+    DispersionSum: _dispersion_sum,
+    IndexDispersionSum: _dispersion_sum,
+}
+"""Torch implementations of the dispersion models, which return the dielectric
+function for dielectric dispersions and the refractive index for index dispersions.
+Subclasses are not included, as they may change the evaluation."""
+
+
+def dispersion_tensor(
+    dispersion: BaseDispersion, lbda: "torch.Tensor"
+) -> Optional["torch.Tensor"]:
+    """Evaluates a dispersion with torch, see :data:`TORCH_DISPERSIONS`.
+    Dispersions without torch tensors as parameters are evaluated with NumPy.
+
+    Args:
+        dispersion (BaseDispersion): Dispersion to evaluate.
+        lbda (torch.Tensor): Wavelengths (in nm).
+
+    Returns:
+        Optional[torch.Tensor]: The dielectric function for dielectric dispersions
+            and the refractive index for index dispersions, or None if the dispersion
+            has tensor parameters and no torch implementation.
+    """
+    index = isinstance(dispersion, IndexDispersion)
+
+    if not _tensor_slots(dispersion):
+        value = (
+            dispersion._cached_refractive_index(lbda.numpy())
+            if index
+            else dispersion._cached_dielectric(lbda.numpy())
+        )
+        return torch.tensor(value, dtype=torch.complex128)
+
+    function = TORCH_DISPERSIONS.get(type(dispersion))
+    overridden = {"dielectric_function", "refractive_index"} & set(vars(dispersion))
+    if function is None or overridden:
+        return None
+
+    value = function(dispersion, lbda)
+    return None if value is None else value.to(torch.complex128)
+
+
+class TorchResult(Result):
+    """Record of a simulation result of the Solver4x4Torch.
+
+    All properties are calculated with torch and support autograd.
+    Use :meth:`numpy` to get a regular result with NumPy arrays.
+    """
+
+    @property
+    def rho(self) -> "torch.Tensor":
+        r"""Returns the ellipsometric parameter :math:`\rho` in reflection direction."""
+        return self._reduce_rho(self.rho_matrix)
+
+    @property
+    def rho_t(self) -> "torch.Tensor":
+        r"""Returns the ellipsometric parameter :math:`\rho_\text{t}` in transmission direction."""
+        return self._reduce_rho(self.rho_matrix_t)
+
+    def _reduce_rho(self, rho_matrix: "torch.Tensor") -> "torch.Tensor":
+        """Returns rho for the Jones vector of the experiment."""
+        rho = rho_matrix @ torch.as_tensor(
+            self.experiment.jones_vector, dtype=torch.complex128
+        )
+        rho = rho[..., 0] / rho[..., 1]
+
+        if self._delta_range == (0, 180):
+            rho = torch.complex(rho.real, -torch.abs(rho.imag))
+        return rho
+
+    @property
+    def psi(self) -> "torch.Tensor":
+        r"""Returns the ellipsometric angle :math:`\psi` in reflection direction."""
+        return torch.rad2deg(torch.arctan(torch.abs(self.rho)))
+
+    @property
+    def psi_t(self) -> "torch.Tensor":
+        r"""Returns the ellipsometric angle :math:`\psi_\text{t}` in transmission direction."""
+        return torch.rad2deg(torch.arctan(torch.abs(self.rho_t)))
+
+    @property
+    def delta(self) -> "torch.Tensor":
+        r"""Returns the ellipsometric angle :math:`\Delta` in reflection direction."""
+        delta = -torch.rad2deg(torch.angle(self.rho))
+        if self._delta_range == (0, 360):
+            return torch.remainder(delta, 360)
+        return delta
+
+    @property
+    def delta_t(self) -> "torch.Tensor":
+        r"""Returns the ellipsometric angle :math:`\Delta_\text{t}` in transmission direction."""
+        delta = -torch.rad2deg(torch.angle(self.rho_t))
+        if self._delta_range == (0, 360):
+            return torch.remainder(delta, 360)
+        return delta
+
+    @property
+    def psi_matrix(self) -> "torch.Tensor":
+        r"""Returns the matrix of the ellipsometric parameter :math:`\psi` in reflection direction."""
+        return torch.rad2deg(torch.arctan(torch.abs(self.rho_matrix)))
+
+    @property
+    def psi_matrix_t(self) -> "torch.Tensor":
+        r"""Returns the matrix of the ellipsometric parameter :math:`\psi_\text{t}` in transmission direction."""
+        return torch.rad2deg(torch.arctan(torch.abs(self.rho_matrix_t)))
+
+    @property
+    def delta_matrix(self) -> "torch.Tensor":
+        r"""Returns the matrix of the ellipsometric parameter :math:`\Delta` in reflection direction."""
+        return -torch.rad2deg(torch.angle(self.rho_matrix))
+
+    @property
+    def delta_matrix_t(self) -> "torch.Tensor":
+        r"""Returns the matrix of the ellipsometric parameter :math:`\Delta_\text{t}` in transmission direction."""
+        return -torch.rad2deg(torch.angle(self.rho_matrix_t))
+
+    @property
+    def mueller_matrix(self) -> "torch.Tensor":
+        """Returns the Mueller matrix for reflection, calculated from the rho matrix."""
+        a = torch.tensor(
+            [[1, 0, 0, 1], [1, 0, 0, -1], [0, 1, 1, 0], [0, 1j, -1j, 0]],
+            dtype=torch.complex128,
+        )
+        rho_matrix = self.rho_matrix
+
+        # Kronecker product of S and S*
+        s_kron_s_star = torch.einsum(
+            "...ij,...kl->...ikjl", torch.conj(rho_matrix), rho_matrix
+        ).reshape(rho_matrix.shape[:-2] + (4, 4))
+
+        mueller_matrix = torch.real(a @ s_kron_s_star @ torch.linalg.inv(a))
+        mm11 = mueller_matrix[..., 0, 0]
+
+        return mueller_matrix / mm11[..., None, None]
+
+    @property
+    def theta_i(self) -> "torch.Tensor":
+        """Returns the incident angle(s) of the evaluated experiment (in degrees)."""
+        return torch.as_tensor(self.experiment.theta_i)
+
+    @property
+    def jones_matrix_rc(self) -> "torch.Tensor":
+        """Returns the Jones matrix with the amplitude reflection coefficients
+        for circular polarization."""
+        c = torch.tensor([[1, 1], [1j, -1j]], dtype=torch.complex128) / np.sqrt(2)
+        d = torch.tensor([[-1, -1], [-1j, 1j]], dtype=torch.complex128) / np.sqrt(2)
+        return torch.linalg.inv(d) @ self._jones_matrix_r @ c
+
+    @property
+    def jones_matrix_tc(self) -> "torch.Tensor":
+        """Returns the Jones matrix with the amplitude transmission coefficients
+        for circular polarization."""
+        c = torch.tensor([[1, 1], [1j, -1j]], dtype=torch.complex128) / np.sqrt(2)
+        return torch.linalg.inv(c) @ self._jones_matrix_t @ c
+
+    @property
+    def R_matrix(self) -> "torch.Tensor":
+        """Returns the reflectance matrix separated for s and p polarization."""
+        return torch.abs(self._jones_matrix_r) ** 2
+
+    @property
+    def T_matrix(self) -> "torch.Tensor":
+        """Returns the transmittance matrix separated for s and p polarization."""
+        return (
+            torch.abs(self._jones_matrix_t) ** 2
+            * self._power_correction[..., None, None]
+        )
+
+    @property
+    def Rc_matrix(self) -> "torch.Tensor":
+        """Returns the reflectance matrix for circular polarizations."""
+        return torch.abs(self.jones_matrix_rc) ** 2
+
+    @property
+    def Tc_matrix(self) -> "torch.Tensor":
+        """Returns the transmittance matrix with the for circular polarizations."""
+        return (
+            torch.abs(self.jones_matrix_tc) ** 2
+            * self._power_correction[..., None, None]
+        )
+
+    def numpy(self) -> Result:
+        """Returns the result with detached NumPy arrays.
+
+        Returns:
+            Result: Result of the experiment.
+        """
+        return Result(
+            self.experiment,
+            self._jones_matrix_r.detach().numpy(),
+            self._jones_matrix_t.detach().numpy(),
+            self._power_correction.detach().numpy(),
+        ).as_delta_range(*self._delta_range)
+
+
+class Solver4x4Torch(Solver):
+    """Solver class to evaluate Experiment objects with PyTorch.
+    Based on Berreman's 4x4 method."""
+
+    def __init__(self, experiment: "Experiment") -> None:
+        """Creates a torch 4x4 solver for the given experiment.
+
+        Other than the NumPy solvers, the experiment is not copied,
+        so gradients are propagated to the tensors used in the structure.
+
+        Args:
+            experiment (Experiment): Experiment to evaluate.
+
+        Raises:
+            ImportError: If PyTorch is not installed.
+        """
+        if not TORCH_AVAILABLE:
+            raise ImportError(
+                "PyTorch is not installed. If you want to use the Solver4x4Torch, "
+                "please follow the install instructions on "
+                "https://pytorch.org/get-started/locally/"
+            )
+
+        self.experiment = experiment
+        self.structure = experiment.structure
+        self.lbda = experiment.lbda
+        self.theta_i = experiment.theta_i
+        self.jones_vector = experiment.jones_vector
+        self._torch_memo = {}
+
+    @staticmethod
+    def linearized(
+        obj: object, function: Callable[[], List[npt.ArrayLike]]
+    ) -> List["torch.Tensor"]:
+        """Evaluates a NumPy function of an object containing torch tensors
+        and attaches the derivatives with respect to the tensors.
+
+        The tensors are replaced by their values during the evaluation. The derivatives
+        are calculated by central differences and attached to the outputs as
+        first order terms (t - t.detach()) * d_output/dt, which vanish in value.
+
+        Args:
+            obj (object): Material or layer containing the tensors.
+            function (Callable[[], List[npt.ArrayLike]]): Evaluation of the object.
+
+        Returns:
+            List[torch.Tensor]: Outputs of the function as tensors.
+        """
+        slots = _tensor_slots(obj)
+        tensors = [slot.get() for slot in slots]
+
+        try:
+            for slot, tensor in zip(slots, tensors):
+                slot.set(tensor.item())
+            outputs = [torch.as_tensor(np.asarray(out)) for out in function()]
+
+            for slot, tensor in zip(slots, tensors):
+                if not tensor.requires_grad:
+                    continue
+
+                value = tensor.item()
+                step = DIFFERENCE_STEP * max(abs(value), 1.0)
+                shifted = []
+                for sign in [1, -1]:
+                    slot.set(value + sign * step)
+                    shifted.append(function())
+                slot.set(value)
+
+                for i, (plus, minus) in enumerate(zip(*shifted)):
+                    derivative = torch.as_tensor(
+                        (np.asarray(plus) - np.asarray(minus)) / (2 * step)
+                    )
+                    outputs[i] = outputs[i] + (tensor - tensor.detach()) * derivative
+        finally:
+            for slot, tensor in zip(slots, tensors):
+                slot.set(tensor)
+
+        return outputs
+
+    def single_material_tensor(self, material: Material) -> Optional["torch.Tensor"]:
+        """Evaluates the dielectric tensor of an isotropic, uniaxial or biaxial
+        material from the torch implementations of its dispersions.
+
+        Args:
+            material (Material): Material to evaluate.
+
+        Returns:
+            Optional[torch.Tensor]: Permittivity tensor, or None if the material or
+                one of its dispersions has no torch implementation.
+        """
+        if type(material) not in (IsotropicMaterial, UniaxialMaterial, BiaxialMaterial):
+            return None
+        if isinstance(material.rotation_matrix, torch.Tensor):
+            return None
+
+        form = material.tensor_form
+        lbda = torch.as_tensor(self.lbda, dtype=torch.float64)
+
+        eps = []
+        for dispersion in [
+            material.dispersion_x,
+            material.dispersion_y,
+            material.dispersion_z,
+        ]:
+            value = dispersion_tensor(dispersion, lbda)
+            if value is None:
+                return None
+            if isinstance(dispersion, IndexDispersion):
+                value = value**2
+            eps.append(value)
+
+        # dispersion parameters may add leading batch axes
+        epsilon = torch.diag_embed(
+            torch.stack(torch.broadcast_tensors(torch.atleast_1d(lbda), *eps)[1:], -1)
+        )
+        if form == "full":
+            rotation = torch.as_tensor(material.rotation_matrix, dtype=torch.complex128)
+            epsilon = rotation @ epsilon @ rotation.T
+        return epsilon
+
+    def get_material_tensor(self, material: Material) -> "torch.Tensor":
+        """Returns the dielectric tensor of a material as complex torch tensor.
+
+        Materials with torch dispersions are evaluated in torch,
+        see :meth:`single_material_tensor`, all others are linearized.
+
+        Args:
+            material (Material): Material to evaluate.
+
+        Returns:
+            torch.Tensor: Permittivity tensor.
+        """
+        key = id(material)
+        if key not in self._torch_memo:
+            epsilon = self.single_material_tensor(material)
+            if epsilon is None:
+                (epsilon,) = self.linearized(
+                    material, lambda: [material.get_tensor(self.lbda)]
+                )
+            self._torch_memo[key] = epsilon.to(torch.complex128)
+        return self._torch_memo[key]
+
+    def get_layer_profile(
+        self, layer: "AbstractLayer"
+    ) -> List[Tuple["torch.Tensor", "torch.Tensor"]]:
+        """Returns the permittivity profile of a layer as torch tensors.
+
+        Args:
+            layer (AbstractLayer): Layer to evaluate.
+
+        Returns:
+            List[Tuple[torch.Tensor, torch.Tensor]]:
+                List of tuples [(thickness, dielectric tensor), ...]
+        """
+        # Imported locally to avoid circular imports
+        from .structure import Layer
+
+        if isinstance(layer, Layer):
+            return [
+                (
+                    torch.as_tensor(layer.thickness, dtype=torch.float64),
+                    self.get_material_tensor(layer.material),
+                )
+            ]
+
+        def flat_profile() -> List[npt.ArrayLike]:
+            profile = []
+            for thickness, epsilon in layer.get_permittivity_profile(self.lbda):
+                profile += [thickness, epsilon]
+            return profile
+
+        profile = self.linearized(layer, flat_profile)
+        return [
+            (thickness.to(torch.float64), epsilon.to(torch.complex128))
+            for thickness, epsilon in zip(profile[::2], profile[1::2])
+        ]
+
+    def get_k_x(self, epsilon_front: "torch.Tensor") -> "torch.Tensor":
+        """Returns the reduced wavenumber Kx = kx/k0 = n sin(Φ) of the incident light.
+
+        Args:
+            epsilon_front (torch.Tensor): Dielectric tensor of the front half-space.
+
+        Returns:
+            torch.Tensor: Reduced wavenumber with the shape (wavelengths)
+                or (angles, wavelengths) for multiple angles of incidence.
+        """
+        theta = torch.deg2rad(torch.as_tensor(self.theta_i, dtype=torch.float64))
+        if theta.ndim > 0:
+            theta = theta[:, None]
+
+        n_x = torch.sqrt(epsilon_front[..., 0, 0])
+        return n_x * torch.sin(theta)
+
+    @staticmethod
+    def build_delta_matrix(k_x: "torch.Tensor", eps: "torch.Tensor") -> "torch.Tensor":
+        """Calculates Delta matrix for given permittivity and reduced wave number.
+
+        Args:
+            k_x (torch.Tensor): reduce wave number, Kx = kx/k0
+            eps (torch.Tensor): permittivity tensor
+
+        Returns:
+            torch.Tensor: Delta 4x4 matrix: infinitesimal propagation matrix
+        """
+        eps_zz = eps[..., 2, 2]
+        shape = torch.broadcast_shapes(k_x.shape, eps_zz.shape)
+
+        delta = torch.zeros(shape + (4, 4), dtype=torch.complex128)
+        delta[..., 0, 0] = -k_x * eps[..., 2, 0] / eps_zz
+        delta[..., 0, 1] = -k_x * eps[..., 2, 1] / eps_zz
+        delta[..., 0, 3] = 1 - k_x**2 / eps_zz
+        delta[..., 1, 2] = -1
+        delta[..., 2, 0] = eps[..., 1, 2] * eps[..., 2, 0] / eps_zz - eps[..., 1, 0]
+        delta[..., 2, 1] = (
+            k_x**2 - eps[..., 1, 1] + eps[..., 1, 2] * eps[..., 2, 1] / eps_zz
+        )
+        delta[..., 2, 3] = k_x * eps[..., 1, 2] / eps_zz
+        delta[..., 3, 0] = eps[..., 0, 0] - eps[..., 0, 2] * eps[..., 2, 0] / eps_zz
+        delta[..., 3, 1] = eps[..., 0, 1] - eps[..., 0, 2] * eps[..., 2, 1] / eps_zz
+        delta[..., 3, 3] = -k_x * eps[..., 0, 2] / eps_zz
+        return delta
+
+    @staticmethod
+    def transition_matrix_halfspace(delta: "torch.Tensor") -> "torch.Tensor":
+        """Returns transition exit matrix L for any half-space.
+        See :meth:`Solver4x4.transition_matrix_halfspace<elli.solver4x4.Solver4x4.transition_matrix_halfspace>`.
+
+        Args:
+            delta (torch.Tensor): Delta 4x4 matrix: infinitesimal propagation matrix
+
+        Returns:
+            torch.Tensor: Translation matrix for semi-infinite half-spaces
+        """
+        q, p = torch.linalg.eig(delta)
+
+        # Sort according to z propagation direction, by Re(q) first, then Im(q)
+        idx = torch.sort(-q.real.detach(), dim=-1, stable=True).indices
+        idx = torch.gather(
+            idx,
+            -1,
+            torch.sort(
+                torch.gather(-q.imag.detach(), -1, idx), dim=-1, stable=True
+            ).indices,
+        )
+        p = torch.gather(p, -1, idx[..., None, :].expand(p.shape))
+        # Result should be (+,+,-,-)
+
+        # For each direction, sort according to Ey component, highest Ey first
+        i1 = torch.argsort(-torch.abs(p[..., 1, :2].detach()), dim=-1)
+        i2 = 2 + torch.argsort(-torch.abs(p[..., 1, 2:].detach()), dim=-1)
+        i = torch.cat((i1, i2), dim=-1)
+        # Result should be (s+,p+,s-,p-)
+
+        # Reorder
+        i = i[..., [0, 2, 1, 3]]
+        p = torch.gather(p, -1, i[..., None, :].expand(p.shape))
+        # Result should be(s+,s-,p+,p-)
+
+        # Adjust Ey in ℝ⁺ for 's', and Ex in ℝ⁺ for 'p'
+        e = torch.cat((p[..., 1, :2], p[..., 0, 2:]), dim=-1)
+        ne = torch.abs(e)
+        nonzero = ne != 0.0
+        c = torch.where(nonzero, e / torch.where(nonzero, ne, 1.0), 1.0)
+        p = p * c[..., None, :]
+
+        # Normalize so that Ey = c1 + c2, analog to Ey = Eis + Ers
+        c = p[..., 1, 0] + p[..., 1, 1]
+        return 2 * p / c[..., None, None]
+
+    @staticmethod
+    def transition_matrix_iso_halfspace(
+        k_x: "torch.Tensor", epsilon: "torch.Tensor", inv: bool = False
+    ) -> "torch.Tensor":
+        """Returns transition incident or exit matrix L for isotropic half-spaces.
+
+        Args:
+            k_x (torch.Tensor): Reduced wavenumber, Kx = kx/k0
+            epsilon (torch.Tensor): dielectric tensor
+            inv (bool, optional): If True, returns inverse transition matrix L^-1,
+                used for the incident Matrix Li. Defaults to False.
+
+        Returns:
+            torch.Tensor: transition matrix L
+        """
+        n_x = torch.sqrt(epsilon[..., 0, 0])
+        sin_phi = k_x / n_x
+        cos_phi = torch.sqrt(1 - sin_phi**2)
+
+        sp_to_xy = torch.zeros(sin_phi.shape + (4, 4), dtype=torch.complex128)
+
+        if inv:
+            sp_to_xy[..., 0, 1] = 0.5
+            sp_to_xy[..., 0, 2] = -0.5 / cos_phi / n_x
+            sp_to_xy[..., 1, 1] = 0.5
+            sp_to_xy[..., 1, 2] = 0.5 / cos_phi / n_x
+            sp_to_xy[..., 2, 0] = 0.5 / cos_phi
+            sp_to_xy[..., 2, 3] = 0.5 / n_x
+            sp_to_xy[..., 3, 0] = -0.5 / cos_phi
+            sp_to_xy[..., 3, 3] = 0.5 / n_x
+            return sp_to_xy
+
+        sp_to_xy[..., 0, 2] = cos_phi
+        sp_to_xy[..., 0, 3] = -cos_phi
+        sp_to_xy[..., 1, 0] = 1
+        sp_to_xy[..., 1, 1] = 1
+        sp_to_xy[..., 2, 0] = -n_x * cos_phi
+        sp_to_xy[..., 2, 1] = n_x * cos_phi
+        sp_to_xy[..., 3, 2] = n_x
+        sp_to_xy[..., 3, 3] = n_x
+        return sp_to_xy
+
+    @staticmethod
+    def chain_product(matrices: List["torch.Tensor"]) -> "torch.Tensor":
+        """Calculates the ordered matrix product M_0 @ M_1 @ ... @ M_N-1
+        as pairwise tree reduction.
+
+        Args:
+            matrices (List[torch.Tensor]): Matrices to multiply
+
+        Returns:
+            torch.Tensor: Ordered product of all matrices
+        """
+        if not matrices:
+            return torch.eye(4, dtype=torch.complex128)
+
+        matrices = torch.stack(torch.broadcast_tensors(*matrices))
+        while len(matrices) > 1:
+            paired = matrices[0:-1:2] @ matrices[1::2]
+            if len(matrices) % 2:
+                paired = torch.cat((paired, matrices[-1:]))
+            matrices = paired
+        return matrices[0]
+
+    def profile_transfer_matrix(
+        self,
+        profile: List[Tuple["torch.Tensor", "torch.Tensor"]],
+        k_x: "torch.Tensor",
+    ) -> "torch.Tensor":
+        """Calculates the transfer matrix of a permittivity profile.
+        The propagators of all entries are calculated in one batched matrix exponential.
+
+        Args:
+            profile (List[Tuple[torch.Tensor, torch.Tensor]]):
+                List of tuples [(thickness, dielectric tensor), ...], starting from z=0
+            k_x (torch.Tensor): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            torch.Tensor: Product of the propagators of all profile entries
+        """
+        if not profile:
+            return torch.eye(4, dtype=torch.complex128)
+
+        lbda = torch.as_tensor(self.lbda, dtype=torch.float64)
+        mats = [
+            1j
+            * (2 * np.pi * -thickness / lbda)[..., None, None]
+            * self.build_delta_matrix(k_x, epsilon)
+            for thickness, epsilon in profile
+        ]
+        propagators = torch.linalg.matrix_exp(
+            torch.stack(torch.broadcast_tensors(*mats))
+        )
+        return self.chain_product(list(propagators))
+
+    def layers_transfer_matrix(
+        self, layers: List["AbstractLayer"], k_x: "torch.Tensor"
+    ) -> "torch.Tensor":
+        """Calculates the transfer matrix of a sequence of layers.
+        RepeatedLayers are evaluated as matrix power of one period.
+
+        Args:
+            layers (List[AbstractLayer]): List of layers, starting from z=0
+            k_x (torch.Tensor): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            torch.Tensor: Product of the transfer matrices of all layers
+        """
+        # Imported locally to avoid circular imports
+        from .structure import RepeatedLayers
+
+        matrices = []
+        profile = []
+        for layer in layers:
+            if isinstance(layer, RepeatedLayers):
+                matrices.append(self.profile_transfer_matrix(profile, k_x))
+                matrices.append(self.repeated_layers_transfer_matrix(layer, k_x))
+                profile = []
+            else:
+                profile += self.get_layer_profile(layer)
+        matrices.append(self.profile_transfer_matrix(profile, k_x))
+
+        return self.chain_product(matrices)
+
+    def repeated_layers_transfer_matrix(
+        self, layer: "RepeatedLayers", k_x: "torch.Tensor"
+    ) -> "torch.Tensor":
+        """Calculates the transfer matrix of a RepeatedLayers object.
+
+        Args:
+            layer (RepeatedLayers): Repeated structure of layers
+            k_x (torch.Tensor): Reduced wavenumber, Kx = kx/k0
+
+        Returns:
+            torch.Tensor: Transfer matrix of the repeated structure
+        """
+        m_t = torch.linalg.matrix_power(
+            self.layers_transfer_matrix(layer.layers, k_x), layer.repetitions
+        )
+
+        if layer.before > 0 or layer.after > 0:
+            profile = []
+            for sublayer in layer.layers:
+                profile += self.get_layer_profile(sublayer)
+
+            if layer.before > 0:
+                m_t = self.profile_transfer_matrix(profile[-layer.before :], k_x) @ m_t
+            if layer.after > 0:
+                m_t = m_t @ self.profile_transfer_matrix(profile[: layer.after], k_x)
+
+        return m_t
+
+    def calculate(self) -> TorchResult:
+        """Calculates the Jones matrices of the experiment with torch.
+
+        Raises:
+            ValueError: If the structure contains incoherent or partially coherent layers.
+
+        Returns:
+            TorchResult: Result object with torch tensors
+        """
+        if not self.is_coherent():
+            raise ValueError(
+                "The Solver4x4Torch doesn't support incoherent or partially "
+                "coherent layers, use the Solver4x4 instead."
+            )
+
+        self._torch_memo = {}
+
+        epsilon_front = self.get_material_tensor(self.structure.front_material)
+        epsilon_back = self.get_material_tensor(self.structure.back_material)
+        k_x = self.get_k_x(epsilon_front)
+
+        if isinstance(self.structure.back_material, IsotropicMaterial):
+            m_back = self.transition_matrix_iso_halfspace(k_x, epsilon_back)
+        else:
+            m_back = self.transition_matrix_halfspace(
+                self.build_delta_matrix(k_x, epsilon_back)
+            )
+        m_lf = self.transition_matrix_iso_halfspace(k_x, epsilon_front, inv=True)
+
+        m_t = m_lf @ self.layers_transfer_matrix(self.structure.layers, k_x) @ m_back
+
+        # Extraction of t_it out of m_t. "2::-2" means integers {2,0}.
+        t_ti = torch.linalg.inv(m_t[..., [2, 0], :][..., [2, 0]])
+        # Extraction of t_rt out of m_t. "3::-2" means integers {3,1}.
+        t_rt = m_t[..., [3, 1], :][..., [2, 0]]
+        t_ri = t_rt @ t_ti
+
+        if isinstance(self.structure.back_material, IsotropicMaterial):
+            k_z_f = torch.sqrt(epsilon_front[..., 0, 0] - k_x**2)
+            k_z_b = torch.sqrt(epsilon_back[..., 0, 0] - k_x**2)
+            power_correction = k_z_b.real / k_z_f.real
+        else:
+            power_correction = torch.ones(t_ri.shape[:-2], dtype=torch.float64)
+
+        return TorchResult(self.experiment, t_ri, t_ti, power_correction)
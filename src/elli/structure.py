@@ -16,25 +16,287 @@ There are also classes to approximate layers with varying properties along the z
 
 * :class:`TwistedLayer` is able to represent rotating materials, like twisted nematic materials.
 * :class:`VaryingMixtureLayer` takes an :class:`MixtureMaterial<elli.materials.MixtureMaterial>` and uses a gradient as mixture fraction.
+
+The solvers evaluate a structure through its :class:`PermittivityProfile`,
+a compact representation, which stores the tensor of every material only once
+and maps the slices of the structure to these tensors by an index array.
 """
 
+import warnings
 from abc import ABC, abstractmethod
-from typing import Callable, List, Tuple
+from typing import Callable, List, Literal, Mapping, Optional, Tuple, Type, Union
 
 import numpy as np
 import numpy.typing as npt
 
-from .experiment import Experiment
-from .materials import IsotropicMaterial, Material, MixtureMaterial
+from .experiment import Experiment, cross_check_solver
+from .materials import (
+    IsotropicMaterial,
+    Material,
+    MixtureMaterial,
+    TensorForm,
+    widest_tensor_form,
+)
 from .result import Result
 from .solver import Solver
+from .solver2x2 import Solver2x2
 from .solver4x4 import Solver4x4
 from .utils import E_Z, rotation_v_theta
 
+Coherence = Literal["coherent", "partial", "incoherent"]
+
+
+class PermittivityProfile:
+    """Compact, array-backed permittivity profile of a sequence of slices.
+
+    Instead of one dielectric tensor per slice, the profile holds every
+    distinct tensor only once, together with an index array mapping the slices to
+    their tensors. Tensors are distinguished by object identity, so slices of the same
+    (memoized) material share one tensor. Repetitions only tile the index and
+    thickness arrays and do not duplicate any tensor.
+
+    Each tensor is tagged with its form ("isotropic", "diagonal" or "full"),
+    see :attr:`Material.tensor_form<elli.materials.Material.tensor_form>`,
+    so the solvers can use specialized code for isotropic and diagonal profiles.
+
+    For compatibility with the former list representation, the profile can be
+    indexed and iterated, yielding tuples (thickness, dielectric tensor).
+    """
+
+    def __init__(
+        self,
+        thickness: npt.ArrayLike,
+        tensors: List[npt.NDArray],
+        indices: npt.ArrayLike,
+        forms: List[TensorForm] = None,
+    ) -> None:
+        """Creates a permittivity profile from its arrays.
+
+        Args:
+            thickness (npt.ArrayLike): Thicknesses of the slices with shape (slices, ...),
+                where the trailing axes are optional batch axes.
+            tensors (List[npt.NDArray]): Distinct dielectric tensors.
+            indices (npt.ArrayLike): Index of the tensor of each slice.
+            forms (List[TensorForm], optional): Form of each distinct tensor.
+                Defaults to "full" for all tensors.
+        """
+        self.thickness = np.asarray(thickness, dtype=float)
+        self.tensor_list = list(tensors)
+        self.indices = np.asarray(indices, dtype=int)
+        self.forms = list(forms) if forms is not None else ["full"] * len(tensors)
+        self._tensors = None
+
+    @classmethod
+    def from_list(
+        cls, profile: List[Tuple[float, npt.NDArray]], form: TensorForm = "full"
+    ) -> "PermittivityProfile":
+        """Creates a compact profile from a list of tuples [(thickness, dielectric tensor), ...],
+        merging tensors which are the same object.
+
+        Args:
+            profile (List[Tuple[float, npt.NDArray]]): Profile as list of tuples.
+            form (TensorForm, optional): Form of all tensors. Defaults to "full".
+
+        Returns:
+            PermittivityProfile: Compact profile.
+        """
+        if isinstance(profile, PermittivityProfile):
+            return profile
+
+        tensors = []
+        positions = {}
+        indices = []
+        for _, epsilon in profile:
+            if id(epsilon) not in positions:
+                positions[id(epsilon)] = len(tensors)
+                tensors.append(epsilon)
+            indices.append(positions[id(epsilon)])
+
+        return cls(
+            cls._stack_thickness([thickness for thickness, _ in profile]),
+            tensors,
+            indices,
+            [form] * len(tensors),
+        )
+
+    @classmethod
+    def concatenate(
+        cls, profiles: List["PermittivityProfile"]
+    ) -> "PermittivityProfile":
+        """Concatenates compact profiles, merging tensors which are the same object.
+
+        Args:
+            profiles (List[PermittivityProfile]): Profiles, starting from z=0.
+
+        Returns:
+            PermittivityProfile: Concatenated profile.
+        """
+        tensors = []
+        forms = []
+        positions = {}
+        indices = []
+        for profile in profiles:
+            mapping = []
+            for epsilon, form in zip(profile.tensor_list, profile.forms):
+                if id(epsilon) not in positions:
+                    positions[id(epsilon)] = len(tensors)
+                    tensors.append(epsilon)
+                    forms.append(form)
+                mapping.append(positions[id(epsilon)])
+            indices.append(np.asarray(mapping, dtype=int)[profile.indices])
+
+        thickness = [profile.thickness for profile in profiles]
+        shape = np.broadcast_shapes(*[np.shape(d)[1:] for d in thickness])
+        thickness = [
+            np.broadcast_to(
+                d.reshape(d.shape[:1] + (1,) * (len(shape) + 1 - d.ndim) + d.shape[1:]),
+                d.shape[:1] + shape,
+            )
+            for d in thickness
+        ]
+        return cls(
+            np.concatenate(thickness) if thickness else np.zeros(0),
+            tensors,
+            np.concatenate(indices) if indices else np.zeros(0, dtype=int),
+            forms,
+        )
+
+    @classmethod
+    def from_layers(
+        cls,
+        layers: List["AbstractLayer"],
+        get_tensor: Callable[[Material], npt.NDArray],
+        get_layer_profile: Callable[["AbstractLayer"], List[Tuple[float, npt.NDArray]]],
+    ) -> "PermittivityProfile":
+        """Creates the compact profile of a sequence of layers.
+        RepeatedLayers are resolved recursively by repeating the profile of one period.
+
+        Args:
+            layers (List[AbstractLayer]): List of layers, starting from z=0
+            get_tensor (Callable[[Material], npt.NDArray]):
+                Returns the dielectric tensor of a material of a homogeneous layer.
+                Materials which return the same tensor object are stored only once.
+            get_layer_profile (Callable[[AbstractLayer], List[Tuple[float, npt.NDArray]]]):
+                Returns the permittivity profile of other layers, e.g. inhomogeneous layers.
+
+        Returns:
+            PermittivityProfile: Compact profile of the layers.
+        """
+        profiles = []
+        for layer in layers:
+            if isinstance(layer, Layer):
+                profiles.append(
+                    cls(
+                        cls._stack_thickness([layer.thickness]),
+                        [get_tensor(layer.material)],
+                        [0],
+                        [layer.material.tensor_form],
+                    )
+                )
+            elif isinstance(layer, RepeatedLayers):
+                profiles.append(
+                    cls.from_layers(layer.layers, get_tensor, get_layer_profile).repeat(
+                        layer.repetitions, layer.before, layer.after
+                    )
+                )
+            else:
+                profiles.append(
+                    cls.from_list(get_layer_profile(layer), layer.tensor_form)
+                )
+        return cls.concatenate(profiles)
+
+    @staticmethod
+    def _stack_thickness(thickness: List[npt.ArrayLike]) -> npt.NDArray:
+        """Stacks thicknesses with optional batch axes along a new first axis."""
+        if not thickness:
+            return np.zeros(0)
+        return np.stack(
+            np.broadcast_arrays(*[np.asarray(d).astype(float) for d in thickness])
+        )
+
+    def repeat(
+        self, repetitions: int, before: int = 0, after: int = 0
+    ) -> "PermittivityProfile":
+        """Repeats the profile without duplicating the tensors.
+
+        Args:
+            repetitions (int): Number of repetitions
+            before (int, optional):
+                Number of additional slices before the first period. Defaults to 0.
+            after (int, optional): Number of additional slices after the last period. Defaults to 0.
+
+        Returns:
+            PermittivityProfile: Repeated profile.
+        """
+        selection = np.concatenate(
+            (
+                np.arange(max(len(self) - before, 0), len(self)) if before > 0 else [],
+                np.tile(np.arange(len(self)), repetitions),
+                np.arange(min(after, len(self))),
+            )
+        ).astype(int)
+        return PermittivityProfile(
+            self.thickness[selection],
+            self.tensor_list,
+            self.indices[selection],
+            self.forms,
+        )
+
+    @property
+    def tensors(self) -> npt.NDArray:
+        """Stack of the distinct dielectric tensors with shape (tensors, ..., 3, 3)."""
+        if self._tensors is None:
+            if self.tensor_list:
+                self._tensors = np.stack(np.broadcast_arrays(*self.tensor_list))
+            else:
+                self._tensors = np.zeros((0, 3, 3), dtype=complex)
+        return self._tensors
+
+    @property
+    def tensor_form(self) -> TensorForm:
+        """Most general form of the tensors of the profile."""
+        return widest_tensor_form("isotropic", *self.forms)
+
+    @property
+    def diagonal(self) -> npt.NDArray:
+        """Stack of the diagonals of the distinct dielectric tensors
+        with shape (tensors, ..., 3), without stacking the full tensors."""
+        if not self.tensor_list:
+            return np.zeros((0, 3), dtype=complex)
+        return np.stack(
+            np.broadcast_arrays(
+                *[np.diagonal(eps, axis1=-2, axis2=-1) for eps in self.tensor_list]
+            )
+        )
+
+    def to_list(self) -> List[Tuple[float, npt.NDArray]]:
+        """Returns the profile as list of tuples [(thickness, dielectric tensor), ...]"""
+        return list(self)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return PermittivityProfile(
+                self.thickness[key], self.tensor_list, self.indices[key], self.forms
+            )
+        return (self.thickness[key], self.tensor_list[self.indices[key]])
+
+    def __iter__(self):
+        for thickness, index in zip(self.thickness, self.indices):
+            yield (thickness, self.tensor_list[index])
+
 
 class AbstractLayer(ABC):
     """Abstract class for a layer."""
 
+    @property
+    def tensor_form(self) -> TensorForm:
+        """Most general form of the dielectric tensors of the layer,
+        see :attr:`Material.tensor_form<elli.materials.Material.tensor_form>`."""
+        return "full"
+
     @abstractmethod
     def get_permittivity_profile(
         self, lbda: npt.ArrayLike
@@ -51,7 +313,12 @@ class AbstractLayer(ABC):
 
 
 class RepeatedLayers(AbstractLayer):
-    """Repeated structure of layers."""
+    """Repeated structure of layers.
+
+    The Solver4x4 does not expand the repetitions, but raises the transfer matrix
+    of one period to the power of the repetitions. Thereby, the computational cost
+    grows only logarithmically with the number of repetitions.
+    """
 
     repetitions = None  # Number of repetitions
     before = None  # additional layers before the first period
@@ -121,6 +388,13 @@ class RepeatedLayers(AbstractLayer):
 
         self.layers = layers
 
+    @property
+    def tensor_form(self) -> TensorForm:
+        """Most general form of the dielectric tensors of the repeated layers."""
+        return widest_tensor_form(
+            "isotropic", *[layer.tensor_form for layer in self.layers]
+        )
+
     def get_permittivity_profile(
         self, lbda: npt.ArrayLike
     ) -> List[Tuple[float, npt.NDArray]]:
@@ -145,19 +419,92 @@ class RepeatedLayers(AbstractLayer):
 
 
 class Layer(AbstractLayer):
-    """Homogeneous layer of dielectric material."""
+    """Homogeneous layer of dielectric material.
+
+    By default, the layer is calculated coherently. Thick layers, like the substrate
+    of a structure with a backside, can be set "incoherent": The solvers split
+    the structure at these layers and add up the partial waves, which pass the layer
+    multiple times, in intensity, see :class:`IncoherentResult<elli.result.IncoherentResult>`.
+    A "partial" coherent layer is averaged over the given spectral bandwidth.
+    Only layers directly contained in the structure are considered,
+    layers in RepeatedLayers are always calculated coherently.
+    """
 
     thickness = None
+    coherence = "coherent"
+    coherences = ("coherent", "partial", "incoherent")
+    bandwidth = None
+    samples = None
 
-    def __init__(self, material: Material, thickness: float) -> None:
+    def __init__(
+        self,
+        material: Material,
+        thickness: float,
+        coherence: Coherence = "coherent",
+        bandwidth: float = None,
+        samples: int = 16,
+    ) -> None:
         """New layer of material 'material', with thickness 'thickness'
 
         Args:
             material (Material): Material object
             thickness (float): Thickness of layer (in nm)
+            coherence (Coherence, optional): "coherent", "partial" or "incoherent",
+                see :meth:`set_coherence`. Defaults to "coherent".
+            bandwidth (float, optional): Spectral bandwidth (in nm)
+                for partial coherence. Defaults to None.
+            samples (int, optional): Number of samples to average over the bandwidth
+                for partial coherence. Defaults to 16.
         """
         self.set_material(material)
         self.set_thickness(thickness)
+        self.set_coherence(coherence, bandwidth, samples)
+
+    def set_coherence(
+        self,
+        coherence: Coherence = "coherent",
+        bandwidth: float = None,
+        samples: int = 16,
+    ) -> None:
+        """Defines how the layer is calculated.
+
+        * "coherent": All partial waves are added up in amplitude.
+        * "incoherent": The partial waves passing the layer a different number
+          of times are added up in intensity. The material needs to be isotropic.
+        * "partial": The layer is calculated coherently for 'samples' evenly spaced
+          wavelengths within the bandwidth and the Mueller matrices are averaged.
+          The wavelength offsets are approximated by the equivalent change of the
+          optical thickness of the layer, i.e. the thickness d (1 + u Δλ / λ)
+          with offsets u in the interval [-1/2, 1/2]. The offsets are shared by all
+          partially coherent layers of a structure, so its cost grows with the
+          largest number of samples and not with the number of such layers.
+
+        Args:
+            coherence (Coherence, optional): "coherent", "partial" or "incoherent".
+                Defaults to "coherent".
+            bandwidth (float, optional): Spectral bandwidth (in nm),
+                only used for partial coherence. Defaults to None.
+            samples (int, optional): Number of samples to average over the bandwidth,
+                only used for partial coherence. Defaults to 16.
+
+        Raises:
+            ValueError: If the coherence is unknown or the bandwidth or number of
+                samples for partial coherence is not positive.
+        """
+        if coherence not in self.coherences:
+            raise ValueError(
+                f"Unknown coherence '{coherence}', use one of {self.coherences}."
+            )
+
+        if coherence == "partial":
+            if bandwidth is None or bandwidth <= 0:
+                raise ValueError("Partial coherence needs a positive bandwidth.")
+            if samples < 1:
+                raise ValueError("Partial coherence needs at least one sample.")
+
+        self.coherence = coherence
+        self.bandwidth = bandwidth
+        self.samples = samples
 
     def set_thickness(self, thickness: float) -> None:
         """Defines the thickness of the layer in nm.
@@ -183,6 +530,11 @@ class Layer(AbstractLayer):
 
         self.material = material
 
+    @property
+    def tensor_form(self) -> TensorForm:
+        """Form of the dielectric tensor of the material of the layer."""
+        return self.material.tensor_form
+
     def get_permittivity_profile(
         self, lbda: npt.ArrayLike
     ) -> List[Tuple[float, npt.NDArray]]:
@@ -203,11 +555,28 @@ class Layer(AbstractLayer):
 
 
 class InhomogeneousLayer(AbstractLayer):
-    """Abstract base class for inhomogeneous layers with varying properties in z-direction."""
+    """Abstract base class for inhomogeneous layers with varying properties in z-direction.
+
+    The layer is simulated as a stack of homogeneous slices. By default, it is divided
+    into 'div' slices of equal thickness. With :meth:`set_adaptive`, the number of
+    slices is doubled until the transfer matrix of the layer meets the given tolerance.
+
+    With the "magnus" propagation, the Solver4x4 integrates each slice with the
+    fourth order Magnus expansion, sampling the permittivity at the two Gauss points
+    of the slice instead of its middle. The error then decreases with the fourth
+    power of the slice thickness instead of the second,
+    so much fewer slices are needed for the same accuracy.
+    Other solvers always use the permittivity profile of the slices.
+    """
 
     thickness = None
     material = None
     div = None
+    propagation = "slices"
+    propagations = ("slices", "magnus")
+    tolerance = None
+    max_div = 1024
+    bands = 8
 
     def set_thickness(self, thickness: float) -> None:
         """Defines the thickness of the layer in nm.
@@ -244,42 +613,207 @@ class InhomogeneousLayer(AbstractLayer):
 
         self.div = div
 
-    def get_slices(self) -> npt.NDArray:
+    def set_propagation(self, propagation: str = "slices") -> None:
+        """Defines how the layer is propagated in the Solver4x4.
+
+        Args:
+            propagation (str, optional): "slices" for a stack of homogeneous slices,
+                "magnus" for the fourth order Magnus integrator or any other
+                propagation supported by the layer. Defaults to "slices".
+
+        Raises:
+            ValueError: If the propagation is not supported by the layer.
+        """
+        if propagation not in self.propagations:
+            raise ValueError(
+                f"Unknown propagation {propagation}, use one of {self.propagations}."
+            )
+
+        self.propagation = propagation
+
+    def set_adaptive(
+        self, tolerance: float = 1e-4, max_div: int = 1024, bands: int = 8
+    ) -> None:
+        """Enables the adaptive slicing of the layer.
+        Starting from 'div' slices, the number of slices is doubled until the
+        estimated error of the transfer matrix of the layer is below the tolerance.
+        The error is estimated for the shortest wavelength of each wavelength band.
+
+        Args:
+            tolerance (float, optional): Tolerated error of the transfer matrix of the
+                layer. None disables the adaptive slicing. Defaults to 1e-4.
+            max_div (int, optional): Maximum number of slices. Defaults to 1024.
+            bands (int, optional): Number of wavelength bands. Defaults to 8.
+
+        Raises:
+            ValueError: If the tolerance is not positive, max_div or bands is less than 1.
+        """
+        if tolerance is not None and tolerance <= 0:
+            raise ValueError("Tolerance needs to be positive.")
+        if max_div < 1:
+            raise ValueError("Number of slices need to be at least 1.")
+        if bands < 1:
+            raise ValueError("Number of wavelength bands need to be at least 1.")
+
+        self.tolerance = tolerance
+        self.max_div = max_div
+        self.bands = bands
+
+    def get_slices(
+        self, lbda: npt.ArrayLike = None, k_x: npt.ArrayLike = 0.0
+    ) -> npt.NDArray:
         """Returns z slicing with the position relative to this layer, not to the whole structure.
 
+        Args:
+            lbda (npt.ArrayLike, optional): Wavelengths (in nm) to refine the slices for,
+                if adaptive slicing is enabled. Defaults to None.
+            k_x (npt.ArrayLike, optional): Reduced wavenumber, Kx = kx/k0,
+                to refine the slices for. Defaults to 0, i.e. normal incidence.
+
         Returns:
             npt.NDArray: array of 'z' positions [z0, z1,... , zmax], with z0 = 0 and zmax = z{d+1}
         """
-        return np.linspace(0, self.thickness, self.div + 1)
+        z = np.linspace(0, self.thickness, self.div + 1)
+        if self.tolerance is None or lbda is None or self.thickness == 0:
+            return z
+        return self.refine_slices(z, lbda, k_x)
+
+    def refine_slices(
+        self,
+        z: npt.NDArray,
+        lbda: npt.ArrayLike,
+        k_x: npt.ArrayLike = 0.0,
+        tolerance: Optional[float] = None,
+        magnus: Optional[bool] = None,
+    ) -> npt.NDArray:
+        """Refines the slicing of the layer by step doubling.
+
+        All slices are split in two, until the transfer matrices of the layer
+        before and after the split differ by less than 2^p - 1 times the tolerance,
+        with the order p = 2 for slices and p = 4 for the Magnus integrator,
+        i.e. the error of the finer slicing estimated by Richardson extrapolation
+        is below the tolerance, relative to the largest element of the transfer matrix.
+        The difference is checked for all angles and the shortest wavelength
+        of each band. The slices are refined uniformly, as the errors of
+        equal slices cancel to a large part, which locally refined slices prevent.
+        A warning is issued, if the tolerance isn't reached within 'max_div' slices.
+
+        Args:
+            z (npt.NDArray): Initial 'z' positions of the slices.
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+            k_x (npt.ArrayLike, optional): Reduced wavenumber, Kx = kx/k0.
+                Defaults to 0, i.e. normal incidence.
+            tolerance (float, optional): Tolerated error of the transfer matrix.
+                Defaults to None, i.e. the tolerance of the layer.
+            magnus (bool, optional): Whether the slices are integrated with the
+                Magnus expansion. Defaults to None, i.e. for the "magnus" propagation.
+
+        Returns:
+            npt.NDArray: Refined array of 'z' positions.
+        """
+        # Imported locally to avoid circular imports
+        from .solver4x4 import PropagatorExpm, Solver4x4
+
+        propagator = PropagatorExpm(cache_size=0)
+        tolerance = self.tolerance if tolerance is None else tolerance
+        magnus = self.propagation == "magnus" if magnus is None else magnus
+        order = 4 if magnus else 2
+
+        # Shortest wavelength of each band, with at least one wavelength per band
+        if np.ndim(lbda) > 0:
+            bands = np.array_split(np.argsort(lbda), min(self.bands, np.size(lbda)))
+            index = np.array([band[0] for band in bands])
+            lbda = np.asarray(lbda)[index]
+            if np.ndim(k_x) > 0:
+                k_x = np.asarray(k_x)[..., index]
+
+        m_t = Solver4x4.slices_transfer_matrix(self, z, lbda, k_x, propagator, magnus)
+        error = None
+        while 2 * (len(z) - 1) <= self.max_div:
+            z = np.sort(np.concatenate((z, (z[:-1] + z[1:]) / 2)))
+            m_t, previous = (
+                Solver4x4.slices_transfer_matrix(
+                    self, z, lbda, k_x, propagator, magnus
+                ),
+                m_t,
+            )
+
+            error = np.abs(m_t - previous).max() / (2**order - 1)
+            if error <= tolerance * max(1, np.abs(m_t).max()):
+                break
+        else:
+            if error is not None:
+                warnings.warn(
+                    f"The adaptive slicing stopped at the maximum of {len(z) - 1} "
+                    f"slices without reaching the tolerance of {tolerance:.3g}. "
+                    "Increase max_div or the tolerance of the layer."
+                )
+
+        return z
 
     @abstractmethod
     def get_tensor(self, z: float, lbda: npt.ArrayLike) -> npt.NDArray:
         """Returns permittivity tensor matrix for position 'z'."""
 
-    def get_permittivity_profile(self, lbda: npt.ArrayLike) -> List:
+    def get_tensors(self, z: npt.ArrayLike, lbda: npt.ArrayLike) -> npt.NDArray:
+        """Returns the permittivity tensors for an array of positions 'z'.
+
+        Subclasses should override this method to evaluate all positions at once,
+        by default the tensors are evaluated position by position.
+
+        Args:
+            z (npt.ArrayLike): 1d array of positions in the layer (in nm)
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+
+        Returns:
+            npt.NDArray: Stack of permittivity tensors with a leading position axis.
+        """
+        return np.stack(np.broadcast_arrays(*[self.get_tensor(z_i, lbda) for z_i in z]))
+
+    def get_permittivity_profile(
+        self, lbda: npt.ArrayLike, k_x: npt.ArrayLike = 0.0
+    ) -> List:
         """Returns the permittivity profile of the layer for the given wavelengths.
         The tensor is evaluated in the middle of each slice.
 
         Args:
             lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+            k_x (npt.ArrayLike, optional): Reduced wavenumber, Kx = kx/k0, used to
+                refine adaptive slices. Defaults to 0, i.e. normal incidence.
 
         Returns:
             List[Tuple[float, npt.NDArray]]:
                 Returns list of tuples [(d1, epsilon1), (d2, epsilon2), ...]
         """
-        z = self.get_slices()
+        z = self.get_slices(lbda, k_x)
         h = np.diff(z)
         zmid = (z[:-1] + z[1:]) / 2.0
-        tensor = [self.get_tensor(z, lbda) for z in zmid]
-        return list(zip(h, tensor))
+        return list(zip(h, self.get_tensors(zmid, lbda)))
 
 
 class TwistedLayer(InhomogeneousLayer):
     """Twisted layer.
-    The material gets rotated around the z axis."""
+    The material gets rotated around the z axis.
+
+    With the "helicoidal" propagation, the Solver4x4 solves the layer in a frame
+    rotating with the material (Oseen transformation). This is only exact at
+    normal incidence, where the propagation in this frame has constant coefficients
+    and the whole layer is calculated with a single propagator, independent of the
+    number of slices. At oblique incidence, the layer is integrated with the
+    Magnus expansion on slices refined from 'div' until they meet the tolerance
+    of :meth:`set_adaptive`, or 1e-4 if adaptive slicing is not enabled.
+    Other solvers use the sliced permittivity profile.
+    """
+
+    propagations = ("slices", "magnus", "helicoidal")
 
     def __init__(
-        self, material: Material, thickness: float, div: int, angle: float
+        self,
+        material: Material,
+        thickness: float,
+        div: int,
+        angle: float,
+        propagation: Literal["slices", "magnus", "helicoidal"] = "slices",
     ) -> None:
         """Creates a layer with a twisted material.
 
@@ -288,11 +822,24 @@ class TwistedLayer(InhomogeneousLayer):
             thickness (float): Thickness of layer (in nm)
             div (int): Number of slices for the layer
             angle (float): rotation angle over the distance 'd' (in degrees)
+            propagation (Literal["slices", "magnus", "helicoidal"], optional):
+                Propagation of the layer in the Solver4x4, either as stack of
+                homogeneous slices, with the Magnus integrator or in the frame
+                rotating with the material. Defaults to "slices".
         """
         self.set_material(material)
         self.set_thickness(thickness)
         self.set_divisions(div)
         self.set_angle(angle)
+        self.set_propagation(propagation)
+
+    @property
+    def tensor_form(self) -> TensorForm:
+        """Isotropic materials stay isotropic under rotation,
+        all other materials result in full tensors."""
+        if self.material.tensor_form == "isotropic":
+            return "isotropic"
+        return "full"
 
     def set_angle(self, angle: float) -> None:
         """Defines the total twist angle of this layer.
@@ -312,9 +859,27 @@ class TwistedLayer(InhomogeneousLayer):
         Returns:
             npt.NDArray: Permittivity tensor for position 'z' and wavelength 'lbda'.
         """
+        return self.get_tensors(np.array([z]), lbda)[0]
+
+    def get_tensors(self, z: npt.ArrayLike, lbda: npt.ArrayLike) -> npt.NDArray:
+        """Returns the permittivity tensors for an array of positions 'z'.
+        The material is evaluated only once and rotated for all positions in one broadcast.
+
+        Args:
+            z (npt.ArrayLike): 1d array of positions in the layer (in nm)
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+
+        Returns:
+            npt.NDArray: Stack of permittivity tensors with a leading position axis.
+        """
+        z = np.asarray(z, dtype=float)
         epsilon = self.material.get_tensor(lbda)
+        if self.material.tensor_form == "isotropic":
+            return np.broadcast_to(epsilon, z.shape + epsilon.shape)
+
         m_r = rotation_v_theta(E_Z, self.angle * z / self.thickness)
-        return m_r @ epsilon @ m_r.T
+        # Contracted as tensor products, which is much faster than stacked 3x3 matmuls
+        return np.einsum("zij,...jk,zlk->z...il", m_r, epsilon, m_r, optimize=True)
 
 
 class VaryingMixtureLayer(InhomogeneousLayer):
@@ -330,6 +895,7 @@ class VaryingMixtureLayer(InhomogeneousLayer):
         thickness: float,
         div: int,
         fraction_modulation: Callable[[float], float] = lambda x: x,
+        propagation: Literal["slices", "magnus"] = "slices",
     ) -> None:
         """
         Args:
@@ -342,11 +908,15 @@ class VaryingMixtureLayer(InhomogeneousLayer):
                 should return fraction at that level.
                 Defaults to a linear profile
                 (100% host material to 100% guest material).
+            propagation (Literal["slices", "magnus"], optional):
+                Propagation of the layer in the Solver4x4, either as stack of
+                homogeneous slices or with the Magnus integrator. Defaults to "slices".
         """
         self.set_material(material)
         self.set_thickness(thickness)
         self.set_divisions(div)
         self.set_fraction_modulation(fraction_modulation)
+        self.set_propagation(propagation)
 
     def set_material(self, material: MixtureMaterial) -> None:
         """Defines the material for the varying mixture layer.
@@ -376,6 +946,11 @@ class VaryingMixtureLayer(InhomogeneousLayer):
         """
         self.fraction_modulation = fraction_modulation
 
+    @property
+    def tensor_form(self) -> TensorForm:
+        """Form of the dielectric tensor of the mixture material."""
+        return self.material.tensor_form
+
     def get_tensor(self, z: float, lbda: npt.ArrayLike) -> npt.NDArray:
         """Gets permittivity tensor matrix for position 'z' and wavelength 'lbda'.
 
@@ -386,10 +961,23 @@ class VaryingMixtureLayer(InhomogeneousLayer):
         Returns:
             npt.NDArray: Permittivity tensor for position 'z' and wavelength 'lbda'.
         """
-        epsilon = self.material.get_tensor_fraction(
-            lbda, self.fraction_modulation(z / self.thickness)
-        )
-        return epsilon
+        return self.get_tensors(np.array([z]), lbda)[0]
+
+    def get_tensors(self, z: npt.ArrayLike, lbda: npt.ArrayLike) -> npt.NDArray:
+        """Returns the permittivity tensors for an array of positions 'z'.
+        The host and guest materials are evaluated only once and mixed
+        for the fractions of all positions in one broadcast.
+
+        Args:
+            z (npt.ArrayLike): 1d array of positions in the layer (in nm)
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+
+        Returns:
+            npt.NDArray: Stack of permittivity tensors with a leading position axis.
+        """
+        # The modulation function is not required to support arrays
+        fractions = [self.fraction_modulation(z_i / self.thickness) for z_i in z]
+        return self.material.get_tensor_fractions(lbda, fractions)
 
 
 #########################################################
@@ -465,43 +1053,128 @@ class Structure:
 
         self.layers = layers
 
-    def get_permittivity_profile(
-        self, lbda: npt.ArrayLike
-    ) -> List[Tuple[float, npt.NDArray]]:
+    def get_permittivity_profile(self, lbda: npt.ArrayLike) -> PermittivityProfile:
         """Returns the permittivity profile of the complete structure for the given wavelengths.
 
+        Every material is evaluated only once, even if it is used in multiple layers,
+        and repeated layers are not expanded, see :class:`PermittivityProfile`.
+
         Args:
             lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
 
         Returns:
-            List[Tuple[float, npt.NDArray]]:
-                Returns list of tuples [(thickness, dielectric tensor), ...]
+            PermittivityProfile:
+                Compact profile, which can be iterated as tuples (thickness, dielectric tensor),
+                including the front and back half-spaces.
         """
-        permittivity_profile = [(np.inf, self.front_material.get_tensor(lbda))]
-
-        for layer in self.layers:
-            permittivity_profile.extend(layer.get_permittivity_profile(lbda))
-
-        permittivity_profile.extend([(np.inf, self.back_material.get_tensor(lbda))])
-        return permittivity_profile
+        tensors = {}
+
+        def get_tensor(material: Material) -> npt.NDArray:
+            if id(material) not in tensors:
+                tensors[id(material)] = material.get_tensor(lbda)
+            return tensors[id(material)]
+
+        return PermittivityProfile.from_layers(
+            [Layer(self.front_material, np.inf)]
+            + self.layers
+            + [Layer(self.back_material, np.inf)],
+            get_tensor,
+            lambda layer: layer.get_permittivity_profile(lbda),
+        )
 
     def evaluate(
         self,
         lbda: npt.ArrayLike,
-        theta_i: float,
-        solver: Solver = Solver4x4,
+        theta_i: npt.ArrayLike,
+        solver: Union[Type[Solver], str] = "auto",
+        jacobian: bool = False,
+        check_solver: bool = False,
         **solver_kwargs,
     ) -> Result:
         """Return the Evaluation of the structure for the given parameters with standard settings.
 
         Args:
             lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
-            theta_i (float): Incident angle of the experiment (in degrees).
-            solver (Solver, optional): Choose which solver class is used. Defaults to Solver4x4.
+            theta_i (npt.ArrayLike):
+                Single value or array of incident angles of the experiment (in degrees).
+            solver (Union[Type[Solver], str], optional): Choose which solver class is used.
+                With "auto", the solver is selected by
+                :func:`select_solver<elli.experiment.select_solver>`. Defaults to "auto".
+            jacobian (bool, optional): If True, the derivatives with respect to all
+                lmfit Parameters used in the structure are stored in the result,
+                e.g. to be used by the fitting decorators. Defaults to False.
+            check_solver (bool, optional): Debug mode, which cross-checks the results
+                of the Solver2x2 against the Solver4x4 on a sample of wavelengths,
+                see :func:`cross_check_solver<elli.experiment.cross_check_solver>`.
+                Defaults to False.
             solver_kwargs (optional): Keyword arguments for the Solver can be appended as arguments.
 
         Returns:
             Result: Result of the experiment.
         """
+        if jacobian:
+            plan = self.compile(lbda, theta_i, solver, **solver_kwargs)
+            result = plan.evaluate(jacobian=True)
+            if check_solver and isinstance(plan.solver, Solver2x2):
+                cross_check_solver(plan.solver.experiment, result)
+            return result
+
         exp = Experiment(self, lbda, theta_i)
-        return exp.evaluate(solver, **solver_kwargs)
+        return exp.evaluate(solver, check_solver, **solver_kwargs)
+
+    def sweep_thickness(
+        self,
+        lbda: npt.ArrayLike,
+        theta_i: npt.ArrayLike,
+        thicknesses: Mapping[int, npt.ArrayLike],
+        chunk_size: int = 1024,
+        **solver_kwargs,
+    ) -> Result:
+        """Evaluates the structure for many thicknesses of one or more layers,
+        e.g. for the library of a thickness map. The Delta matrices of the swept
+        layers are decomposed only once and all thicknesses are evaluated in one
+        vectorized step, see :meth:`Solver4x4.calculate_thickness_sweep
+        <elli.solver4x4.Solver4x4.calculate_thickness_sweep>`.
+
+        Args:
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+            theta_i (npt.ArrayLike):
+                Single value or array of incident angles of the experiment (in degrees).
+            thicknesses (Mapping[int, npt.ArrayLike]):
+                Thicknesses by index of the swept layers, all with the same length.
+            chunk_size (int, optional): Number of thicknesses evaluated at once,
+                to limit the memory usage. Defaults to 1024.
+            solver_kwargs (optional): Keyword arguments for the Solver4x4.
+
+        Returns:
+            Result: Result of the experiment with a leading thickness axis.
+        """
+        solver = Solver4x4(Experiment(self, lbda, theta_i), **solver_kwargs)
+        return solver.calculate_thickness_sweep(thicknesses, chunk_size)
+
+    def compile(
+        self,
+        lbda: npt.ArrayLike,
+        theta_i: npt.ArrayLike,
+        solver: Union[Type[Solver], str] = "auto",
+        **solver_kwargs,
+    ) -> "EvaluationPlan":
+        """Compiles the structure into an evaluation plan for repeated evaluations,
+        e.g. in a fitting loop. See :class:`EvaluationPlan<elli.plan.EvaluationPlan>`.
+
+        Args:
+            lbda (npt.ArrayLike): Single value or array of wavelengths (in nm).
+            theta_i (npt.ArrayLike):
+                Single value or array of incident angles of the experiment (in degrees).
+            solver (Union[Type[Solver], str], optional): Choose which solver class is used.
+                With "auto", the solver is selected by
+                :func:`select_solver<elli.experiment.select_solver>`. Defaults to "auto".
+            solver_kwargs (optional): Keyword arguments for the Solver can be appended as arguments.
+
+        Returns:
+            EvaluationPlan: Plan to evaluate the structure with changing parameters.
+        """
+        # Imported locally to avoid circular imports
+        from .plan import EvaluationPlan
+
+        return EvaluationPlan(self, lbda, theta_i, solver, **solver_kwargs)
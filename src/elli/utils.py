@@ -227,7 +227,8 @@ def rotation_v_theta(v: npt.ArrayLike, theta: float) -> npt.NDArray:
 
     Args:
         v (npt.ArrayLike): unit vector orienting the rotation (list or array)
-        theta (float): rotation angle around v in degrees
+        theta (float): rotation angle around v in degrees,
+            an array of angles returns a stack of rotation matrices
 
     Returns:
         npt.NDArray: rotation matrix :math:`M_R`
@@ -238,8 +239,9 @@ def rotation_v_theta(v: npt.ArrayLike, theta: float) -> npt.NDArray:
                   [-v[1], v[0],  0]])
     # fmt: on
 
+    theta = np.deg2rad(theta)[..., np.newaxis, np.newaxis]
     return (
         np.identity(3)
-        + m_w * np.sin(np.deg2rad(theta))
-        + np.linalg.matrix_power(m_w, 2) * (1 - np.cos(np.deg2rad(theta)))
+        + m_w * np.sin(theta)
+        + np.linalg.matrix_power(m_w, 2) * (1 - np.cos(theta))
     )
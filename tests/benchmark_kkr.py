@@ -0,0 +1,29 @@
+"""Benchmark for the methods of the Kramers-Kronig relations"""
+
+import numpy as np
+from pytest import mark
+
+from elli.kkr import im2re
+from elli.kkr.kkr import _calc_kkr, _integrate_im
+
+energy = np.linspace(0.01, 10, 5000)
+lorentz = 20 / (25 - energy**2 - 1j * 0.3 * energy)
+
+
+def test_kkr_dense(benchmark):
+    """Benchmarks Maclaurin's formula with dense matrices of all points"""
+    benchmark(_calc_kkr, lorentz.imag, energy, _integrate_im, len(energy))
+
+
+@mark.parametrize("method", ["maclaurin", "fft"])
+def test_kkr(benchmark, method):
+    """Benchmarks the chunked Maclaurin formula and the fft method"""
+    benchmark(im2re, lorentz.imag, energy, method)
+
+
+@mark.parametrize("points", [20000, 200000])
+def test_kkr_fft_broadband(benchmark, points):
+    """Benchmarks the fft method on a broadband spectrum"""
+    broadband = np.linspace(0.01, 100, points)
+    spectrum = (20 / (25 - broadband**2 - 1j * 0.3 * broadband)).imag
+    benchmark(im2re, spectrum, broadband, "fft")
@@ -162,3 +162,18 @@ class TestTiO2:
         )
 
         assert TestTiO2.chisqr(meas_data, sim_data) < 0.0456
+
+    def test_solver4x4_analytic(self, si_dispersion, meas_data):
+        """The solver4x4 with analytic propagator is within chi square accuracy"""
+        sim_data = (
+            elli.Structure(elli.AIR, self.Layer, si_dispersion)
+            .evaluate(
+                meas_data.index,
+                70,
+                solver=elli.Solver4x4,
+                propagator=elli.PropagatorAnalytic(),
+            )
+            .rho
+        )
+
+        assert TestTiO2.chisqr(meas_data, sim_data) < 0.0456
@@ -7,7 +7,7 @@ import numpy as np
 import pandas as pd
 from numpy.testing import assert_array_equal
 from pandas.testing import assert_frame_equal
-from pytest import fixture, raises
+from pytest import fixture, importorskip, raises
 
 import elli
 from elli.dispersions.base_dispersion import InvalidParameters
@@ -233,3 +233,80 @@ def test_correct_reconstruction_with_pseudo_dielectric():
         ).get_dielectric_df(check_lbda),
         gaussian.get_dielectric_df(check_lbda),
     )
+
+
+def test_dispersion_cache():
+    lbda = np.linspace(400, 800, 11)
+    calls = []
+
+    class CountingLorentz(elli.LorentzEnergy):
+        def dielectric_function(self, lbda):
+            calls.append(self)
+            return super().dielectric_function(lbda)
+
+    first = CountingLorentz().add(1, 3, 0.1)
+    second = CountingLorentz().add(2, 5, 0.2)
+    dispersion = first + second
+    eps = dispersion.get_dielectric(lbda)
+    assert len(calls) == 2
+    assert dispersion._cached_dielectric(lbda) is dispersion._cached_dielectric(lbda)
+    assert not dispersion._cached_dielectric(lbda).flags.writeable
+    assert len(calls) == 2
+
+    # The public getters return copies of the cached evaluation
+    eps[:] = 0
+    assert_array_equal(dispersion.get_dielectric(lbda), dispersion.get_dielectric(lbda))
+    assert dispersion.get_dielectric(lbda).any()
+    assert len(calls) == 2
+
+    # Only the changed dispersion of the sum is evaluated again
+    first.rep_params[0]["E"] = 3.5
+    changed = dispersion.get_dielectric(lbda)
+    assert calls[2:] == [first]
+    assert_array_equal(
+        changed,
+        elli.LorentzEnergy().add(1, 3.5, 0.1).get_dielectric(lbda)
+        + elli.LorentzEnergy().add(2, 5, 0.2).get_dielectric(lbda),
+    )
+
+    second.add(1, 4, 0.1)
+    dispersion.get_dielectric(lbda)
+    assert calls[3:] == [second]
+
+    dispersion.get_dielectric(lbda[::2])
+    assert len(calls) == 6
+
+    lmfit = importorskip("lmfit")
+    params = lmfit.Parameters()
+    params.add("n0", value=1.5)
+    cauchy = elli.Cauchy(params["n0"])
+    assert cauchy.get_refractive_index(lbda)[0] == 1.5
+    params["n0"].value = 1.6
+    assert cauchy.get_refractive_index(lbda)[0] == 1.6
+
+
+def test_repeated_parameter_arrays():
+    """Repeated parameters are stored as array and evaluated in one broadcast"""
+    lbda = np.linspace(300, 900, 7)
+    dispersion = elli.TaucLorentz(Eg=1.5).add(30, 3.2, 1).add(50, 4, 2)
+
+    assert_array_equal(dispersion.rep_params.arrays()["A"], [30, 50])
+    assert dict(dispersion.rep_params[1]) == {"A": 50, "E": 4, "C": 2}
+    assert_array_equal(
+        dispersion.get_dielectric(lbda),
+        elli.TaucLorentz(Eg=1.5).add(30, 3.2, 1).get_dielectric(lbda)
+        + elli.TaucLorentz(Eg=1.5).add(50, 4, 2).get_dielectric(lbda),
+    )
+    assert_array_equal(elli.Sellmeier().get_dielectric(lbda), np.ones(7))
+
+    # Parameter arrays with a leading batch axis broadcast over all oscillators
+    dispersion.rep_params[0]["A"] = np.array([30.0, 40.0])[:, None]
+    batch = dispersion.dielectric_function(lbda)
+    assert batch.shape == (2, 7)
+    assert_array_equal(
+        batch[1],
+        elli.TaucLorentz(Eg=1.5).add(40, 3.2, 1).add(50, 4, 2).get_dielectric(lbda),
+    )
+
+    with raises(InvalidParameters):
+        dispersion.rep_params[0]["B"] = 1
@@ -0,0 +1,124 @@
+"""Tests for the fitting decorators"""
+
+import elli
+import numpy as np
+import pandas as pd
+from elli.fitting import ParamsHist
+from elli.fitting.decorator_mmatrix import FitMuellerMatrix, mmatrix_to_dataframe
+from elli.fitting.decorator_psi_delta import FitRho
+from pytest import fixture, raises
+
+lbda = np.linspace(400, 800, 41)
+
+
+def build_plan(params):
+    film = elli.Cauchy(params["n0"], 40).get_mat()
+    structure = elli.Structure(
+        elli.AIR, [elli.Layer(film, params["d"])], elli.Cauchy(3.4).get_mat()
+    )
+    return structure.compile(lbda, 70)
+
+
+@fixture
+def params():
+    params = ParamsHist()
+    params.add("n0", value=1.6, min=1.3, max=2.0)
+    params.add("d", value=100)
+    return params
+
+
+@fixture
+def model(params):
+    plan = build_plan(params)
+
+    def model(_, fit_params, jacobian=False):
+        model.calls[jacobian] += 1
+        return plan.evaluate(fit_params, jacobian=jacobian)
+
+    model.calls = {False: 0, True: 0}
+    return model
+
+
+def measurement():
+    true_params = ParamsHist()
+    true_params.add("n0", value=1.45)
+    true_params.add("d", value=120)
+    return build_plan(true_params).evaluate()
+
+
+def test_fit_rho_jacobian(params, model):
+    """FitRho uses the derivatives of the model as Jacobian"""
+    exp_data = pd.DataFrame(
+        {"Ψ": measurement().psi, "Δ": measurement().delta},
+        index=pd.Index(lbda, name="Wavelength"),
+    )
+    fit = FitRho(exp_data, params, model, jacobian=True)
+
+    rho = measurement().rho
+    fit_params = params.copy()
+    fit_params["d"].value = 105
+    step = 1e-6
+    fit_params["d"].value += step
+    upper = fit.fit_function(fit_params, lbda, rho.real, rho.imag)
+    fit_params["d"].value -= 2 * step
+    lower = fit.fit_function(fit_params, lbda, rho.real, rho.imag)
+    fit_params["d"].value += step
+
+    jacobian = fit.fit_jacobian(fit_params, lbda, rho.real, rho.imag)
+    assert jacobian.shape == (2 * len(lbda), 2)
+    np.testing.assert_allclose(
+        jacobian[:, 1], (upper - lower) / 2 / step, rtol=1e-5, atol=1e-8
+    )
+
+    model.calls.update({False: 0, True: 0})
+    result = fit.fit()
+    assert result.success
+    assert model.calls[True] > 0
+    np.testing.assert_allclose(result.params["n0"].value, 1.45, rtol=1e-6)
+    np.testing.assert_allclose(result.params["d"].value, 120, rtol=1e-6)
+
+
+def test_fit_mueller_matrix_jacobian(params, model):
+    """FitMuellerMatrix uses the derivatives of the model as Jacobian"""
+    columns = [f"M{i}{j}" for i in range(1, 5) for j in range(1, 5)]
+    exp_mm = pd.DataFrame(
+        measurement().mueller_matrix.reshape(-1, 16),
+        index=pd.Index(lbda, name="Wavelength"),
+        columns=columns,
+    )
+    fit = FitMuellerMatrix(exp_mm, params, model, jacobian=True)
+
+    jacobian = fit.fit_jacobian(params, lbda, exp_mm)
+    assert jacobian.shape == (16 * len(lbda), 2)
+
+    model.calls.update({False: 0, True: 0})
+    result = fit.fit()
+    assert result.success
+    assert model.calls[True] > 0
+    np.testing.assert_allclose(result.params["n0"].value, 1.45, rtol=1e-6)
+    np.testing.assert_allclose(result.params["d"].value, 120, rtol=1e-6)
+    np.testing.assert_allclose(
+        mmatrix_to_dataframe(exp_mm, fit.model(lbda, result.params).mueller_matrix),
+        exp_mm,
+        atol=1e-8,
+    )
+
+    # Without the flag, lmfit's difference quotients are used
+    model.calls.update({False: 0, True: 0})
+    FitMuellerMatrix(exp_mm, params, model).fit()
+    assert model.calls[True] == 0
+
+
+def test_fit_jacobian_errors(params, model):
+    """The Jacobian is rejected for constrained parameters"""
+    exp_data = pd.DataFrame(
+        {"Ψ": measurement().psi, "Δ": measurement().delta},
+        index=pd.Index(lbda, name="Wavelength"),
+    )
+    params.add("d2", expr="2 * d")
+    fit = FitRho(exp_data, params, model, jacobian=True)
+
+    with raises(ValueError):
+        fit.fit()
+
+    assert not fit.use_jacobian("nelder")
@@ -10,6 +10,11 @@ import elli
 from elli.dispersions import Sellmeier, Formula
 from elli.dispersions.cauchy import Cauchy
 from elli.dispersions.formula import FormulaIndex
+from elli.formula_parser.parser import (
+    FormulaTransformer,
+    compile_formula,
+    parse_formula,
+)
 
 
 @pytest.mark.parametrize(
@@ -90,3 +95,49 @@ def test_formula_against_predefined_model(structure, formula_structure):
     formula2x2 = formula_structure.evaluate(lbda, PHI, solver=elli.Solver2x2)
 
     assert_array_almost_equal(predefined2x2.rho, formula2x2.rho)
+
+
+def test_compiled_formula_matches_transformer():
+    """The compiled formula evaluates to the same values as the transformer"""
+    lbda = np.linspace(400, 800, 50)
+    single_params = {"n0": 1.5, "g": 0.3}
+    rep_params = {"A": np.array([1.0, 2.0]), "B": np.array([0.1, 0.2])}
+
+    for formula in [
+        "eps = n0 + sum[A * lbda ** 2 / (lbda ** 2 - B)] - 1j * sqrt(g) / -2",
+        "eps = sum[lbda] + sum[A * sin(lbda / B)] * 2 ** 2 + pi * hbar / c",
+    ]:
+        compiled = compile_formula(formula, "lbda")
+        assert compile_formula(formula, "lbda") is compiled
+        assert_array_almost_equal(
+            compiled(lbda, single_params, rep_params),
+            FormulaTransformer("lbda", lbda, single_params, rep_params).transform(
+                parse_formula(formula)
+            )[1],
+        )
+
+    with pytest.raises(ValueError):
+        compile_formula("eps = 1 + x", "lbda")(lbda, {}, {})
+
+
+@pytest.mark.parametrize("unit", ["eV", "nm"])
+def test_formula_kkr_term(unit):
+    """The Kramers-Kronig term reproduces the real part of a Tauc-Lorentz model"""
+    lbda = np.linspace(200, 1200, 500)
+    energy = "x" if unit == "eV" else "(1239.84198 / x)"
+    formula = (
+        "eps = <kkr> + 1j * sum[A * E * C * (x - Eg)**2 / "
+        "((x**2 - E**2)**2 + C**2 * x**2) / x * heaviside(x - Eg)]"
+    ).replace("x", energy)
+    single_params = {"Eg": 1.5}
+    rep_params = {"A": [80, 20], "E": [3.5, 5], "C": [1.5, 2]}
+
+    tauc_lorentz = elli.TaucLorentz(**single_params)
+    for params in zip(*rep_params.values()):
+        tauc_lorentz.add(*params)
+
+    formula_disp = Formula(formula, "x", single_params, rep_params, unit)
+
+    np.testing.assert_allclose(
+        formula_disp.get_dielectric(lbda), tauc_lorentz.get_dielectric(lbda), atol=5e-3
+    )
@@ -2,8 +2,10 @@
 
 import elli
 import numpy as np
-from elli.kkr import im2re, im2re_reciprocal
-from numpy.testing import assert_array_almost_equal
+from elli.kkr import im2re, im2re_reciprocal, re2im
+from elli.kkr.kkr import _calc_kkr, _integrate_im
+from numpy.testing import assert_array_almost_equal, assert_array_equal
+from pytest import raises
 
 
 def test_tauc_lorentz():
@@ -51,3 +53,45 @@ def test_gauss():
         g.get_dielectric(lbda).real[:-1000],
         decimal=2,
     )
+
+
+def test_maclaurin_chunks():
+    """The chunked Maclaurin formula reproduces the dense calculation"""
+    energy = np.linspace(0.01, 10, 1001)
+    lorentz = 20 / (25 - energy**2 - 1j * 0.3 * energy)
+
+    assert_array_equal(
+        _calc_kkr(lorentz.imag, energy, _integrate_im, chunk_size=37),
+        _calc_kkr(lorentz.imag, energy, _integrate_im, chunk_size=len(energy)),
+    )
+
+
+def test_fft_lorentz():
+    """The fft method reproduces the analytical expression of a Lorentz oscillator"""
+    energy = np.linspace(0.01, 10, 5000)
+    lorentz = 20 / (25 - energy**2 - 1j * 0.3 * energy)
+
+    assert_array_almost_equal(
+        im2re(lorentz.imag, energy, method="fft")[:4000],
+        lorentz.real[:4000],
+        decimal=2,
+    )
+    assert_array_almost_equal(
+        re2im(lorentz.real, energy, method="fft")[100:-100],
+        re2im(lorentz.real, energy)[100:-100],
+        decimal=2,
+    )
+
+    with raises(ValueError):
+        im2re(lorentz.imag, energy, method="hilbert")
+
+
+def test_fft_tauc_lorentz():
+    """The fft method reproduces Tauc-Lorentz on a reciprocal axis"""
+    lbda = np.linspace(1e-2, 2000, 2000)
+    g = elli.TaucLorentz(Eg=5).add(A=20, E=8, C=5)
+    assert_array_almost_equal(
+        im2re_reciprocal(g.get_dielectric(lbda).imag, lbda, method="fft"),
+        g.get_dielectric(lbda).real,
+        decimal=1,
+    )
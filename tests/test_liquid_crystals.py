@@ -4,6 +4,7 @@
 import elli
 import numpy as np
 from numpy.lib.scimath import sqrt
+from pytest import raises
 from scipy.constants import pi
 from scipy.signal import argrelmax, argrelmin
 
@@ -105,3 +106,50 @@ def test_twisted_nematic_lc():
 
     # Compare results
     np.testing.assert_array_almost_equal(T_bm, T_gt, decimal=2)
+
+
+def test_helicoidal_propagation():
+    front = back = elli.IsotropicMaterial(elli.ConstantRefractiveIndex(n=1.6))
+    LC = elli.UniaxialMaterial(
+        elli.ConstantRefractiveIndex(n=1.5), elli.ConstantRefractiveIndex(n=1.7)
+    )
+    LC.set_rotation(elli.rotation_v_theta(elli.E_Y, 90))
+    lbda = np.linspace(600, 1500, 50)
+
+    def evaluate(div, propagation, theta, tolerance=None):
+        TN = elli.TwistedLayer(LC, 325, div, 180, propagation=propagation)
+        TN.set_adaptive(tolerance)
+        s = elli.Structure(front, [elli.RepeatedLayers([TN], 5)], back)
+        return s.evaluate(lbda, theta, solver=elli.Solver4x4)
+
+    # Exact with a single propagator at normal incidence
+    reference = evaluate(1000, "slices", 0)
+    for div in [1, 35]:
+        data = evaluate(div, "helicoidal", 0)
+        np.testing.assert_allclose(data.R, reference.R, atol=1e-6)
+        np.testing.assert_allclose(data.T, reference.T, atol=1e-6)
+
+    # Adaptively refined Magnus slices at oblique incidence,
+    # even if the layer is given a single slice
+    reference = evaluate(1000, "magnus", 40)
+    data = evaluate(1, "helicoidal", 40)
+    np.testing.assert_allclose(data.R, reference.R, atol=1e-4)
+    np.testing.assert_allclose(data.psi, reference.psi, atol=1e-2)
+    data = evaluate(1, "helicoidal", 40, tolerance=1e-7)
+    np.testing.assert_allclose(data.R, reference.R, atol=1e-7)
+    np.testing.assert_allclose(data.psi, reference.psi, atol=1e-5)
+
+    # Short wavelength lists at oblique incidence
+    for short in [lbda[:2], lbda[[10]]]:
+        layer = elli.TwistedLayer(LC, 100, 10, 90, propagation="helicoidal")
+        data = elli.Structure(front, [layer], back).evaluate(
+            short, 45, solver=elli.Solver4x4
+        )
+        layer = elli.TwistedLayer(LC, 100, 1000, 90, propagation="magnus")
+        expected = elli.Structure(front, [layer], back).evaluate(
+            short, 45, solver=elli.Solver4x4
+        )
+        np.testing.assert_allclose(data.rho, expected.rho, atol=1e-4)
+
+    with raises(ValueError):
+        elli.TwistedLayer(LC, 325, 1, 180, propagation="exact")
@@ -1,6 +1,7 @@
 """Tests for the materials classes"""
 
 import elli
+import numpy as np
 from pytest import raises
 
 
@@ -32,3 +33,45 @@ class TestMaterials:
 
         with raises(ValueError):
             elli.VCAMaterial(self.mat, self.mat, 10)
+
+    def test_tensor_forms(self):
+        """Checks the tensor form tags and the compact tensors of materials"""
+        lbda = np.linspace(400, 800, 5)
+        uniaxial = elli.UniaxialMaterial(self.disp, self.disp2)
+        rotated = elli.UniaxialMaterial(self.disp, self.disp2)
+        rotated.set_rotation(elli.rotation_v_theta(elli.E_Y, 30))
+
+        assert self.mat.tensor_form == "isotropic"
+        assert uniaxial.tensor_form == "diagonal"
+        assert rotated.tensor_form == "full"
+        assert elli.BruggemanEMA(self.mat, self.mat2, 0.3).tensor_form == "isotropic"
+        assert elli.VCAMaterial(self.mat, uniaxial, 0.3).tensor_form == "diagonal"
+        assert elli.VCAMaterial(rotated, self.mat, 0.3).tensor_form == "full"
+
+        assert self.mat.get_compact_tensor(lbda).shape == (5, 1)
+        assert uniaxial.get_compact_tensor(lbda).shape == (5, 3)
+        assert rotated.get_compact_tensor(lbda).shape == (5, 3, 3)
+        np.testing.assert_array_equal(
+            np.diagonal(uniaxial.get_tensor(lbda), axis1=-2, axis2=-1),
+            uniaxial.get_compact_tensor(lbda),
+        )
+
+    def test_compact_mixtures_match_full_tensors(self):
+        """Mixing compact tensors equals mixing the full tensors component-wise"""
+        lbda = np.linspace(400, 800, 5)
+        uniaxial = elli.UniaxialMaterial(
+            elli.Cauchy(1.6, 0.01, 0, 0.1), elli.Cauchy(1.8)
+        )
+        host = elli.Cauchy(1.45, 0.003).get_mat()
+
+        for ema in [
+            elli.VCAMaterial,
+            elli.LooyengaEMA,
+            elli.MaxwellGarnettEMA,
+            elli.BruggemanEMA,
+        ]:
+            mixture = ema(host, uniaxial, 0.3)
+            expected = ema.mix(
+                mixture, host.get_tensor(lbda), uniaxial.get_tensor(lbda), 0.3
+            )
+            np.testing.assert_allclose(mixture.get_tensor(lbda), expected)
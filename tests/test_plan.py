@@ -0,0 +1,309 @@
+"""Tests for the compiled evaluation plan"""
+
+import elli
+import numpy as np
+from elli.fitting import ParamsHist
+from elli.solver4x4 import TransferMatrixChain
+from pytest import fixture, raises
+
+
+class CountingCauchy(elli.Cauchy):
+    """Cauchy dispersion counting its evaluations."""
+
+    calls = 0
+
+    def refractive_index(self, lbda):
+        CountingCauchy.calls += 1
+        return super().refractive_index(lbda)
+
+
+@fixture
+def params():
+    params = ParamsHist()
+    params.add("SiO2_n0", value=1.452)
+    params.add("SiO2_d", value=276.36)
+    params.add("TiO2_n0", value=2.236)
+    params.add("TiO2_n1", value=451)
+    params.add("TiO2_d", value=20)
+    params.add("angle", value=70)
+    return params
+
+
+def build_structure(params, dispersion=elli.Cauchy):
+    sio2 = dispersion(params["SiO2_n0"], 36.0).get_mat()
+    tio2 = dispersion(params["TiO2_n0"], params["TiO2_n1"], 251).get_mat()
+    layers = 4 * [
+        elli.Layer(tio2, params["TiO2_d"]),
+        elli.Layer(sio2, params["SiO2_d"]),
+    ] + [elli.VaryingMixtureLayer(elli.VCAMaterial(tio2, sio2, 0.5), 30, 3)]
+
+    return elli.Structure(elli.AIR, layers, elli.Cauchy(3.4).get_mat())
+
+
+def reference(params, lbda, solver):
+    values = params.valuesdict()
+    return build_structure(values).evaluate(lbda, values["angle"], solver=solver)
+
+
+def test_plan_matches_structure_evaluation(params):
+    lbda = np.linspace(300, 800, 51)
+
+    for solver in [elli.Solver2x2, elli.Solver4x4]:
+        plan = build_structure(params).compile(lbda, params["angle"], solver=solver)
+        assert sorted(plan.parameter_names) == sorted(params.keys())
+
+        np.testing.assert_allclose(
+            plan.evaluate(params).rho, reference(params, lbda, solver).rho
+        )
+
+        params["TiO2_n0"].value = 2.1
+        params["SiO2_d"].value = 250
+        params["angle"].value = 65
+        np.testing.assert_allclose(
+            plan.evaluate(params).rho, reference(params, lbda, solver).rho
+        )
+
+        plan.evaluate({"TiO2_d": 25})
+        params["TiO2_d"].value = 25
+        np.testing.assert_allclose(
+            plan.evaluate().rho, reference(params, lbda, solver).rho
+        )
+
+        params["TiO2_n0"].value = 2.236
+        params["SiO2_d"].value = 276.36
+        params["angle"].value = 70
+        params["TiO2_d"].value = 20
+
+
+def test_plan_reevaluates_changed_materials_only(params):
+    lbda = np.linspace(300, 800, 51)
+    plan = build_structure(params, CountingCauchy).compile(lbda, 70)
+
+    # Isotropic materials evaluate their dispersion only once for all three axes
+    CountingCauchy.calls = 0
+    plan.evaluate(params)
+    # SiO2 and TiO2 are shared by all layers and only evaluated once,
+    # the mixture layer reuses the cached dispersions of both materials
+    assert CountingCauchy.calls == 2
+
+    CountingCauchy.calls = 0
+    plan.evaluate(params)
+    assert CountingCauchy.calls == 0
+
+    CountingCauchy.calls = 0
+    plan.evaluate({"TiO2_n0": 2.0})
+    # Only the dispersion of TiO2 is reevaluated
+    assert CountingCauchy.calls == 1
+
+    CountingCauchy.calls = 0
+    plan.evaluate({"SiO2_d": 200})
+    assert CountingCauchy.calls == 0
+
+
+class CountingSolver4x4(elli.Solver4x4):
+    """Solver4x4 counting the calculated layer transfer matrices."""
+
+    calls = 0
+
+    def layer_transfer_matrix(self, layer, k_x):
+        CountingSolver4x4.calls += 1
+        return super().layer_transfer_matrix(layer, k_x)
+
+
+def test_plan_incremental_resolve():
+    rng = np.random.default_rng(42)
+    lbda = np.linspace(300, 800, 51)
+
+    params = ParamsHist()
+    for i in range(8):
+        params.add(f"d{i}", value=rng.uniform(10, 100))
+    params.add("n", value=1.8)
+
+    material = elli.Cauchy(params["n"], 40).get_mat()
+    other = elli.Cauchy(2.2, 100).get_mat()
+    layers = [
+        elli.Layer(material if i % 2 else other, params[f"d{i}"]) for i in range(8)
+    ]
+    plan = elli.Structure(elli.AIR, layers, elli.Cauchy(3.4).get_mat()).compile(
+        lbda, [50, 70], solver=CountingSolver4x4
+    )
+
+    CountingSolver4x4.calls = 0
+    plan.evaluate(params)
+    assert CountingSolver4x4.calls == 8
+
+    for index in [3, 3, 6, 0, 7, 3]:
+        params[f"d{index}"].value = rng.uniform(10, 100)
+
+        CountingSolver4x4.calls = 0
+        result = plan.evaluate(params)
+        assert CountingSolver4x4.calls == 1
+
+        values = params.valuesdict()
+        for layer, i in zip(layers, range(8)):
+            layer.set_thickness(values[f"d{i}"])
+        reference = elli.Structure(
+            elli.AIR, layers, elli.Cauchy(3.4).get_mat()
+        ).evaluate(lbda, [50, 70])
+        np.testing.assert_allclose(result.rho, reference.rho)
+
+    # A material change invalidates all layers of this material
+    CountingSolver4x4.calls = 0
+    plan.evaluate({"n": 1.7})
+    assert CountingSolver4x4.calls == 4
+
+
+def test_plan_evaluate_batch(params):
+    lbda = np.linspace(300, 800, 21)
+    rng = np.random.default_rng(0)
+    rows = []
+    for _ in range(5):
+        row = params.copy()
+        row["TiO2_n0"].value = rng.uniform(2.0, 2.4)
+        row["SiO2_d"].value = rng.uniform(200, 300)
+        row["TiO2_d"].value = rng.uniform(10, 30)
+        rows.append(row)
+
+    for solver, kwargs in [
+        (elli.Solver2x2, {}),
+        (elli.Solver4x4, {}),
+        (elli.Solver4x4, {"batched": True}),
+    ]:
+        for angles in [70, [50, 70]]:
+            plan = build_structure(params).compile(
+                lbda, angles, solver=solver, **kwargs
+            )
+            result = plan.evaluate_batch(rows)
+
+            assert result.psi.shape == (5,) + np.shape(angles) + (len(lbda),)
+            for i, row in enumerate(rows):
+                np.testing.assert_allclose(result.rho[i], plan.evaluate(row).rho)
+
+            columns = {
+                name: [row[name].value for row in rows]
+                for name in ["TiO2_n0", "SiO2_d", "TiO2_d"]
+            }
+            np.testing.assert_allclose(plan.evaluate_batch(columns).rho, result.rho)
+
+
+def test_plan_evaluate_batch_keeps_parameters(params):
+    plan = build_structure(params).compile(np.linspace(300, 800, 21), 70)
+    before = plan.evaluate(params).rho
+
+    plan.evaluate_batch({"TiO2_d": [10, 20, 30]})
+    np.testing.assert_allclose(plan.evaluate().rho, before)
+
+    with raises(ValueError):
+        plan.evaluate_batch({"TiO2_d": [10, 20, 30], "SiO2_d": [100, 200]})
+
+    with raises(ValueError):
+        plan.evaluate_batch({"angle": [60, 70]})
+
+    with raises(ValueError):
+        plan.evaluate_batch({"unknown": [1, 2]})
+
+
+def difference_quotient(plan, params, name, quantity):
+    values = params.valuesdict()
+    step = 1e-5 * max(abs(values[name]), 1)
+
+    shifted = []
+    for sign in [1, -1]:
+        values[name] = params[name].value + sign * step
+        shifted.append(getattr(plan.evaluate(values), quantity))
+    plan.evaluate(params)
+
+    return (shifted[0] - shifted[1]) / (2 * step)
+
+
+def test_plan_jacobian(params):
+    lbda = np.linspace(300, 800, 21)
+
+    for solver in [elli.Solver2x2, elli.Solver4x4]:
+        for angles in [params["angle"], [50, 70]]:
+            plan = build_structure(params).compile(lbda, angles, solver=solver)
+            result = plan.evaluate(params, jacobian=True)
+
+            assert result.jacobian_names == plan.parameter_names
+            assert result.rho_jacobian.shape == (len(plan.parameter_names),) + np.shape(
+                result.rho
+            )
+
+            for i, name in enumerate(result.jacobian_names):
+                for quantity in ["rho", "mueller_matrix"]:
+                    expected = difference_quotient(plan, params, name, quantity)
+                    np.testing.assert_allclose(
+                        getattr(result, quantity + "_jacobian")[i],
+                        expected,
+                        rtol=1e-5,
+                        atol=1e-6 * np.max(np.abs(expected)),
+                    )
+
+
+def test_plan_jacobian_repeated_layers():
+    lbda = np.linspace(400, 800, 21)
+    params = ParamsHist()
+    params.add("n", value=2.2)
+    params.add("d", value=60)
+
+    high = elli.Cauchy(params["n"], 100).get_mat()
+    low = elli.Cauchy(1.45, 36).get_mat()
+    mirror = elli.RepeatedLayers(
+        [elli.Layer(high, params["d"]), elli.Layer(low, 90)], 5, 1, 1
+    )
+    plan = elli.Structure(
+        elli.AIR, [elli.Layer(low, 50), mirror], elli.Cauchy(1.5).get_mat()
+    ).compile(lbda, 60)
+
+    result = plan.evaluate(jacobian=["d", "n"])
+    assert result.jacobian_names == ["d", "n"]
+
+    for i, name in enumerate(["d", "n"]):
+        expected = difference_quotient(plan, params, name, "jones_matrix_r")
+        np.testing.assert_allclose(
+            result.jones_matrix_r_jacobian[i],
+            expected,
+            atol=1e-6 * np.max(np.abs(expected)),
+        )
+
+
+def test_plan_jacobian_errors(params):
+    plan = build_structure(params).compile(np.linspace(300, 800, 21), 70)
+
+    with raises(ValueError):
+        plan.evaluate().rho_jacobian
+
+    with raises(ValueError):
+        plan.evaluate(jacobian=["unknown"])
+
+
+class CountingMatrix:
+    """Placeholder matrix counting the matrix multiplications."""
+
+    __array_ufunc__ = None
+    products = 0
+
+    def __matmul__(self, other):
+        CountingMatrix.products += 1
+        return CountingMatrix()
+
+    __rmatmul__ = __matmul__
+
+
+def test_chain_alternating_changes():
+    """Alternating changes of two units only recalculate the units between them"""
+    chain = TransferMatrixChain(10, 0)
+    for i in range(10):
+        chain.set_unit(i, CountingMatrix())
+    chain.product()
+
+    for index, products in [(3, 7), (3, 2), (4, 3), (3, 2), (4, 3), (8, 6), (8, 2)]:
+        CountingMatrix.products = 0
+        chain.set_unit(index, CountingMatrix())
+        chain.product()
+        assert CountingMatrix.products == products
+
+    # Without changes the product is obtained by one multiplication
+    CountingMatrix.products = 0
+    chain.product()
+    assert CountingMatrix.products == 1
@@ -4,7 +4,8 @@ import warnings
 
 import elli
 import numpy as np
-from pytest import raises
+from elli.experiment import cross_check_solver, select_solver
+from pytest import importorskip, raises
 
 
 def test_solver2x2_active_medium():
@@ -23,3 +24,607 @@ def test_solver2x2_inverse_active_medium():
         s.evaluate([200, 300, 400, 500], 70, solver=elli.Solver2x2)
         assert len(w) == 1
         assert issubclass(w[-1].category, UserWarning)
+
+
+def _multi_angle_structure():
+    si = elli.Cauchy(3.4, 0.05).get_mat()
+    sio2 = elli.Cauchy(1.45, 0.003).get_mat()
+    return elli.Structure(elli.AIR, [elli.Layer(sio2, 120)], si)
+
+
+def test_multi_angle_matches_single_angle_evaluation():
+    structure = _multi_angle_structure()
+    lbda = np.linspace(300, 800, 11)
+    angles = np.array([45, 60, 70, 75])
+
+    for solver in [elli.Solver2x2, elli.Solver4x4]:
+        result = structure.evaluate(lbda, angles, solver=solver)
+
+        assert result.psi.shape == (len(angles), len(lbda))
+        assert result.mueller_matrix.shape == (len(angles), len(lbda), 4, 4)
+        np.testing.assert_array_equal(result.theta_i, angles)
+
+        for i, angle in enumerate(angles):
+            single = structure.evaluate(lbda, angle, solver=solver)
+            np.testing.assert_allclose(result.rho[i], single.rho)
+            np.testing.assert_allclose(result.T[i], single.T)
+            np.testing.assert_allclose(result.mueller_matrix[i], single.mueller_matrix)
+
+
+def test_solver2x2_multilayer_matches_solver4x4():
+    sio2 = elli.Cauchy(1.45, 0.003).get_mat()
+    tio2 = elli.Cauchy(2.3, 0.02, 0, 0.01).get_mat()
+    layers = [elli.Layer(tio2 if i % 2 else sio2, 40 + i) for i in range(120)]
+    structure = elli.Structure(elli.AIR, layers, elli.Cauchy(1.5).get_mat())
+    lbda = np.linspace(400, 800, 21)
+    angles = [0, 45, 70]
+
+    result2x2 = structure.evaluate(lbda, angles, solver=elli.Solver2x2)
+    result4x4 = structure.evaluate(lbda, angles, solver=elli.Solver4x4)
+
+    assert result2x2.jones_matrix_r.shape == (len(angles), len(lbda), 2, 2)
+    np.testing.assert_allclose(result2x2.rho, result4x4.rho, rtol=1e-6)
+    np.testing.assert_allclose(result2x2.R, result4x4.R, atol=1e-8)
+    np.testing.assert_allclose(result2x2.T, result4x4.T, atol=1e-8)
+
+
+def test_auto_solver_selection():
+    structure = _multi_angle_structure()
+    si_mat = structure.back_material
+    uniaxial = elli.UniaxialMaterial(
+        elli.ConstantRefractiveIndex(1.5), elli.ConstantRefractiveIndex(1.7)
+    )
+    repeated = elli.Structure(
+        elli.AIR,
+        [elli.RepeatedLayers(structure.layers, 3)],
+        structure.back_material,
+    )
+    anisotropic = elli.Structure(
+        elli.AIR, [elli.Layer(uniaxial, 100)], structure.back_material
+    )
+
+    assert select_solver(structure) is elli.Solver2x2
+    assert select_solver(repeated) is elli.Solver2x2
+    assert select_solver(anisotropic) is elli.Solver4x4
+    mixture = elli.Structure(
+        elli.AIR,
+        [elli.VaryingMixtureLayer(elli.BruggemanEMA(elli.AIR, si_mat, 0.5), 50, 5)],
+        structure.back_material,
+    )
+    assert select_solver(mixture) is elli.Solver2x2
+    mixture.layers[0].set_propagation("magnus")
+    assert select_solver(mixture) is elli.Solver4x4
+    assert select_solver(structure, propagator=elli.PropagatorExpm()) is elli.Solver4x4
+    assert select_solver(structure, elli.Solver4x4) is elli.Solver4x4
+
+    with raises(ValueError):
+        select_solver(structure, "fast")
+
+
+def test_magnus_propagation():
+    si_mat = elli.Cauchy(3.4).get_mat()
+    uniaxial = elli.UniaxialMaterial(elli.Cauchy(1.5), elli.Cauchy(1.7))
+    uniaxial.set_rotation(elli.rotation_v_theta(elli.E_Y, 60))
+    lbda = np.linspace(400, 1000, 11)
+
+    for build in [
+        lambda div, propagation: elli.VaryingMixtureLayer(
+            elli.BruggemanEMA(elli.AIR, si_mat, 0.5),
+            1000,
+            div,
+            lambda z: z**3,
+            propagation=propagation,
+        ),
+        lambda div, propagation: elli.TwistedLayer(
+            uniaxial, 2000, div, 270, propagation=propagation
+        ),
+    ]:
+
+        def error(div, propagation):
+            return np.abs(
+                elli.Structure(elli.AIR, [build(div, propagation)], si_mat)
+                .evaluate(lbda, 55, solver=elli.Solver4x4)
+                .rho
+                - reference.rho
+            ).max()
+
+        reference = elli.Structure(elli.AIR, [build(2000, "slices")], si_mat).evaluate(
+            lbda, 55, solver=elli.Solver4x4
+        )
+
+        # Fourth order convergence, i.e. 16 times smaller errors for half the slices
+        assert error(80, "magnus") < error(40, "magnus") / 10
+        assert error(40, "magnus") < error(40, "slices") / 10
+
+    with raises(ValueError):
+        elli.VaryingMixtureLayer(
+            elli.BruggemanEMA(elli.AIR, si_mat, 0.5), 1000, 5, propagation="helicoidal"
+        )
+
+
+def test_incoherent_substrate():
+    lbda = np.linspace(500, 700, 5)
+    n_glass = 1.5 + 1e-5j
+    glass = elli.ConstantRefractiveIndex(n_glass).get_mat()
+    thickness = 1e6
+    structure = elli.Structure(
+        elli.AIR, [elli.Layer(glass, thickness, "incoherent")], elli.AIR
+    )
+
+    for solver in [elli.Solver2x2, elli.Solver4x4]:
+        for theta in [0, 60]:
+            result = structure.evaluate(lbda, theta, solver=solver)
+            assert isinstance(result, elli.IncoherentResult)
+
+            # Sum over all multiple reflections inside the substrate
+            k_z = np.sqrt(n_glass**2 - np.sin(np.deg2rad(theta)) ** 2)
+            a = np.exp(-4 * np.pi * k_z.imag * thickness / lbda)
+            interface = elli.Structure(elli.AIR, [], glass).evaluate(lbda, theta)
+            for pol in ["pp", "ss"]:
+                r_1 = getattr(interface, f"R_{pol}")
+                t_1 = 1 - r_1
+                expected_r = r_1 + t_1**2 * r_1 * a**2 / (1 - r_1**2 * a**2)
+                expected_t = t_1**2 * a / (1 - r_1**2 * a**2)
+                np.testing.assert_allclose(
+                    getattr(result, f"R_{pol}"), expected_r, atol=1e-9
+                )
+                np.testing.assert_allclose(
+                    getattr(result, f"T_{pol}"), expected_t, atol=1e-9
+                )
+
+    with raises(ValueError):
+        result.jones_matrix_r
+    with raises(ValueError):
+        result.rho_matrix
+
+    with raises(ValueError):
+        elli.Layer(glass, thickness, "partial")
+    with raises(ValueError):
+        elli.Layer(glass, thickness, "unknown")
+
+
+def test_partially_coherent_layer():
+    lbda = np.linspace(500, 700, 5)
+    n_glass = elli.ConstantRefractiveIndex(1.5 + 1e-5j)
+    n_film = elli.ConstantRefractiveIndex(2.0 + 0.01j)
+    glass = n_glass.get_mat()
+    front = elli.Layer(n_film.get_mat(), 50)
+    back = elli.Layer(elli.UniaxialMaterial(n_film, n_glass), 80)
+
+    coherent = elli.Structure(
+        elli.AIR, [front, elli.Layer(glass, 1e5), back], glass
+    ).evaluate(lbda, 70, solver=elli.Solver4x4)
+    narrow = elli.Structure(
+        elli.AIR, [front, elli.Layer(glass, 1e5, "partial", 1e-6, 2), back], glass
+    ).evaluate(lbda, 70, solver=elli.Solver4x4)
+    np.testing.assert_allclose(
+        narrow.mueller_matrix, coherent.mueller_matrix, atol=1e-9
+    )
+    np.testing.assert_allclose(narrow.psi, coherent.psi)
+    np.testing.assert_allclose(narrow.delta, coherent.delta)
+    np.testing.assert_allclose(narrow.T_matrix, coherent.T_matrix, atol=1e-12)
+
+    # A wide bandwidth approaches the incoherent limit
+    incoherent = elli.Structure(
+        elli.AIR, [front, elli.Layer(glass, 1e5, "incoherent"), back], glass
+    ).evaluate(lbda, 70, solver=elli.Solver4x4)
+    wide = elli.Structure(
+        elli.AIR, [front, elli.Layer(glass, 1e5, "partial", 150, 500), back], glass
+    ).evaluate(lbda, 70, solver=elli.Solver4x4)
+    np.testing.assert_allclose(
+        wide.mueller_matrix, incoherent.mueller_matrix, atol=5e-3
+    )
+    np.testing.assert_allclose(wide.R, incoherent.R, atol=1e-3)
+
+
+def test_partially_coherent_samples_shared(monkeypatch):
+    lbda = np.linspace(500, 700, 5)
+    glass = elli.ConstantRefractiveIndex(1.5 + 1e-5j).get_mat()
+    film = elli.ConstantRefractiveIndex(2.0 + 0.01j).get_mat()
+    first = elli.Layer(glass, 1e4, "partial", 20, 16)
+    second = elli.Layer(glass, 2e4, "partial", 40, 8)
+    structure = elli.Structure(
+        elli.AIR,
+        [first, elli.Layer(film, 50), second, elli.Layer(glass, 1e5, "incoherent")],
+        glass,
+    )
+
+    calls = []
+    segment_jones_matrices = elli.Solver2x2.segment_jones_matrices
+
+    def counting(self, layers, *args):
+        calls.append([layer.thickness for layer in layers])
+        return segment_jones_matrices(self, layers, *args)
+
+    monkeypatch.setattr(elli.Solver2x2, "segment_jones_matrices", counting)
+    structure.evaluate(lbda, 70, solver=elli.Solver2x2)
+
+    # One calculation per wavelength offset instead of all 16 * 8 combinations
+    assert len(calls) == 16 + 1
+    for first_thickness, _, second_thickness in calls[:16]:
+        # Both layers see the same relative wavelength offset
+        np.testing.assert_allclose(
+            (first_thickness / 1e4 - 1) / 20,
+            (second_thickness / 2e4 - 1) / 40,
+            atol=0.5 / 8 / lbda[0],
+        )
+
+
+def test_auto_solver_cross_check():
+    structure = _multi_angle_structure()
+    lbda = np.linspace(300, 800, 11)
+    angles = [45, 70]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = structure.evaluate(lbda, angles, check_solver=True)
+    reference = structure.evaluate(lbda, angles, solver=elli.Solver4x4)
+    np.testing.assert_allclose(result.rho, reference.rho, rtol=1e-8)
+
+    experiment = elli.Experiment(structure, lbda, angles)
+    deviating = elli.Result(
+        experiment,
+        reference.jones_matrix_r * 1.01,
+        reference.jones_matrix_t,
+        reference._power_correction,
+    )
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        assert not cross_check_solver(experiment, deviating)
+        assert len(w) == 1
+
+
+def test_delta_matrix_tensor_forms():
+    k_x = np.array([[0.0], [0.5], [0.9]])
+    diagonal = np.array([[2.1 + 0.1j, 2.3, 2.5 + 0.2j], [1.5, 1.7, 1.9]])
+    isotropic = diagonal[:, :1]
+
+    for compact, form in [(diagonal, "diagonal"), (isotropic, "isotropic")]:
+        full = np.zeros((2, 3, 3), dtype=complex)
+        full[:, [0, 1, 2], [0, 1, 2]] = np.broadcast_to(compact, (2, 3))
+
+        np.testing.assert_array_equal(
+            elli.Solver4x4.build_delta_matrix(k_x, compact, form),
+            elli.Solver4x4.build_delta_matrix(k_x, full),
+        )
+
+
+def test_multi_angle_anisotropic_solver4x4():
+    uniaxial = elli.UniaxialMaterial(
+        elli.ConstantRefractiveIndex(1.5), elli.ConstantRefractiveIndex(1.7)
+    )
+    uniaxial.set_rotation(
+        elli.rotation_v_theta(elli.E_Z, 30) @ elli.rotation_v_theta(elli.E_Y, 40)
+    )
+    structure = elli.Structure(
+        elli.AIR,
+        [elli.Layer(uniaxial, 500)],
+        elli.ConstantRefractiveIndex(1.5).get_mat(),
+    )
+    lbda = np.linspace(400, 800, 5)
+    angles = [0, 30, 60]
+
+    result = structure.evaluate(lbda, angles, solver=elli.Solver4x4)
+
+    for i, angle in enumerate(angles):
+        single = structure.evaluate(lbda, angle, solver=elli.Solver4x4)
+        np.testing.assert_allclose(result.r_sp[i], single.r_sp, atol=1e-12)
+        np.testing.assert_allclose(result.t_ps[i], single.t_ps, atol=1e-12)
+
+
+def test_theta_i_must_be_one_dimensional():
+    with raises(ValueError):
+        _multi_angle_structure().evaluate([400, 500], [[40, 50], [60, 70]])
+
+
+def test_analytic_propagator_matches_expm():
+    lbda = np.linspace(300, 800, 11)
+    k_x = np.sin(np.deg2rad(np.array([0, 40, 70])))[:, np.newaxis]
+    eps = np.broadcast_to(
+        np.diag([2.1 + 0.3j, 2.5 + 0.1j, 1.8 + 0.2j]), (len(lbda), 3, 3)
+    )
+    delta = elli.Solver4x4.build_delta_matrix(k_x, eps)
+
+    analytic = elli.PropagatorAnalytic()
+    assert np.all(analytic.is_decoupled(delta))
+    np.testing.assert_allclose(
+        analytic.calculate_propagation(delta, -150, lbda),
+        elli.PropagatorExpm(backend="scipy").calculate_propagation(delta, -150, lbda),
+        atol=1e-12,
+    )
+
+
+def test_analytic_propagator_falls_back_for_anisotropic_layers():
+    uniaxial = elli.UniaxialMaterial(
+        elli.ConstantRefractiveIndex(1.5), elli.ConstantRefractiveIndex(1.7)
+    )
+    uniaxial.set_rotation(
+        elli.rotation_v_theta(elli.E_Z, 30) @ elli.rotation_v_theta(elli.E_Y, 40)
+    )
+    structure = elli.Structure(
+        elli.AIR,
+        [
+            elli.Layer(elli.ConstantRefractiveIndex(2.0).get_mat(), 80),
+            elli.Layer(uniaxial, 300),
+        ],
+        elli.ConstantRefractiveIndex(1.5).get_mat(),
+    )
+    lbda = np.linspace(400, 800, 5)
+
+    analytic = structure.evaluate(
+        lbda, 60, solver=elli.Solver4x4, propagator=elli.PropagatorAnalytic()
+    )
+    expm = structure.evaluate(
+        lbda, 60, solver=elli.Solver4x4, propagator=elli.PropagatorExpm()
+    )
+
+    assert np.max(np.abs(analytic.t_ps)) > 1e-3
+    np.testing.assert_allclose(analytic.jones_matrix_r, expm.jones_matrix_r, atol=1e-12)
+    np.testing.assert_allclose(analytic.jones_matrix_t, expm.jones_matrix_t, atol=1e-12)
+
+
+def test_batched_solver4x4_matches_layer_loop():
+    uniaxial = elli.UniaxialMaterial(
+        elli.ConstantRefractiveIndex(1.5), elli.ConstantRefractiveIndex(1.7)
+    )
+    uniaxial.set_rotation(elli.rotation_v_theta(elli.E_Y, 70))
+    structure = elli.Structure(
+        elli.AIR,
+        [
+            elli.Layer(elli.ConstantRefractiveIndex(2.0).get_mat(), 80),
+            elli.TwistedLayer(uniaxial, 500, 25, 90),
+            elli.RepeatedLayers(
+                [elli.Layer(elli.AIR, 20), elli.Layer(uniaxial, 30)], 5
+            ),
+            elli.Layer(elli.ConstantRefractiveIndex(1.4).get_mat(), 40),
+        ],
+        elli.ConstantRefractiveIndex(1.5).get_mat(),
+    )
+    lbda = np.linspace(400, 800, 9)
+
+    for propagator in [elli.PropagatorAnalytic(), elli.PropagatorEig()]:
+        batched = structure.evaluate(
+            lbda, [0, 50], solver=elli.Solver4x4, propagator=propagator, batched=True
+        )
+        loop = structure.evaluate(
+            lbda, [0, 50], solver=elli.Solver4x4, propagator=propagator
+        )
+
+        np.testing.assert_allclose(
+            batched.jones_matrix_r, loop.jones_matrix_r, atol=1e-10
+        )
+        np.testing.assert_allclose(
+            batched.jones_matrix_t, loop.jones_matrix_t, atol=1e-10
+        )
+
+
+class CountingPropagator(elli.PropagatorEig):
+    """Eig propagator counting the calculated propagations."""
+
+    calls = 0
+
+    def calculate_propagation(self, delta, thickness, lbda):
+        self.calls += 1
+        return super().calculate_propagation(delta, thickness, lbda)
+
+
+def test_propagator_cache_reuses_identical_layers():
+    l_1 = elli.Layer(elli.ConstantRefractiveIndex(2.3).get_mat(), 60)
+    l_2 = elli.Layer(elli.ConstantRefractiveIndex(1.45).get_mat(), 95)
+    structure = elli.Structure(elli.AIR, 4 * [l_1, l_2], elli.AIR)
+    lbda = np.linspace(400, 800, 9)
+
+    propagator = CountingPropagator()
+    result = structure.evaluate(lbda, 70, propagator=propagator)
+    assert propagator.calls == 2
+
+    structure.evaluate(lbda, 70, propagator=propagator)
+    assert propagator.calls == 2
+
+    uncached = CountingPropagator(cache_size=0)
+    reference = structure.evaluate(lbda, 70, propagator=uncached)
+    assert uncached.calls == 8
+    np.testing.assert_allclose(result.rho, reference.rho)
+
+
+def test_propagator_cache_lru_eviction():
+    propagator = CountingPropagator(cache_size=2)
+    delta = elli.Solver4x4.build_delta_matrix(0.5, np.identity(3) * 2.25)
+    lbda = np.array([500.0])
+
+    for thickness in [10, 20, 10, 30, 10, 20]:
+        propagator.propagate(delta, thickness, lbda)
+
+    # 20 is evicted by 30, while 10 was used recently and stays cached
+    assert propagator.calls == 4
+
+    with raises(ValueError):
+        propagator.set_cache_size(-1)
+
+
+def test_default_propagator_not_shared():
+    experiment = elli.Experiment(
+        elli.Structure(elli.AIR, [], elli.AIR), np.linspace(400, 800, 3), 70
+    )
+    first = elli.Solver4x4(experiment)
+    second = elli.Solver4x4(experiment)
+
+    assert isinstance(first.propagator, elli.PropagatorAnalytic)
+    assert first.propagator is not second.propagator
+
+
+def test_solver4x4_torch_matches_solver4x4():
+    torch = importorskip("torch")
+
+    lbda = np.linspace(400, 800, 11)
+    structure = _multi_angle_structure()
+    uniaxial = elli.UniaxialMaterial(elli.Cauchy(1.6, 30), elli.Cauchy(1.7, 40))
+    uniaxial.set_rotation(
+        elli.rotation_v_theta(elli.E_Z, 30) @ elli.rotation_v_theta(elli.E_Y, 40)
+    )
+    structure.layers.append(elli.Layer(uniaxial, 80))
+
+    for back in [structure.back_material, uniaxial]:
+        structure.set_back_material(back)
+        for angles in [70, [50, 70]]:
+            expected = structure.evaluate(lbda, angles)
+            result = structure.evaluate(lbda, angles, solver=elli.Solver4x4Torch)
+
+            assert isinstance(result.rho, torch.Tensor)
+            np.testing.assert_allclose(result.rho.numpy(), expected.rho)
+            np.testing.assert_allclose(result.psi.numpy(), expected.psi)
+            np.testing.assert_allclose(
+                result.mueller_matrix.numpy(), expected.mueller_matrix, atol=1e-12
+            )
+            np.testing.assert_allclose(result.numpy().delta, expected.delta)
+
+
+def test_solver4x4_torch_rejects_incoherent_layers():
+    importorskip("torch")
+
+    lbda = np.linspace(400, 800, 5)
+    glass = elli.ConstantRefractiveIndex(1.5 + 1e-5j).get_mat()
+    for coherence in [("incoherent",), ("partial", 20)]:
+        structure = elli.Structure(
+            elli.AIR,
+            [
+                elli.Layer(elli.Cauchy(2.0).get_mat(), 50),
+                elli.Layer(glass, 1e5, *coherence),
+            ],
+            glass,
+        )
+        with raises(ValueError):
+            structure.evaluate(lbda, 70, solver=elli.Solver4x4Torch)
+
+
+def test_solver4x4_torch_gradients():
+    torch = importorskip("torch")
+
+    lbda = np.linspace(400, 800, 11)
+
+    def build(thickness, n_0):
+        sio2 = elli.Cauchy(n_0, 36).get_mat()
+        tio2 = elli.Cauchy(2.2, 451, 251).get_mat()
+        return elli.Structure(
+            elli.AIR,
+            [
+                elli.Layer(sio2, thickness),
+                elli.RepeatedLayers([elli.Layer(tio2, 30), elli.Layer(sio2, 50)], 3),
+            ],
+            elli.Cauchy(3.4).get_mat(),
+        )
+
+    def loss(result):
+        return (result.psi**2).sum() + result.delta.sum()
+
+    values = [100.0, 1.45, 70.0]
+    tensors = [
+        torch.tensor(value, dtype=torch.float64, requires_grad=True) for value in values
+    ]
+    result = build(*tensors[:2]).evaluate(lbda, tensors[2], solver=elli.Solver4x4Torch)
+    loss(result).backward()
+
+    for i, tensor in enumerate(tensors):
+        step = 1e-5
+        shifted = []
+        for sign in [1, -1]:
+            args = list(values)
+            args[i] += sign * step
+            shifted.append(loss(build(*args[:2]).evaluate(lbda, args[2])))
+
+        np.testing.assert_allclose(
+            tensor.grad.item(), (shifted[0] - shifted[1]) / (2 * step), rtol=1e-5
+        )
+
+
+def test_solver4x4_torch_dispersions(monkeypatch):
+    torch = importorskip("torch")
+    from elli.solver4x4_torch import dispersion_tensor
+
+    lbda = np.linspace(300, 1500, 13)
+    models = [
+        lambda *p: elli.Cauchy(*p),
+        lambda *p: elli.CauchyCustomExponent(p[0]).add(*p[1:]),
+        lambda *p: elli.CauchyUrbach(*p),
+        lambda *p: elli.ConstantRefractiveIndex(*p),
+        lambda *p: elli.DrudeEnergy(*p),
+        lambda *p: elli.DrudeResistivity(*p),
+        lambda *p: elli.EpsilonInf(*p),
+        lambda *p: elli.LorentzEnergy().add(*p[:3]).add(*p[3:]),
+        lambda *p: elli.LorentzLambda().add(*p),
+        lambda *p: elli.Poles(*p),
+        lambda *p: elli.Polynomial(p[0]).add(*p[1:]),
+        lambda *p: elli.Sellmeier().add(*p),
+        lambda *p: elli.SellmeierCustomExponent().add(*p),
+        lambda *p: elli.TaucLorentz(p[0]).add(*p[1:]),
+        lambda *p: elli.LorentzEnergy().add(*p[:3]) + elli.DrudeEnergy(*p[3:]),
+        lambda *p: elli.Cauchy(p[0]) + elli.CauchyUrbach(*p[1:]),
+    ]
+    values = [
+        [1.5, 30, 5, 0.01, 2, 1],
+        [1.4, 1e4, -2],
+        [1.5, 0.01, 0.001, 0.01, 3.5, 0.5],
+        [1.5],
+        [5, 0.1],
+        [1e-3, 1e-14],
+        [2],
+        [1, 3, 0.1, 2, 5, 0.3],
+        [1, 200, 10],
+        [1, 10, 8],
+        [2, 1e4, -2],
+        [1, 0.01],
+        [1, 2, 0.1, 2],
+        [1.5, 20, 3.5, 1.5],
+        [1, 3, 0.1, 5, 0.1],
+        [1.5, 1.0, 0.01, 0.001, 0.01, 3.5, 0.5],
+    ]
+
+    def evaluate(model, params):
+        dispersion = model(*params)
+        if isinstance(dispersion, elli.dispersions.base_dispersion.IndexDispersion):
+            return np.broadcast_to(dispersion.get_refractive_index(lbda), lbda.shape)
+        return np.broadcast_to(dispersion.get_dielectric(lbda), lbda.shape)
+
+    for model, params in zip(models, values):
+        tensors = [
+            torch.tensor(float(value), dtype=torch.float64, requires_grad=True)
+            for value in params
+        ]
+        result = dispersion_tensor(
+            model(*tensors), torch.as_tensor(lbda, dtype=torch.float64)
+        )
+        expected = evaluate(model, params)
+        np.testing.assert_allclose(result.detach().numpy(), expected, rtol=1e-12)
+
+        (result.real.sum() + result.imag.sum()).backward()
+        for i, tensor in enumerate(tensors):
+            step = 1e-6 * abs(params[i])
+            shifted = []
+            for sign in [1, -1]:
+                args = list(params)
+                args[i] += sign * step
+                shifted.append(evaluate(model, args))
+            derivative = (shifted[0] - shifted[1]) / (2 * step)
+            np.testing.assert_allclose(
+                tensor.grad.item(),
+                derivative.real.sum() + derivative.imag.sum(),
+                rtol=1e-5,
+                atol=1e-8,
+            )
+
+    # Materials of torch dispersions are not linearized
+    def linearized(*_):
+        raise AssertionError("linearized")
+
+    monkeypatch.setattr(elli.Solver4x4Torch, "linearized", staticmethod(linearized))
+    n_0 = torch.tensor(1.45, dtype=torch.float64, requires_grad=True)
+    uniaxial = elli.UniaxialMaterial(
+        elli.Cauchy(n_0, 30), elli.LorentzEnergy().add(n_0, 6, 0.1) + 2
+    )
+    uniaxial.set_rotation(elli.rotation_v_theta(elli.E_Y, 40))
+    structure = elli.Structure(
+        elli.AIR, [elli.Layer(uniaxial, 80)], elli.Cauchy(3.4).get_mat()
+    )
+    result = structure.evaluate(lbda, 70, solver=elli.Solver4x4Torch)
+    result.psi.sum().backward()
+    assert n_0.grad is not None
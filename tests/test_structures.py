@@ -2,7 +2,7 @@
 
 import numpy as np
 import elli
-from pytest import raises
+from pytest import raises, warns
 
 
 class TestStructures:
@@ -71,3 +71,186 @@ class TestStructures:
             vml.get_permittivity_profile(500)[1][1],
             (elli.AIR.get_tensor(500) + self.mat.get_tensor(500)) / 2,
         )
+
+    def test_vectorized_slice_tensors(self):
+        """Inhomogeneous layers evaluate all slices at once."""
+        uniaxial = elli.UniaxialMaterial(elli.Cauchy(1.5), elli.Cauchy(1.7))
+        twisted = elli.TwistedLayer(uniaxial, 200, 25, 120)
+        vml = elli.VaryingMixtureLayer(
+            elli.BruggemanEMA(elli.AIR, uniaxial, 0.5), 100, 7, lambda z: z**2
+        )
+        lbda = np.linspace(400, 800, 5)
+
+        for layer in [twisted, vml]:
+            z = layer.get_slices()
+            zmid = (z[:-1] + z[1:]) / 2
+            tensors = layer.get_tensors(zmid, lbda)
+            assert tensors.shape == (len(zmid), 5, 3, 3)
+
+            for z_i, tensor in zip(zmid, tensors):
+                np.testing.assert_allclose(tensor, layer.get_tensor(z_i, lbda))
+
+    def test_adaptive_slicing(self):
+        """Adaptive slicing refines inhomogeneous layers to the tolerance."""
+        si_mat = elli.Cauchy(3.4).get_mat()
+        lbda = np.linspace(400, 1000, 20)
+
+        def build(div):
+            vml = elli.VaryingMixtureLayer(
+                elli.BruggemanEMA(elli.AIR, si_mat, 0.5), 1000, div, lambda z: z**3
+            )
+            return vml, elli.Structure(elli.AIR, [vml], self.mat)
+
+        _, structure = build(2000)
+        reference = structure.evaluate(lbda, 60, solver=elli.Solver4x4)
+
+        vml, structure = build(4)
+        vml.set_adaptive(1e-3, max_div=256)
+        z = vml.get_slices(lbda, 0.5)
+        assert 4 < len(z) - 1 <= 256
+        np.testing.assert_allclose(np.diff(z), np.diff(z)[0])
+
+        result = structure.evaluate(lbda, 60, solver=elli.Solver4x4)
+        np.testing.assert_allclose(result.rho, reference.rho, atol=1e-3)
+
+        # Fewer wavelengths than bands and a single wavelength
+        for few in [lbda[:5], lbda[[3]], 500.0]:
+            few_result = structure.evaluate(few, 60, solver=elli.Solver4x4)
+            few_reference = elli.Structure(
+                elli.AIR, [build(2000)[0]], self.mat
+            ).evaluate(few, 60, solver=elli.Solver4x4)
+            np.testing.assert_allclose(few_result.rho, few_reference.rho, atol=1e-3)
+
+        vml.set_adaptive(1e-12, max_div=16)
+        with warns(UserWarning, match="tolerance"):
+            assert len(vml.get_slices(lbda)) == 17
+
+        vml.set_adaptive(None)
+        assert len(vml.get_slices(lbda)) == 5
+
+        with raises(ValueError):
+            vml.set_adaptive(0)
+
+        with raises(ValueError):
+            vml.set_adaptive(1e-3, max_div=0)
+
+    def test_repeated_layers_match_expanded_stack(self):
+        """RepeatedLayers evaluated by matrix powers equal the explicit layer stack."""
+        l_1 = elli.Layer(elli.ConstantRefractiveIndex(2.3).get_mat(), 60)
+        l_2 = elli.Layer(elli.ConstantRefractiveIndex(1.45 + 0.001j).get_mat(), 95)
+        l_3 = elli.Layer(self.mat, 10)
+        lbda = np.linspace(400, 900, 21)
+
+        repeated = elli.Structure(
+            elli.AIR,
+            [elli.RepeatedLayers([l_1, l_2, l_3], 25, before=2, after=1)],
+            self.mat,
+        )
+        expanded = elli.Structure(
+            elli.AIR, [l_2, l_3] + 25 * [l_1, l_2, l_3] + [l_1], self.mat
+        )
+
+        for solver in [elli.Solver2x2, elli.Solver4x4]:
+            result = repeated.evaluate(lbda, [0, 45, 70], solver=solver)
+            reference = expanded.evaluate(lbda, [0, 45, 70], solver=solver)
+
+            np.testing.assert_allclose(result.rho, reference.rho, rtol=1e-8)
+            np.testing.assert_allclose(result.T, reference.T, rtol=1e-8, atol=1e-12)
+
+        # Partial periods longer than the period are limited to one period
+        for before, after in [(3, 0), (5, 0), (0, 3), (5, 5)]:
+            repeated = elli.Structure(
+                elli.AIR,
+                [elli.RepeatedLayers([l_1, l_2], 2, before=before, after=after)],
+                self.mat,
+            )
+            expanded = elli.Structure(
+                elli.AIR,
+                [l_1, l_2][-before:] * (before > 0)
+                + 2 * [l_1, l_2]
+                + [l_1, l_2][:after],
+                self.mat,
+            )
+            reference = expanded.evaluate(lbda, 70, solver=elli.Solver4x4)
+            for solver in [elli.Solver2x2, elli.Solver4x4]:
+                result = repeated.evaluate(lbda, 70, solver=solver)
+                np.testing.assert_allclose(result.rho, reference.rho, rtol=1e-8)
+
+    def test_compact_permittivity_profile(self):
+        """The profile stores every material once and does not expand repetitions."""
+        calls = []
+
+        class CountingMaterial(elli.IsotropicMaterial):
+            def get_tensor(self, lbda):
+                calls.append(self)
+                return super().get_tensor(lbda)
+
+        m_1 = CountingMaterial(elli.ConstantRefractiveIndex(2.3))
+        m_2 = CountingMaterial(elli.ConstantRefractiveIndex(1.45))
+        structure = elli.Structure(
+            elli.AIR,
+            [
+                elli.Layer(m_2, 5),
+                elli.RepeatedLayers(
+                    [elli.Layer(m_1, 60), elli.Layer(m_2, 95)], 1000, before=1
+                ),
+            ],
+            m_1,
+        )
+        lbda = np.linspace(400, 900, 11)
+        profile = structure.get_permittivity_profile(lbda)
+
+        assert len(calls) == 2
+        assert len(profile) == 2 + 1 + 1 + 2 * 1000
+        assert profile.tensors.shape == (3, len(lbda), 3, 3)
+        np.testing.assert_array_equal(profile.thickness[:5], [np.inf, 5, 95, 60, 95])
+        np.testing.assert_array_equal(profile.indices[:5], [0, 1, 1, 2, 1])
+        np.testing.assert_array_equal(profile[-1][1], m_1.get_tensor(lbda))
+
+        expanded = [(thickness, epsilon) for thickness, epsilon in profile]
+        assert len(expanded) == len(profile)
+        assert expanded[2][1] is expanded[1][1]
+
+    def test_thickness_sweep_matches_single_evaluations(self):
+        """Thickness sweeps equal the evaluation of each thickness."""
+        uniaxial = elli.UniaxialMaterial(elli.Cauchy(1.6, 30), elli.Cauchy(1.7, 40))
+        uniaxial.set_rotation(
+            elli.rotation_v_theta(elli.E_Z, 30) @ elli.rotation_v_theta(elli.E_Y, 40)
+        )
+        layers = [
+            elli.Layer(elli.Cauchy(2.2, 451, 251).get_mat(), 20),
+            elli.Layer(elli.Cauchy(1.45, 36).get_mat(), 100),
+            elli.Layer(uniaxial, 50),
+        ]
+        structure = elli.Structure(elli.AIR, layers, self.mat)
+        lbda = np.linspace(400, 800, 21)
+        oxide = np.linspace(50, 150, 7)
+        top = np.linspace(10, 30, 7)
+
+        for angles in [70, [50, 70]]:
+            result = structure.sweep_thickness(
+                lbda, angles, {1: oxide, -1: top}, chunk_size=3
+            )
+            assert result.psi.shape == (7,) + np.shape(angles) + (21,)
+
+            for i, (d_oxide, d_top) in enumerate(zip(oxide, top)):
+                layers[1].set_thickness(d_oxide)
+                layers[2].set_thickness(d_top)
+                reference = structure.evaluate(lbda, angles)
+
+                np.testing.assert_allclose(result.rho[i], reference.rho)
+                np.testing.assert_allclose(result.T[i], reference.T)
+
+    def test_thickness_sweep_errors(self):
+        """Thickness sweeps check the swept layers."""
+        vml = elli.VaryingMixtureLayer(elli.VCAMaterial(elli.AIR, self.mat, 0.5), 10, 3)
+        structure = elli.Structure(elli.AIR, [self.layer, vml], self.mat)
+
+        with raises(ValueError):
+            structure.sweep_thickness(500, 70, {1: [10, 20]})
+
+        with raises(ValueError):
+            structure.sweep_thickness(500, 70, {2: [10, 20]})
+
+        with raises(ValueError):
+            structure.sweep_thickness(500, 70, {})